@@ -0,0 +1,343 @@
+# backend/adaptive.py
+import os
+import json
+import math
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from statistics import NormalDist
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from grading import grade_answer
+
+# Responses an item needs before its live statistics are used to calibrate it
+CALIBRATION_MIN_RESPONSES = int(os.environ.get('ADAPTIVE_CALIBRATION_MIN_RESPONSES', 30))
+# Items whose biserial correlation is below this do not separate abilities and stay uncalibrated
+CALIBRATION_MIN_BISERIAL = float(os.environ.get('ADAPTIVE_CALIBRATION_MIN_BISERIAL', 0.1))
+# Pools and attempts in progress, shared by every worker and kept across restarts
+ADAPTIVE_DB_PATH = os.environ.get(
+    'ADAPTIVE_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'adaptive.db')
+)
+# Pools cached in memory per worker; every pool stays in SQLite
+ADAPTIVE_MAX_POOLS = int(os.environ.get('ADAPTIVE_MAX_POOLS', 256))
+# Unfinished attempts idle this long are dropped
+ADAPTIVE_ATTEMPT_TTL_SECONDS = float(os.environ.get('ADAPTIVE_ATTEMPT_TTL_SECONDS', 4 * 3600))
+
+# Scales the logistic curve to the normal ogive the classical approximations assume
+LOGISTIC_SCALE = 1.702
+_NORMAL = NormalDist()
+
+# Ability grid used for EAP estimation
+THETA_GRID = np.linspace(-4.0, 4.0, 81)
+LOG_PRIOR = -0.5 * THETA_GRID ** 2
+
+
+def probability(theta: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """3PL probability of a correct response"""
+    return c + (1.0 - c) / (1.0 + np.exp(-a * (theta - b)))
+
+
+def information(theta: float, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Fisher information of every item at one ability level"""
+    p = probability(theta, a, b, c)
+    return (a ** 2) * ((p - c) ** 2 / (1.0 - c) ** 2) * ((1.0 - p) / p)
+
+
+def calibrate(item: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """2PL parameters from an item's live statistics (item_stats snapshot entry).
+
+    Normal-ogive approximations: the p-value gives the threshold z, the point-biserial is
+    converted to a biserial r, then a = r / sqrt(1 - r^2) and b = -z / r. None while the item
+    has too few responses or does not discriminate.
+    """
+    p, point_biserial = item.get('pValue'), item.get('pointBiserial')
+    if item.get('responses', 0) < CALIBRATION_MIN_RESPONSES or p is None or point_biserial is None:
+        return None
+    p, point_biserial = float(p), float(point_biserial)
+    if not 0 < p < 1:
+        return None
+    z = _NORMAL.inv_cdf(p)
+    biserial = min(point_biserial * math.sqrt(p * (1 - p)) / _NORMAL.pdf(z), 0.95)
+    if biserial < CALIBRATION_MIN_BISERIAL:
+        return None
+    return {
+        'a': round(min(LOGISTIC_SCALE * biserial / math.sqrt(1 - biserial ** 2), 4.0), 4),
+        'b': round(min(max(-z / biserial, -4.0), 4.0), 4),
+        'c': 0.0,
+    }
+
+
+def _parameters(question: Dict[str, Any]) -> Dict[str, float]:
+    """Validated a, b, c of one question"""
+    params = question['irt']
+    a, b, c = float(params.get('a', 1.0)), float(params.get('b', 0.0)), float(params.get('c', 0.0))
+    if not (a > 0 and math.isfinite(a) and math.isfinite(b) and 0 <= c < 1):
+        raise ValueError(f"Question {question['id']} needs a > 0 and 0 <= c < 1 (got a={a}, c={c})")
+    return {'a': a, 'b': b, 'c': c}
+
+
+class ItemPool:
+    """Calibrated questions with their IRT parameters held as arrays.
+
+    Each question needs parameters, either its own `irt` or calibrated from the assessment's
+    live item statistics; without them every item looks alike and nothing is adaptive.
+    """
+
+    def __init__(self, questions: List[Dict[str, Any]], item_stats: Optional[Dict[str, Any]] = None):
+        if not questions:
+            raise ValueError('Item pool needs at least one question')
+        observed = {item['questionId']: item for item in (item_stats or {}).get('items', [])}
+        self.calibrated = 0
+        calibrated_questions = []
+        for question in questions:
+            if not question.get('irt') and question['id'] in observed:
+                params = calibrate(observed[question['id']])
+                if params is not None:
+                    question = dict(question, irt=params)
+                    self.calibrated += 1
+            calibrated_questions.append(question)
+        missing = [q['id'] for q in calibrated_questions if not q.get('irt')]
+        if missing:
+            raise ValueError(
+                f"Questions without IRT parameters or {CALIBRATION_MIN_RESPONSES} discriminating "
+                f"responses to calibrate from: {', '.join(map(str, missing))}"
+            )
+        self.questions = calibrated_questions
+        # Content hash of the calibrated questions; attempts refer to the pool by it
+        canonical = json.dumps(calibrated_questions, sort_keys=True, separators=(',', ':'), default=str)
+        self.key = hashlib.sha256(canonical.encode()).hexdigest()[:16]
+        self.index = {q['id']: i for i, q in enumerate(calibrated_questions)}
+        params = [_parameters(q) for q in calibrated_questions]
+        self.a = np.array([p['a'] for p in params])
+        self.b = np.array([p['b'] for p in params])
+        self.c = np.array([p['c'] for p in params])
+
+    def public_question(self, row: int) -> Dict[str, Any]:
+        """Question as shown to the candidate, without the key or parameters"""
+        return {k: v for k, v in self.questions[row].items() if k not in ('correctAnswer', 'irt')}
+
+
+class AdaptiveAttempt:
+    """Ability estimate and administered items for one candidate"""
+
+    def __init__(self, pool: ItemPool, se_threshold: float, min_items: int, max_items: int):
+        self.pool = pool
+        self.se_threshold = se_threshold
+        self.min_items = min_items
+        self.max_items = min(max_items, len(pool.questions))
+        self.log_posterior = LOG_PRIOR.copy()
+        self.available = np.ones(len(pool.questions), dtype=bool)
+        self.administered: List[int] = []
+        self.results: List[Dict[str, Any]] = []
+        self.pending: Optional[int] = None
+        self.theta, self.se = self._estimate()
+
+    @classmethod
+    def restore(cls, pool: ItemPool, state: Dict[str, Any]) -> 'AdaptiveAttempt':
+        """Attempt rebuilt from state(): the posterior is replayed from the responses"""
+        attempt = cls(pool, state['seThreshold'], state['minItems'], state['maxItems'])
+        for row, result in zip(state['administered'], state['results']):
+            attempt._observe(row, result)
+        attempt.pending = state['pending']
+        attempt.theta, attempt.se = attempt._estimate()
+        return attempt
+
+    def saved_state(self) -> Dict[str, Any]:
+        return {
+            'seThreshold': self.se_threshold,
+            'minItems': self.min_items,
+            'maxItems': self.max_items,
+            'administered': self.administered,
+            'results': self.results,
+            'pending': self.pending,
+        }
+
+    def _estimate(self):
+        weights = np.exp(self.log_posterior - self.log_posterior.max())
+        weights /= weights.sum()
+        theta = float(np.dot(THETA_GRID, weights))
+        se = float(np.sqrt(np.dot((THETA_GRID - theta) ** 2, weights)))
+        return theta, se
+
+    def finished(self) -> bool:
+        answered = len(self.results)
+        if answered >= self.max_items or not self.available.any():
+            return True
+        return answered >= self.min_items and self.se < self.se_threshold
+
+    def next_item(self) -> Optional[int]:
+        """Most informative unused item at the current ability estimate"""
+        if self.finished():
+            self.pending = None
+            return None
+        info = information(self.theta, self.pool.a, self.pool.b, self.pool.c)
+        info[~self.available] = -np.inf
+        self.pending = int(np.argmax(info))
+        return self.pending
+
+    def respond(self, question_id: str, answer: Any) -> Dict[str, Any]:
+        """Grade the pending item and update the posterior"""
+        row = self.pool.index.get(question_id)
+        if row is None or row != self.pending:
+            raise ValueError(f'Question {question_id} is not the pending item')
+        question = self.pool.questions[row]
+        result = grade_answer(question_id, question.get('correctAnswer', ''), answer)
+        self._observe(row, result)
+        self.pending = None
+        self.theta, self.se = self._estimate()
+        return result
+
+    def _observe(self, row: int, result: Dict[str, Any]) -> None:
+        p = probability(THETA_GRID, self.pool.a[row], self.pool.b[row], self.pool.c[row])
+        self.log_posterior += np.log(p if result['correct'] else 1.0 - p)
+        self.available[row] = False
+        self.administered.append(row)
+        self.results.append(result)
+
+    def state(self) -> Dict[str, Any]:
+        score = sum(1 for r in self.results if r['correct'])
+        return {
+            'theta': round(self.theta, 4),
+            'standardError': round(self.se, 4),
+            'answered': len(self.results),
+            'score': score,
+            'finished': self.finished()
+        }
+
+
+class AdaptiveEngine:
+    """Registered item pools and in-progress adaptive attempts, stored in SQLite.
+
+    Any worker can serve any step: each start and answer loads the attempt, replays its posterior
+    and writes it back inside one BEGIN IMMEDIATE transaction. Pools are stored by content hash,
+    so an attempt keeps the pool it started on when its pool id is registered again, and they are
+    cached per worker (least recently used beyond ADAPTIVE_MAX_POOLS). Finished attempts are
+    deleted as soon as their last step is returned, idle ones after ADAPTIVE_ATTEMPT_TTL_SECONDS.
+    """
+
+    def __init__(self, db_path: str = ADAPTIVE_DB_PATH):
+        self.db_path = db_path
+        self.pools: 'OrderedDict[str, ItemPool]' = OrderedDict()
+        self.lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS adaptive_pools ('
+                'pool_key TEXT PRIMARY KEY, questions TEXT NOT NULL, calibrated INTEGER NOT NULL, '
+                'created_at REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS adaptive_pool_ids (pool_id TEXT PRIMARY KEY, pool_key TEXT NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS adaptive_attempts ('
+                'attempt_id TEXT PRIMARY KEY, pool_key TEXT NOT NULL, state TEXT NOT NULL, '
+                'updated_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS adaptive_attempts_idle ON adaptive_attempts (updated_at)')
+        return self._conn
+
+    def reset_connection(self) -> None:
+        """Reopen the database in a forked worker instead of sharing the parent's connection"""
+        self.lock = threading.Lock()
+        self._conn = None
+        self.pools = OrderedDict()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that holds off other workers' writes until commit; caller holds the lock"""
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+
+    def register_pool(self, pool_id: str, questions: List[Dict[str, Any]],
+                      item_stats: Optional[Dict[str, Any]] = None) -> ItemPool:
+        pool = ItemPool(questions, item_stats)
+        with self.lock, self._transaction() as db:
+            db.execute(
+                'INSERT OR IGNORE INTO adaptive_pools VALUES (?, ?, ?, ?)',
+                (pool.key, json.dumps(pool.questions), pool.calibrated, time.time())
+            )
+            db.execute('INSERT OR REPLACE INTO adaptive_pool_ids VALUES (?, ?)', (pool_id, pool.key))
+            self._cache(pool)
+        return pool
+
+    def start(self, attempt_id: str, pool_id: str, se_threshold: float = 0.4,
+              min_items: int = 3, max_items: int = 20) -> Dict[str, Any]:
+        with self.lock, self._transaction() as db:
+            self._expire(db)
+            row = db.execute('SELECT pool_key FROM adaptive_pool_ids WHERE pool_id = ?', (pool_id,)).fetchone()
+            if row is None:
+                raise KeyError(f'Unknown item pool {pool_id}')
+            attempt = AdaptiveAttempt(self._pool(db, row[0]), se_threshold, min_items, max_items)
+            return self._step(db, attempt_id, attempt)
+
+    def answer(self, attempt_id: str, question_id: str, answer: Any) -> Dict[str, Any]:
+        with self.lock, self._transaction() as db:
+            row = db.execute(
+                'SELECT pool_key, state FROM adaptive_attempts WHERE attempt_id = ?', (attempt_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f'Unknown adaptive attempt {attempt_id}')
+            attempt = AdaptiveAttempt.restore(self._pool(db, row[0]), json.loads(row[1]))
+            result = attempt.respond(question_id, answer)
+            return {'result': result, **self._step(db, attempt_id, attempt)}
+
+    def _step(self, db: sqlite3.Connection, attempt_id: str, attempt: AdaptiveAttempt) -> Dict[str, Any]:
+        """Next question and state, saving the attempt (or deleting it once finished); caller holds the lock"""
+        row = attempt.next_item()
+        step = attempt.state()
+        step['nextQuestion'] = attempt.pool.public_question(row) if row is not None else None
+        if row is None:
+            db.execute('DELETE FROM adaptive_attempts WHERE attempt_id = ?', (attempt_id,))
+        else:
+            db.execute(
+                'INSERT OR REPLACE INTO adaptive_attempts VALUES (?, ?, ?, ?)',
+                (attempt_id, attempt.pool.key, json.dumps(attempt.saved_state()), time.time())
+            )
+        return step
+
+    def _pool(self, db: sqlite3.Connection, pool_key: str) -> ItemPool:
+        """Pool by content hash, from the cache or SQLite; caller holds the lock"""
+        pool = self.pools.get(pool_key)
+        if pool is None:
+            row = db.execute(
+                'SELECT questions, calibrated FROM adaptive_pools WHERE pool_key = ?', (pool_key,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f'Unknown item pool {pool_key}')
+            # Stored questions already carry their calibrated parameters
+            pool = ItemPool(json.loads(row[0]))
+            pool.key, pool.calibrated = pool_key, row[1]
+        self._cache(pool)
+        return pool
+
+    def _cache(self, pool: ItemPool) -> None:
+        """Caller holds the lock"""
+        self.pools[pool.key] = pool
+        self.pools.move_to_end(pool.key)
+        while len(self.pools) > ADAPTIVE_MAX_POOLS:
+            self.pools.popitem(last=False)
+
+    def _expire(self, db: sqlite3.Connection) -> None:
+        """Drop attempts abandoned mid-way; caller holds the lock"""
+        db.execute('DELETE FROM adaptive_attempts WHERE updated_at < ?', (time.time() - ADAPTIVE_ATTEMPT_TTL_SECONDS,))
+
+
+# Shared engine used by the Flask routes
+adaptive_engine = AdaptiveEngine()
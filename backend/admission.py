@@ -0,0 +1,311 @@
+# backend/admission.py
+"""Inbound admission control: a token bucket per client and route class, plus weighted fair
+queuing in front of the routes that hold a Groq call for seconds.
+
+Clients are identified by X-API-Key when it is one of ADMISSION_API_KEYS ("key" or "key:weight",
+comma-separated), otherwise by address. The backend does not verify user tokens, so they are not
+trusted as identity. State is per process: with N gunicorn workers a client gets up to N times
+each budget.
+"""
+import os
+import math
+import time
+import heapq
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import Flask, g, jsonify, request
+
+ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '1') == '1'
+THREADS = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Requests arriving through a proxy (Render) carry the client address in X-Forwarded-For
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 1))
+# Distinct clients tracked per process; the least recently seen are forgotten first
+MAX_CLIENTS = int(os.environ.get('ADMISSION_MAX_CLIENTS', 10000))
+
+
+@dataclass
+class RouteClass:
+    name: str
+    per_minute: float
+    burst: int
+    # Queue in front of the route: at most `concurrency` run at once, `max_waiting` wait
+    concurrency: int = 0
+    max_waiting: int = 0
+    max_waiting_per_client: int = 0
+    queue_timeout: float = 0.0
+
+
+# A waiting request holds a server thread, so by default the LLM queue leaves one thread
+# free for grading and email (one worker, GUNICORN_THREADS threads)
+_LLM_CONCURRENCY = int(os.environ.get('ADMISSION_LLM_CONCURRENCY', max(1, THREADS // 2)))
+
+ROUTE_CLASSES: Dict[str, RouteClass] = {
+    'llm': RouteClass(
+        'llm',
+        per_minute=float(os.environ.get('ADMISSION_LLM_PER_MINUTE', 20)),
+        burst=int(os.environ.get('ADMISSION_LLM_BURST', 5)),
+        concurrency=_LLM_CONCURRENCY,
+        max_waiting=int(os.environ.get('ADMISSION_LLM_QUEUE', max(0, THREADS - _LLM_CONCURRENCY - 1))),
+        max_waiting_per_client=int(os.environ.get('ADMISSION_LLM_QUEUE_PER_CLIENT', 2)),
+        queue_timeout=float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 30)),
+    ),
+    # Speculative generation (prefetch.py) starts at most this often per client; it also has a per-process budget
+    'prefetch': RouteClass(
+        'prefetch',
+        per_minute=float(os.environ.get('ADMISSION_PREFETCH_PER_MINUTE', 6)),
+        burst=int(os.environ.get('ADMISSION_PREFETCH_BURST', 3)),
+    ),
+    'grading': RouteClass('grading', float(os.environ.get('ADMISSION_GRADING_PER_MINUTE', 600)), 60),
+    'email': RouteClass('email', float(os.environ.get('ADMISSION_EMAIL_PER_MINUTE', 120)), 20),
+    'default': RouteClass('default', float(os.environ.get('ADMISSION_DEFAULT_PER_MINUTE', 300)), 60),
+}
+
+LLM_ENDPOINTS = {'ai.generate_assessment', 'ai.generate_violation_report', 'ai.analyze_candidate'}
+PREFETCH_ENDPOINTS = {'ai.prefetch_assessment'}
+EXEMPT_ENDPOINTS = {'health_check', 'metrics', 'static'}
+
+
+def route_class(endpoint: Optional[str]) -> Optional[str]:
+    """Route class of a Flask endpoint; None for exempt and unmatched requests"""
+    if endpoint is None or endpoint in EXEMPT_ENDPOINTS or endpoint.startswith('debug'):
+        return None
+    if endpoint in LLM_ENDPOINTS:
+        return 'llm'
+    if endpoint in PREFETCH_ENDPOINTS:
+        return 'prefetch'
+    if endpoint.startswith('ai.'):
+        return 'grading'
+    if endpoint.startswith('email.'):
+        return 'email'
+    return 'default'
+
+
+def _parse_api_keys(value: str) -> Dict[str, float]:
+    keys = {}
+    for entry in value.split(','):
+        key, _, weight = entry.strip().partition(':')
+        if key:
+            keys[key] = float(weight or 1)
+    return keys
+
+
+API_KEYS = _parse_api_keys(os.environ.get('ADMISSION_API_KEYS', ''))
+
+
+def identify(headers, remote_addr: Optional[str]) -> Tuple[str, float]:
+    """(client id, fair-queuing weight) for a request"""
+    api_key = headers.get('X-API-Key')
+    if api_key and api_key in API_KEYS:
+        digest = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        return f'key:{digest}', API_KEYS[api_key]
+    forwarded = [hop.strip() for hop in headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+    if TRUSTED_PROXY_HOPS and len(forwarded) >= TRUSTED_PROXY_HOPS:
+        return f'ip:{forwarded[-TRUSTED_PROXY_HOPS]}', 1.0
+    return f'ip:{remote_addr or "unknown"}', 1.0
+
+
+class RateLimiter:
+    """Non-blocking token buckets keyed by (client, route class)"""
+
+    def __init__(self, max_clients: int = MAX_CLIENTS):
+        self.max_clients = max_clients
+        self.buckets: 'OrderedDict[Tuple[str, str], list]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client: str, limits: RouteClass) -> Tuple[bool, int, float, float]:
+        """(allowed, whole tokens left, seconds until the next token, seconds until full)"""
+        rate = limits.per_minute / 60.0
+        now = time.monotonic()
+        key = (client, limits.name)
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = [float(limits.burst), now]
+                self.buckets[key] = bucket
+                if len(self.buckets) > self.max_clients:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+            tokens = min(float(limits.burst), bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            bucket[0], bucket[1] = tokens, now
+        retry_after = 0.0 if allowed else (1.0 - tokens) / rate
+        return allowed, int(tokens), retry_after, (limits.burst - tokens) / rate
+
+
+class Ticket:
+    """A place in a FairQueue; `notify` is called (under the queue lock) when it is granted"""
+    __slots__ = ('client', 'weight', 'finish', 'notify', 'granted', 'cancelled')
+
+    def __init__(self, client: str, weight: float, finish: float, notify: Callable[[], None]):
+        self.client = client
+        self.weight = weight
+        self.finish = finish
+        self.notify = notify
+        self.granted = False
+        self.cancelled = False
+
+
+class FairQueue:
+    """Concurrency cap whose waiters are served in weighted fair order across clients.
+
+    Each request gets a virtual start, max(virtual now, client's last finish), and finish,
+    start + 1/weight; waiters are served smallest finish first, so a client with many queued requests cannot push out
+    one that has a single request waiting.
+    """
+
+    def __init__(self, limits: RouteClass):
+        self.limits = limits
+        self.running = 0
+        self.waiting: list = []  # heap; cancelled tickets are skipped when popped
+        self.queued = 0
+        self.waiting_by_client: Dict[str, int] = {}
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def enter(self, client: str, weight: float, notify: Callable[[], None]) -> Optional[Ticket]:
+        """A granted or queued ticket, or None when the queue (or this client's share of it) is full"""
+        with self._lock:
+            immediate = self.running < self.limits.concurrency and not self.queued
+            queued = self.waiting_by_client.get(client, 0)
+            if not immediate and (self.queued >= self.limits.max_waiting
+                                  or queued >= self.limits.max_waiting_per_client):
+                return None
+            # Immediate grants are charged too, so a client that has been busy queues behind idle ones
+            start = max(self.virtual_time, self.last_finish.get(client, 0.0))
+            finish = start + 1.0 / weight
+            self.last_finish[client] = finish
+            ticket = Ticket(client, weight, finish, notify)
+            if immediate:
+                # Virtual time follows the start tag of whatever entered service last
+                self.virtual_time = start
+                self.running += 1
+                ticket.granted = True
+                return ticket
+            self._seq += 1
+            heapq.heappush(self.waiting, (finish, self._seq, ticket))
+            self.queued += 1
+            self.waiting_by_client[client] = queued + 1
+            return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """Give up a granted slot, or leave the queue if still waiting"""
+        with self._lock:
+            if ticket.granted:
+                self.running -= 1
+                self._dispatch()
+            elif not ticket.cancelled:
+                ticket.cancelled = True
+                self._unqueue(ticket.client)
+
+    def _unqueue(self, client: str) -> None:
+        self.queued -= 1
+        remaining = self.waiting_by_client.pop(client) - 1
+        if remaining:
+            self.waiting_by_client[client] = remaining
+
+    def _dispatch(self) -> None:
+        while self.running < self.limits.concurrency and self.waiting:
+            _, _, ticket = heapq.heappop(self.waiting)
+            if ticket.cancelled:
+                continue
+            self._unqueue(ticket.client)
+            self.virtual_time = max(self.virtual_time, ticket.finish - 1.0 / ticket.weight)
+            self.running += 1
+            ticket.granted = True
+            ticket.notify()
+        if len(self.last_finish) > MAX_CLIENTS:
+            self.last_finish = {c: f for c, f in self.last_finish.items() if f > self.virtual_time}
+
+    def wait(self, ticket: Ticket, event: threading.Event) -> bool:
+        """Block until granted; False (and out of the queue) after queue_timeout"""
+        if event.wait(self.limits.queue_timeout):
+            return True
+        self.release(ticket)
+        # Granted between the timeout and the release: the slot was just handed back
+        return False
+
+
+class AdmissionController:
+    """Route class limits, the shared rate limiter and one FairQueue per capped class"""
+
+    def __init__(self, classes: Dict[str, RouteClass] = ROUTE_CLASSES):
+        self.classes = classes
+        self.limiter = RateLimiter()
+        self.queues = {name: FairQueue(c) for name, c in classes.items() if c.concurrency}
+
+    def check(self, client: str, class_name: str) -> Tuple[Optional[float], Dict[str, str]]:
+        """(Retry-After seconds if rejected, quota headers)"""
+        limits = self.classes[class_name]
+        if limits.per_minute <= 0:
+            return None, {}
+        allowed, remaining, retry_after, reset = self.limiter.take(client, limits)
+        headers = {
+            'X-RateLimit-Limit': f'{limits.per_minute:g}',
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset': str(math.ceil(reset)),
+        }
+        return (None if allowed else retry_after), headers
+
+
+def too_many_requests(retry_after: float, headers: Dict[str, str], reason: str):
+    """429 with Retry-After (whole seconds, at least 1) and the quota headers"""
+    seconds = max(1, math.ceil(retry_after))
+    response = jsonify({'error': reason, 'retryAfter': seconds})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(seconds)
+    response.headers.update(headers)
+    return response
+
+
+# Shared controller used by the Flask hooks and async_app
+admission = AdmissionController()
+
+
+def install_admission(app: Flask) -> None:
+    """Rate-limit and queue every non-exempt request before its view runs"""
+    if not ADMISSION_ENABLED:
+        return
+
+    @app.before_request
+    def _admit():
+        class_name = route_class(request.endpoint)
+        if class_name is None or request.method == 'OPTIONS':
+            return None
+        client, weight = identify(request.headers, request.remote_addr)
+        retry_after, headers = admission.check(client, class_name)
+        g.admission_headers = headers
+        if retry_after is not None:
+            return too_many_requests(retry_after, headers, 'Rate limit exceeded')
+        queue = admission.queues.get(class_name)
+        if queue is None:
+            return None
+        event = threading.Event()
+        ticket = queue.enter(client, weight, event.set)
+        if ticket is None:
+            return too_many_requests(1, headers, 'Too many requests queued')
+        if not ticket.granted and not queue.wait(ticket, event):
+            return too_many_requests(queue.limits.queue_timeout, headers, 'Timed out waiting for capacity')
+        g.admission_ticket = (queue, ticket)
+        return None
+
+    @app.after_request
+    def _quota_headers(response):
+        for name, value in g.pop('admission_headers', {}).items():
+            response.headers.setdefault(name, value)
+        return response
+
+    @app.teardown_request
+    def _release(exc):
+        queued = g.pop('admission_ticket', None)
+        if queued is not None:
+            queued[0].release(queued[1])
@@ -407,407 +407,693 @@
 # backend/ai.py
 import os
 import json
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from groq import Groq
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-app = Flask(__name__)
-CORS(app, origins=["http://localhost:5173", "https://skills-v2-frontend.onrender.com"])  # Add your Render frontend URL
-
-# Initialize Groq client
-groq_api_key = os.environ.get("GROQ_API_KEY")
-if not groq_api_key:
-    raise ValueError("GROQ_API_KEY environment variable is not set")
-
-client = Groq(api_key=groq_api_key)
-
-# Email configuration
-SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-SMTP_PORT = int(os.environ.get('SMTP_PORT', 587))
-EMAIL_USER = os.environ.get('EMAIL_USER')
-EMAIL_PASSWORD = os.environ.get('EMAIL_PASSWORD')
-
-def send_email(to_email, subject, message):
+import time
+import threading
+from flask import Blueprint, g, request, jsonify
+from auth import interviewer_required
+from grading import grade_answer, build_summary, attempt_store
+from item_stats import item_stats, option_counts
+from cohort_stats import cohort_stats, time_used
+from variants import variant_store
+from adaptive import adaptive_engine
+from free_text import free_text_grader, is_free_text, reference_text
+from face_presence import face_analyzer, available as face_analysis_available
+from metrics import track_completion, JSON_PARSE_FAILURES
+from model_routing import LARGE_MODEL, escalation, routed
+from profiling import span
+from prefetch import PREFETCH_ENABLED, prefetcher
+from admission import identify
+
+# AI generation, grading and reporting routes; registered by app.create_app()
+bp = Blueprint('ai', __name__)
+
+# Created on first use, so a cold start neither imports the SDK nor needs the key
+_client = None
+_client_lock = threading.Lock()
+
+def groq_client():
+    """Shared Groq client; GROQ_BASE_URL points it at a local stand-in (bench/fake_groq.py)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                groq_api_key = os.environ.get("GROQ_API_KEY")
+                if not groq_api_key:
+                    raise ValueError("GROQ_API_KEY environment variable is not set")
+                from groq import Groq
+                _client = Groq(api_key=groq_api_key, base_url=os.environ.get("GROQ_BASE_URL") or None)
+    return _client
+
+def reset_client():
+    """Drop a client inherited from a preloading master; its connection pool is not fork-safe"""
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+def groq_configured():
+    return bool(os.environ.get("GROQ_API_KEY"))
+
+def assessment_completion(data):
+    """Groq chat completion arguments for /generate-assessment"""
+    job_role = data.get('jobRole', 'Software Developer')
+    assessment_type = data.get('type', 'multiple_choice')
+    difficulty = data.get('difficulty', 'intermediate')
+    num_questions = data.get('numberOfQuestions', 5)
+    
+    prompt = f"""
+    Create a {assessment_type} assessment for a {job_role} position with {difficulty} difficulty level.
+    Generate {num_questions} questions.
+    
+    The assessment should include:
+    - Clear instructions
+    - Relevant questions for the role
+    - Appropriate difficulty level
+    - Answer key or evaluation criteria
+    
+    Return the response as a JSON object with this structure:
+    {{
+        "title": "Assessment title",
+        "description": "Assessment description",
+        "jobRole": "{job_role}",
+        "type": "{assessment_type}",
+        "difficulty": "{difficulty}",
+        "questions": [
+            {{
+                "id": "q1",
+                "question": "Question text",
+                "type": "multiple_choice",
+                "options": ["Option1", "Option2", "Option3", "Option4"],
+                "correctAnswer": "0",
+                "codeTemplate": "",
+                "testCases": []
+            }}
+        ],
+        "timeLimit": 30,
+        "passingScore": 70
+    }}
+    """
+    
+    return dict(
+        messages=[{"role": "user", "content": prompt}],
+        model=LARGE_MODEL,
+        temperature=0.7,
+        max_tokens=4000
+    )
+
+def violation_report_completion(data):
+    """Groq chat completion arguments for /generate-violation-report"""
+    assignment_id = data.get('assignmentId')
+    violations = data.get('violations', [])
+    
+    prompt = f"""
+    Analyze these proctoring violations for an assessment and generate a comprehensive report:
+    
+    Assignment ID: {assignment_id}
+    Total Violations: {len(violations)}
+    
+    Violations:
+    {json.dumps(violations, indent=2)}
+    
+    Provide a JSON response with this structure:
+    {{
+        "summary": "Brief summary of the findings",
+        "severityBreakdown": {{
+            "low": 0,
+            "medium": 0,
+            "high": 0
+        }},
+        "recommendations": [
+            "Recommendation 1",
+            "Recommendation 2"
+        ],
+        "confidence": "high|medium|low"
+    }}
+    
+    Analyze patterns, frequency, and severity of violations to provide meaningful insights.
+    """
+    
+    return dict(
+        messages=[{"role": "user", "content": prompt}],
+        model=LARGE_MODEL,
+        temperature=0.3,  # Lower temperature for more factual responses
+        max_tokens=1000
+    )
+
+def cohort_standing(cohort):
+    """One prompt line placing the candidate in the assessment's cohort"""
+    if not cohort or cohort['cohortSize'] < 2:
+        return 'N/A (first candidate for this assessment)'
+    line = f"{cohort['percentileRank']:.0f}th percentile of {cohort['cohortSize']} candidates"
+    if cohort['zScore'] is not None:
+        line += f" (z = {cohort['zScore']:+.2f})"
+    if cohort['fasterThanPercent'] is not None:
+        line += f", finished faster than {cohort['fasterThanPercent']:.0f}% of them"
+    return line
+
+def candidate_analysis_completion(data):
+    """Groq chat completion arguments for /analyze-candidate"""
+    assessment = data.get('assessment')
+    submission = data.get('submission')
+    candidate = data.get('candidate')
+    job_description = data.get('jobDescription', '')
+    
+    prompt = f"""
+    Analyze this candidate's assessment performance and provide a comprehensive evaluation:
+    
+    Candidate: {candidate.get('name', 'Unknown')} ({candidate.get('email', 'No email')})
+    Assessment: {assessment.get('title', 'Unknown')} - {assessment.get('jobRole', 'No role')}
+    Score: {submission.get('score', 0)}% (Passing: {assessment.get('passingScore', 70)}%)
+    Time Spent: {submission.get('timeSpent', 'N/A')} minutes
+    Violations: {submission.get('violations', 0)}
+    Cohort: {cohort_standing(data.get('cohort'))}
+    
+    Job Description: {job_description}
+    
+    Provide a JSON response with this structure:
+    {{
+        "skillsMatch": 85,
+        "overallScore": {submission.get('score', 0)},
+        "overallAssessment": "Overall assessment summary",
+        "strengths": ["Strength 1", "Strength 2"],
+        "areasForImprovement": ["Area 1", "Area 2"],
+        "recommendation": "Final recommendation for hiring"
+    }}
+    
+    Analyze the candidate's performance, skills match with the job requirements, and provide
+    actionable insights for the hiring team.
+    """
+    
+    return dict(
+        messages=[{"role": "user", "content": prompt}],
+        model=LARGE_MODEL,
+        temperature=0.3,
+        max_tokens=1500
+    )
+
+# operation -> (completion arguments builder, error when the reply has no JSON object)
+LLM_OPERATIONS = {
+    'generate_assessment': (assessment_completion, "Failed to generate valid assessment format"),
+    'violation_report': (violation_report_completion, "Failed to generate valid report format"),
+    'analyze_candidate': (candidate_analysis_completion, "Failed to generate valid analysis format"),
+}
+
+def extract_json(content, operation):
+    """(data, None) for the JSON object in an LLM reply, or (None, error message)"""
+    with span('parse'):
+        # Extract JSON from the response
+        json_start = content.find('{')
+        json_end = content.rfind('}') + 1
+        
+        if json_start == -1 or json_end == 0:
+            JSON_PARSE_FAILURES.labels(operation).inc()
+            return None, LLM_OPERATIONS[operation][1]
+        
+        try:
+            return json.loads(content[json_start:json_end]), None
+        except json.JSONDecodeError as e:
+            JSON_PARSE_FAILURES.labels(operation).inc()
+            return None, f"Failed to parse AI response: {str(e)}"
+
+def routed_completion(operation, data):
+    """(result, error) from the first model in the routing plan whose reply parses and validates"""
+    build_completion, _ = LLM_OPERATIONS[operation]
+    completion_args = build_completion(data)
+
+    def complete(model):
+        with span('groq'):
+            chat_completion = track_completion(
+                groq_client().chat.completions.create, operation, **dict(completion_args, model=model)
+            )
+        return chat_completion.choices[0].message.content
+
+    return routed(escalation(operation, data, lambda content: extract_json(content, operation)), complete)
+
+def streamed_content(operation, completion_args, model, cancelled):
+    """Reply text of one streamed completion, or None once `cancelled` is set (the stream is closed)"""
+    stream = track_completion(groq_client().chat.completions.create, operation,
+                              **dict(completion_args, model=model, stream=True))
+    parts = []
+    try:
+        for chunk in stream:
+            if cancelled.is_set():
+                return None
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+    finally:
+        stream.close()
+    return ''.join(parts)
+
+def speculative_assessment(data, cancelled):
+    """routed_completion('generate_assessment') for a prefetch: streamed, so cancelling stops generation"""
+    operation = 'generate_assessment'
+    completion_args = assessment_completion(data)
+    route = escalation(operation, data, lambda content: extract_json(content, operation), timed=False)
+    # Own label, so speculative spend shows separately in groq_tokens / groq_cost_usd
+    return routed(route, lambda model: streamed_content('prefetch_assessment', completion_args, model, cancelled))
+
+def claim_llm_result(operation, data):
+    """A prefetched result for this request, or None to generate as usual"""
+    if operation == 'generate_assessment' and data.get('prefetchId'):
+        return prefetcher.claim(data['prefetchId'], data)
+    return None
+
+def llm_request_data(operation, data):
+    """Request body as the model sees it: violation reports use server-side face presence,
+    candidate analyses get the attempt's standing in its cohort"""
+    if operation == 'violation_report':
+        span = attempt_store.span(data['assignmentId']) if data.get('assignmentId') else None
+        return face_analyzer.merge_violations(data, *(span or ()))
+    if operation == 'analyze_candidate' and data.get('attemptId'):
+        cohort = cohort_stats.rank_attempt(data['attemptId'])
+        if cohort:
+            return dict(data, cohort=cohort)
+    return data
+
+def record_llm_result(operation, data, result):
+    """Keep candidate analyses with their attempt, for cohort exports"""
+    if operation == 'analyze_candidate' and data.get('attemptId'):
+        attempt_store.record_analysis(data['attemptId'], result)
+
+def run_llm_route(operation):
+    """Shared body of the routes that turn one Groq completion into a JSON response"""
     try:
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_USER
-        msg['To'] = to_email
-        msg['Subject'] = subject
+        data = request.json
+        result = claim_llm_result(operation, data)
+        if result is None:
+            result, error = routed_completion(operation, llm_request_data(operation, data))
+            if error:
+                return jsonify({"error": error}), 500
+        record_llm_result(operation, data, result)
+        
+        with span('serialize'):
+            return jsonify(result)
+        
+    except Exception as e:
+        print(f"Error in {operation}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-        msg.attach(MIMEText(message, 'plain'))
+@bp.route('/generate-assessment', methods=['POST'])
+def generate_assessment():
+    return run_llm_route('generate_assessment')
 
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
+@bp.route('/generate-assessment/prefetch', methods=['POST'])
+def prefetch_assessment():
+    """Start generating in the background for form parameters that have stopped changing"""
+    try:
+        if not PREFETCH_ENABLED:
+            return jsonify({'prefetchId': None, 'status': 'skipped', 'reason': 'disabled'})
+        data = request.get_json(silent=True) or {}
+        if not str(data.get('jobRole') or '').strip():
+            return jsonify({"error": "jobRole is required"}), 400
+        client, _ = identify(request.headers, request.remote_addr)
+        prefetch_id, status = prefetcher.start(client, data, speculative_assessment, data.get('replaces'))
+        if prefetch_id is None:
+            return jsonify({'prefetchId': None, 'status': 'skipped', 'reason': status})
+        return jsonify({'prefetchId': prefetch_id, 'status': status}), 202 if status == 'started' else 200
         
-        return True
     except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
+        return jsonify({"error": str(e)}), 500
 
-@app.route('/generate-assessment', methods=['POST'])
-def generate_assessment():
+@bp.route('/generate-assessment/prefetch/<prefetch_id>', methods=['DELETE'])
+def cancel_prefetch(prefetch_id):
+    if not prefetcher.cancel(prefetch_id):
+        return jsonify({"error": "Unknown or already claimed prefetch"}), 404
+    return jsonify({'prefetchId': prefetch_id, 'status': 'cancelled'})
+
+def llm_grade_answers(items):
+    """Ask the LLM to grade borderline free-text answers in one call"""
     try:
-        data = request.json
-        job_role = data.get('jobRole', 'Software Developer')
-        assessment_type = data.get('type', 'multiple_choice')
-        difficulty = data.get('difficulty', 'intermediate')
-        num_questions = data.get('numberOfQuestions', 5)
+        answers_block = json.dumps([
+            {"index": i, "question": item['question'], "reference": item['reference'], "answer": item['answer']}
+            for i, item in enumerate(items)
+        ], indent=2)
         
         prompt = f"""
-        Create a {assessment_type} assessment for a {job_role} position with {difficulty} difficulty level.
-        Generate {num_questions} questions.
+        Grade these candidate answers against their reference answers.
+        An answer is correct if it conveys the same key points as the reference, even if worded differently.
         
-        The assessment should include:
-        - Clear instructions
-        - Relevant questions for the role
-        - Appropriate difficulty level
-        - Answer key or evaluation criteria
+        Answers:
+        {answers_block}
         
         Return the response as a JSON object with this structure:
         {{
-            "title": "Assessment title",
-            "description": "Assessment description",
-            "jobRole": "{job_role}",
-            "type": "{assessment_type}",
-            "difficulty": "{difficulty}",
-            "questions": [
-                {{
-                    "id": "q1",
-                    "question": "Question text",
-                    "type": "multiple_choice",
-                    "options": ["Option1", "Option2", "Option3", "Option4"],
-                    "correctAnswer": "0",
-                    "codeTemplate": "",
-                    "testCases": []
-                }}
-            ],
-            "timeLimit": 30,
-            "passingScore": 70
+            "grades": [
+                {{"index": 0, "correct": true}}
+            ]
         }}
         """
         
-        # Call Groq API
-        chat_completion = client.chat.completions.create(
+        chat_completion = track_completion(
+            groq_client().chat.completions.create, 'grade_answers',
             messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=4000
+            model=LARGE_MODEL,
+            temperature=0,
+            max_tokens=50 + 20 * len(items)
         )
         
         content = chat_completion.choices[0].message.content
-        print("GROQ API Response:", content)  # Debug output
-        
-        # Extract JSON from the response
         json_start = content.find('{')
         json_end = content.rfind('}') + 1
-        
-        if json_start == -1 or json_end == 0:
-            return jsonify({"error": "Failed to generate valid assessment format"}), 500
-            
-        json_str = content[json_start:json_end]
-        
         try:
-            assessment_data = json.loads(json_str)
-        except json.JSONDecodeError as e:
-            return jsonify({"error": f"Failed to parse AI response: {str(e)}"}), 500
-        
-        return jsonify(assessment_data)
+            grades = json.loads(content[json_start:json_end]).get('grades', [])
+        except json.JSONDecodeError:
+            JSON_PARSE_FAILURES.labels('grade_answers').inc()
+            raise
+        
+        verdicts = [None] * len(items)
+        for grade in grades:
+            index = grade.get('index')
+            if isinstance(index, int) and 0 <= index < len(items):
+                verdicts[index] = bool(grade.get('correct'))
+        return verdicts
         
     except Exception as e:
-        print(f"Error in generate_assessment: {str(e)}")  # Debug output
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/evaluate-submission', methods=['POST'])
-def evaluate_submission():
-    try:
-        data = request.json
-        questions = data.get('questions', [])
-        answers = data.get('answers', {})
-        
+        print(f"Error in llm_grade_answers: {str(e)}")
+        return [None] * len(items)
+
+def grade_free_text(items):
+    """Similarity grading of free-text answers, with borderline ones sent to the LLM in one call"""
+    with span('free_text'):
+        return free_text_grader.grade_batch(items, escalate=llm_grade_answers)
+
+def grade_submissions(questions, submissions):
+    """Grade a list of answer dicts; free-text answers are graded in one batch"""
+    all_results = []
+    free_text_items = []
+    
+    for submission_index, answers in enumerate(submissions):
         results = []
-        score = 0
-        
         for question in questions:
             question_id = question['id']
             user_answer = answers.get(question_id, '')
             correct_answer = question.get('correctAnswer', '')
             
-            if user_answer == correct_answer:
-                score += 1
-                results.append({
-                    'questionId': question_id,
-                    'correct': True,
-                    'feedback': 'Correct answer'
-                })
-            else:
-                results.append({
+            result = grade_answer(question_id, correct_answer, user_answer)
+            if not result['correct'] and is_free_text(question):
+                free_text_items.append({
                     'questionId': question_id,
-                    'correct': False,
-                    'feedback': f'Expected: {correct_answer}, Got: {user_answer}'
+                    'question': question.get('question', ''),
+                    'reference': reference_text(question),
+                    'answer': str(user_answer),
+                    'position': (submission_index, len(results))
                 })
-        
-        total_questions = len(questions)
-        percentage = (score / total_questions) * 100 if total_questions > 0 else 0
-        
-        return jsonify({
-            'score': score,
-            'totalQuestions': total_questions,
-            'percentage': percentage,
-            'passed': percentage >= data.get('passingScore', 70),
-            'results': results
-        })
-        
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+            results.append(result)
+        all_results.append(results)
+    
+    if free_text_items:
+        graded = grade_free_text(free_text_items)
+        for item, result in zip(free_text_items, graded):
+            submission_index, position = item['position']
+            all_results[submission_index][position] = result
+    
+    return all_results
 
-@app.route('/generate-violation-report', methods=['POST'])
-def generate_violation_report():
+@bp.route('/evaluate-submission', methods=['POST'])
+def evaluate_submission():
     try:
         data = request.json
-        assignment_id = data.get('assignmentId')
-        violations = data.get('violations', [])
-        
-        prompt = f"""
-        Analyze these proctoring violations for an assessment and generate a comprehensive report:
-        
-        Assignment ID: {assignment_id}
-        Total Violations: {len(violations)}
-        
-        Violations:
-        {json.dumps(violations, indent=2)}
-        
-        Provide a JSON response with this structure:
-        {{
-            "summary": "Brief summary of the findings",
-            "severityBreakdown": {{
-                "low": 0,
-                "medium": 0,
-                "high": 0
-            }},
-            "recommendations": [
-                "Recommendation 1",
-                "Recommendation 2"
-            ],
-            "confidence": "high|medium|low"
-        }}
-        
-        Analyze patterns, frequency, and severity of violations to provide meaningful insights.
-        """
-        
-        # Call Groq API
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile", 
-            temperature=0.3,  # Lower temperature for more factual responses
-            max_tokens=1000
-        )
-        
-        content = chat_completion.choices[0].message.content
+        questions = data.get('questions', [])
+        answers = data.get('answers', {})
         
-        # Extract JSON from the response
-        json_start = content.find('{')
-        json_end = content.rfind('}') + 1
+        # A variant is graded against the key rebuilt from its id, not one sent by the client
+        variant = variant_store.get(data.get('assessmentId'), data['variantId']) if data.get('variantId') else None
+        if variant is not None:
+            questions = variant.questions
         
-        if json_start == -1 or json_end == 0:
-            return jsonify({"error": "Failed to generate valid report format"}), 500
-            
-        json_str = content[json_start:json_end]
+        results = grade_submissions(questions, [answers])[0]
+        score = sum(1 for result in results if result['correct'])
         
-        try:
-            report_data = json.loads(json_str)
-        except json.JSONDecodeError as e:
-            return jsonify({"error": f"Failed to parse AI response: {str(e)}"}), 500
+        # Update live item statistics for this assessment, in the pool's option numbering
+        if data.get('assessmentId'):
+            item_stats.record_submission(data['assessmentId'], results,
+                                         variant.pool_answers(answers) if variant else answers,
+                                         option_counts(questions))
         
-        return jsonify(report_data)
+        summary = build_summary(results, score, len(questions), data.get('passingScore', 70))
+        if variant is not None:
+            summary['variantId'] = variant.variant_id
+        return jsonify(summary)
         
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
     except Exception as e:
-        print(f"Error in generate_violation_report: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/analyze-candidate', methods=['POST'])
-def analyze_candidate():
+@bp.route('/grade-free-text', methods=['POST'])
+def grade_free_text_cohort():
     try:
         data = request.json
-        assessment = data.get('assessment')
-        submission = data.get('submission')
-        candidate = data.get('candidate')
-        job_description = data.get('jobDescription', '')
-        
-        prompt = f"""
-        Analyze this candidate's assessment performance and provide a comprehensive evaluation:
-        
-        Candidate: {candidate.get('name', 'Unknown')} ({candidate.get('email', 'No email')})
-        Assessment: {assessment.get('title', 'Unknown')} - {assessment.get('jobRole', 'No role')}
-        Score: {submission.get('score', 0)}% (Passing: {assessment.get('passingScore', 70)}%)
-        Time Spent: {submission.get('timeSpent', 'N/A')} minutes
-        Violations: {submission.get('violations', 0)}
-        
-        Job Description: {job_description}
-        
-        Provide a JSON response with this structure:
-        {{
-            "skillsMatch": 85,
-            "overallScore": {submission.get('score', 0)},
-            "overallAssessment": "Overall assessment summary",
-            "strengths": ["Strength 1", "Strength 2"],
-            "areasForImprovement": ["Area 1", "Area 2"],
-            "recommendation": "Final recommendation for hiring"
-        }}
-        
-        Analyze the candidate's performance, skills match with the job requirements, and provide
-        actionable insights for the hiring team.
-        """
-        
-        # Call Groq API
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=1500
-        )
-        
-        content = chat_completion.choices[0].message.content
-        
-        # Extract JSON from the response
-        json_start = content.find('{')
-        json_end = content.rfind('}') + 1
+        questions = data.get('questions', [])
+        submissions = data.get('submissions', [])
+        passing_score = data.get('passingScore', 70)
         
-        if json_start == -1 or json_end == 0:
-            return jsonify({"error": "Failed to generate valid analysis format"}), 500
-            
-        json_str = content[json_start:json_end]
+        graded = grade_submissions(questions, [s.get('answers', {}) for s in submissions])
         
-        try:
-            analysis_data = json.loads(json_str)
-        except json.JSONDecodeError as e:
-            return jsonify({"error": f"Failed to parse AI response: {str(e)}"}), 500
+        summaries = []
+        for submission, results in zip(submissions, graded):
+            score = sum(1 for result in results if result['correct'])
+            summary = build_summary(results, score, len(questions), passing_score)
+            summary['submissionId'] = submission.get('submissionId')
+            summaries.append(summary)
         
-        return jsonify(analysis_data)
+        return jsonify({'submissions': summaries})
         
     except Exception as e:
-        print(f"Error in analyze_candidate: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/send-assessment-email', methods=['POST'])
-def send_assessment_email():
+@bp.route('/free-text/calibrate', methods=['POST'])
+@interviewer_required
+def calibrate_free_text():
+    """Store a new accept threshold for every worker, fitted to interviewer-labelled examples"""
     try:
         data = request.json
-        assessment = data.get('assessment')
-        candidate_email = data.get('candidateEmail')
-        email_type = data.get('type', 'assigned')
+        examples = data.get('examples', [])
+        scores = free_text_grader.similarities([(e.get('reference', ''), e.get('answer', '')) for e in examples])
+        threshold = free_text_grader.calibrate(scores, [bool(e.get('correct')) for e in examples],
+                                               g.interviewer['uid'])
+        return jsonify({'acceptThreshold': threshold, 'examples': len(examples)})
         
-        if email_type == 'assigned':
-            subject = f"Assessment Invitation: {assessment.get('title', '')}"
-            message = f"""Dear Candidate,
-
-You have been invited to take the assessment: {assessment.get('title', '')}
-
-Description: {assessment.get('description', '')}
-Time Limit: {assessment.get('timeLimit', 30)} minutes
-Job Role: {assessment.get('jobRole', '')}
-
-Please log in to your account to complete the assessment.
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-Best regards,
-Assessment Team
-"""
-        else: # completed
-            subject = f"Assessment Completed: {assessment.get('title', '')}"
-            message = f"""Dear Candidate,
+@bp.route('/item-stats/<assessment_id>', methods=['GET'])
+def get_item_stats(assessment_id):
+    stats = item_stats.get(assessment_id)
+    if stats is None:
+        return jsonify({"error": "No graded submissions for this assessment"}), 404
+    return jsonify({'assessmentId': assessment_id, **stats})
 
-You have successfully completed the assessment: {assessment.get('title', '')}
+@bp.route('/cohort-stats/<assessment_id>', methods=['GET'])
+def get_cohort_stats(assessment_id):
+    try:
+        stats = cohort_stats.get(assessment_id)
+        if stats is None:
+            return jsonify({"error": "No finalized attempts for this assessment"}), 404
+        return jsonify({'assessmentId': assessment_id, **stats})
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-Your results will be reviewed by our team. You will be notified once the evaluation is complete.
+@bp.route('/cohort-stats/<assessment_id>/rank', methods=['GET'])
+def get_cohort_rank(assessment_id):
+    """Percentile rank and z-score of ?score= (with ?timeSpent=&timeLimit=), or of ?attemptId="""
+    try:
+        attempt_id = request.args.get('attemptId')
+        if attempt_id:
+            ranked = cohort_stats.rank_attempt(attempt_id)
+            if ranked and ranked['assessmentId'] != assessment_id:
+                return jsonify({"error": "Attempt belongs to another assessment"}), 400
+        else:
+            try:
+                score = float(request.args['score'])
+                used = time_used(request.args.get('timeSpent', type=float), request.args.get('timeLimit', type=float))
+            except (KeyError, ValueError):
+                return jsonify({"error": "score or attemptId is required"}), 400
+            ranked = cohort_stats.rank(assessment_id, score, used)
+        if ranked is None:
+            return jsonify({"error": "No finalized attempts for this assessment"}), 404
+        return jsonify(dict(ranked, assessmentId=assessment_id))
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-Thank you for your participation.
+@bp.route('/cohort-stats/<assessment_id>/recompute', methods=['POST'])
+@interviewer_required
+def recompute_cohort_stats(assessment_id):
+    """Rebuild one assessment's cohort index from the attempt store"""
+    try:
+        cohort_stats.backfill(assessment_id)
+        stats = cohort_stats.get(assessment_id)
+        if stats is None:
+            return jsonify({"error": "No finalized attempts for this assessment"}), 404
+        return jsonify({'assessmentId': assessment_id, **stats})
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-Best regards,
-Assessment Team
-"""
+@bp.route('/cohort-stats/recompute', methods=['POST'])
+@interviewer_required
+def recompute_all_cohort_stats():
+    """Backfill: rebuild every assessment's cohort index in one batch"""
+    try:
+        built = cohort_stats.backfill_all()
+        return jsonify({'assessments': len(built), 'submissions': sum(built.values())})
         
-        success = send_email(candidate_email, subject, message)
-        return jsonify({'success': success})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/adaptive/pools/<pool_id>', methods=['POST'])
+def register_item_pool(pool_id):
+    try:
+        data = request.json
+        # Questions without their own IRT parameters are calibrated from the assessment's live item stats
+        stats = item_stats.get(data['assessmentId']) if data.get('assessmentId') else None
+        pool = adaptive_engine.register_pool(pool_id, data.get('questions', []), stats)
+        return jsonify({'poolId': pool_id, 'items': len(pool.questions), 'calibrated': pool.calibrated})
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in send_assessment_email: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+        return jsonify({"error": str(e)}), 500
 
-@app.route('/send-result-email', methods=['POST'])
-def send_result_email():
+@bp.route('/adaptive/attempts/<attempt_id>/start', methods=['POST'])
+def start_adaptive_attempt(attempt_id):
     try:
         data = request.json
-        assessment = data.get('assessment')
-        submission = data.get('submission')
-        candidate = data.get('candidate')
+        step = adaptive_engine.start(
+            attempt_id,
+            data.get('poolId'),
+            se_threshold=float(data.get('seThreshold', 0.4)),
+            min_items=int(data.get('minItems', 3)),
+            max_items=int(data.get('maxItems', 20))
+        )
+        return jsonify(step)
         
-        subject = f"Assessment Results: {assessment.get('title', '')}"
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/adaptive/attempts/<attempt_id>/answer', methods=['POST'])
+def answer_adaptive_attempt(attempt_id):
+    try:
+        data = request.json
+        return jsonify(adaptive_engine.answer(attempt_id, data.get('questionId'), data.get('answer', '')))
         
-        if submission.get('passed'):
-            message = f"""Dear {candidate.get('name', 'Candidate')},
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-Congratulations! You have passed the assessment: {assessment.get('title', '')}
+@bp.route('/attempts/<attempt_id>/start', methods=['POST'])
+def start_attempt(attempt_id):
+    try:
+        data = request.json
+        questions = data.get('questions', [])
+        if data.get('variantId'):
+            questions = variant_store.get(data.get('assessmentId'), data['variantId']).questions
+        state = attempt_store.start(attempt_id, questions, data.get('passingScore', 70),
+                                    data.get('assessmentId'), data.get('candidate'), data.get('variantId'))
+        return jsonify({'attemptId': attempt_id, 'answered': len(state.answers), 'totalQuestions': len(state.order)})
+        
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-Your score: {submission.get('score', 0)}%
-Time spent: {submission.get('timeSpent', 'N/A')} minutes
+@bp.route('/attempts/<attempt_id>/answer', methods=['POST'])
+def autosave_answer(attempt_id):
+    try:
+        data = request.json
+        question_id = data.get('questionId')
+        if not question_id:
+            return jsonify({"error": "questionId is required"}), 400
+        return jsonify(attempt_store.answer(attempt_id, question_id, data.get('answer', '')))
+        
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-We will be in touch regarding the next steps in the process.
+def record_attempt_items(attempt_id, result):
+    """Fold a finalized attempt into its assessment's item statistics, in the pool's option numbering"""
+    attempt = attempt_store.responses(attempt_id)
+    if not attempt or not attempt['assessment_id']:
+        return
+    answers = attempt['answers']
+    if attempt['variant_id']:
+        answers = variant_store.get(attempt['assessment_id'], attempt['variant_id']).pool_answers(answers)
+    # Shuffling keeps each question's options, so the attempt's counts hold in the pool's numbering too
+    item_stats.record_submission(attempt['assessment_id'], result['results'], answers,
+                                 option_counts(attempt['questions']), attempt_id)
+
+@bp.route('/attempts/<attempt_id>/finalize', methods=['POST'])
+def finalize_attempt(attempt_id):
+    try:
+        data = request.get_json(silent=True) or {}
+        result = attempt_store.finalize(attempt_id, data, grade_free_text)
+        cohort_stats.record_attempt(attempt_id)
+        record_attempt_items(attempt_id, result)
+        # Finalized attempts are served from SQLite from now on
+        attempt_store.discard(attempt_id)
+        return jsonify(result)
+        
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-Best regards,
-Assessment Team
-"""
-        else:
-            message = f"""Dear {candidate.get('name', 'Candidate')},
+@bp.route('/proctoring/<assignment_id>/frames', methods=['POST'])
+def submit_proctoring_frames(assignment_id):
+    if not face_analysis_available():
+        return jsonify({"error": "Face analysis is not available on this server"}), 503
+    try:
+        data = request.json
+        frames = data.get('frames') or ([data] if data.get('image') else [])
+        if not frames:
+            return jsonify({"error": "frames is required"}), 400
+        return jsonify(face_analyzer.submit(assignment_id, frames)), 202
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-Thank you for completing the assessment: {assessment.get('title', '')}
+@bp.route('/proctoring/<assignment_id>/face-presence', methods=['GET'])
+def get_face_presence(assignment_id):
+    if not face_analysis_available():
+        return jsonify({"error": "Face analysis is not available on this server"}), 503
+    try:
+        # Proctoring sessions are keyed by attempt id; its span lets the timeline show windows without snapshots
+        span = attempt_store.span(assignment_id)
+        timeline = face_analyzer.timeline(assignment_id, start=span[0] if span else None,
+                                          end=span[1] if span else None)
+        if timeline is None:
+            return jsonify({"error": "No snapshots for this assignment"}), 404
+        return jsonify(timeline)
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/generate-violation-report', methods=['POST'])
+def generate_violation_report():
+    return run_llm_route('violation_report')
 
-Your score: {submission.get('score', 0)}%
-Time spent: {submission.get('timeSpent', 'N/A')} minutes
+@bp.route('/analyze-candidate', methods=['POST'])
+def analyze_candidate():
+    return run_llm_route('analyze_candidate')
 
-While you didn't meet the passing criteria this time, we encourage you to continue developing your skills.
+def __getattr__(name):
+    """`gunicorn ai:app` and `python ai.py` keep working; both serve the consolidated app"""
+    if name == 'app':
+        from app import create_app
+        return create_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-Best regards,
-Assessment Team
-"""
-        
-        success = send_email(candidate.get('email'), subject, message)
-        return jsonify({'success': success})
-        
-    except Exception as e:
-        print(f"Error in send_result_email: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/health', methods=['GET'])
-def health_check():
-    return jsonify({
-        "status": "ok", 
-        "message": "Backend is running",
-        "services": {
-            "ai_generation": "active",
-            "email_service": "active" if EMAIL_USER and EMAIL_PASSWORD else "inactive",
-            "violation_reporting": "active",
-            "candidate_analysis": "active"
-        }
-    })
-
-# Gunicorn configuration
 if __name__ == '__main__':
-    # Check if email service is configured
-    if not EMAIL_USER or not EMAIL_PASSWORD:
-        print("Warning: Email service not configured. Set EMAIL_USER and EMAIL_PASSWORD environment variables.")
-    
-    # For development
-    app.run(debug=True, port=5001, host='0.0.0.0')
-else:
-    # For production with Gunicorn
-    # This block will be executed when running with Gunicorn
-    pass
\ No newline at end of file
+    from app import create_app
+    create_app().run(debug=True, port=5001, host='0.0.0.0')
@@ -0,0 +1,119 @@
+# backend/app.py
+"""Single Flask app serving the AI and email routes with shared clients and pools.
+
+    flask --app app run --port 5001
+    gunicorn -c gunicorn.conf.py          # wsgi:app, preloaded in the master
+"""
+import os
+import logging
+import importlib
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+# Route modules read their configuration at import time
+load_dotenv()
+
+from flask import Flask, jsonify  # noqa: E402
+from flask_cors import CORS  # noqa: E402
+
+import ai  # noqa: E402
+from adaptive import adaptive_engine  # noqa: E402
+from admission import install_admission  # noqa: E402
+import auth  # noqa: E402
+import email_service  # noqa: E402
+import exports  # noqa: E402
+import face_presence  # noqa: E402
+from free_text import free_text_grader  # noqa: E402
+from grading import attempt_store  # noqa: E402
+from item_stats import item_stats  # noqa: E402
+from metrics import instrument_app  # noqa: E402
+import prefetch  # noqa: E402
+from profiling import install_profiler  # noqa: E402
+from responses import install_responses  # noqa: E402
+from smtp_pool import reset_pools  # noqa: E402
+import variants  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CORS_ORIGINS = [
+    origin.strip() for origin in os.environ.get(
+        'CORS_ORIGINS', 'http://localhost:5173,https://skills-v2-frontend.onrender.com'
+    ).split(',') if origin.strip()
+]
+
+# Imported on first use by the routes; a preloading master imports them once so workers share them
+DEFERRED_IMPORTS = ('groq', 'sklearn.feature_extraction.text', 'pandas')
+
+
+def health_check():
+    """Liveness plus configuration; never touches the lazily created clients"""
+    email_configured = email_service.email_service.validate_config()
+    return jsonify({
+        "status": "ok",
+        "message": "Backend is running",
+        "services": {
+            "ai_generation": "active" if ai.groq_configured() else "inactive",
+            "email_service": "active" if email_configured else "inactive",
+            "violation_reporting": "active",
+            "face_presence": "active" if face_presence.available() else "inactive",
+            "candidate_analysis": "active"
+        },
+        "email_configured": email_configured,
+        "smtp_server": email_service.SMTP_SERVER,
+        "smtp_port": email_service.SMTP_PORT,
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+def create_app(start_workers: bool = True) -> Flask:
+    app = Flask(__name__)
+    # Cohort exports report their attempt count, so the frontend can tell an incomplete server cohort
+    CORS(app, origins=CORS_ORIGINS, expose_headers=['X-Cohort-Attempts'])
+    instrument_app(app, 'backend')
+    install_profiler(app)
+    install_responses(app)
+    install_admission(app)
+
+    app.register_blueprint(ai.bp)
+    app.register_blueprint(email_service.bp)
+    app.register_blueprint(exports.bp)
+    app.register_blueprint(variants.bp)
+    app.add_url_rule('/health', 'health_check', health_check, methods=['GET'])
+    email_service.email_service.debug = app.debug
+
+    if not ai.groq_configured():
+        logger.warning("GROQ_API_KEY is not set; AI routes will return errors until it is.")
+    if not email_service.email_service.validate_config():
+        logger.warning("Email credentials not configured. Set EMAIL_USER and EMAIL_PASSWORD environment variables.")
+
+    if start_workers:
+        # Deliver anything left queued by a previous process
+        email_service.outbox.start()
+        email_service.coalescer.start()
+    return app
+
+
+def preload() -> None:
+    """Import the deferred modules up front (gunicorn master, before fork)"""
+    for module in DEFERRED_IMPORTS:
+        importlib.import_module(module)
+
+
+def post_fork() -> None:
+    """Per-worker clients, connections and background threads for an app created before fork"""
+    ai.reset_client()
+    auth.reset_app()
+    reset_pools()
+    email_service.email_service.reset_pool()
+    email_service.send_throttle.reset_connection()
+    attempt_store.reset_connection()
+    adaptive_engine.reset_connection()
+    item_stats.reset_connection()
+    free_text_grader.reset_connection()
+    variants.variant_store.reset_connection()
+    face_presence.face_analyzer.reset_pool()
+    prefetch.prefetcher.reset_pool()
+    email_service.outbox.start()
+    email_service.coalescer.start()
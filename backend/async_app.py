@@ -0,0 +1,275 @@
+# backend/async_app.py
+"""Async serving mode: one worker holds many Groq calls in flight.
+
+The Groq-bound routes run as native aiohttp handlers on AsyncGroq, sharing one pooled
+HTTP client per worker, so a slow upstream call costs a coroutine instead of a thread.
+Every other route (grading, attempts, email, /health, /metrics) goes to the regular Flask
+app on a thread pool, so CPU-bound work never blocks the event loop.
+
+    python async_app.py                      # port 5001
+    gunicorn -c gunicorn.conf.py "async_app:create_async_app()" --worker-class aiohttp.GunicornWebWorker
+"""
+import io
+import os
+import math
+import asyncio
+import sys
+import time
+import logging
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable
+from urllib.parse import unquote
+
+from aiohttp import web
+
+import email_service
+from admission import ADMISSION_ENABLED, ROUTE_CLASSES, FairQueue, admission, identify
+from app import create_app, CORS_ORIGINS
+from ai import LLM_OPERATIONS, claim_llm_result, extract_json, llm_request_data, record_llm_result
+from metrics import REQUEST_LATENCY, IN_FLIGHT, track_completion_async
+from model_routing import escalation, routed_async
+from prefetch import prefetcher
+from responses import COMPRESS_MIN_BYTES, dumps
+
+logger = logging.getLogger(__name__)
+
+# Upstream connections per worker; each in-flight generation holds one
+GROQ_MAX_CONNECTIONS = int(os.environ.get('GROQ_MAX_CONNECTIONS', 512))
+# Threads running the Flask routes
+ASYNC_WSGI_THREADS = int(os.environ.get('ASYNC_WSGI_THREADS', 8))
+
+# Waiting here costs a coroutine, not a thread, so the LLM queue can be far deeper than
+# admission.py's thread-sized default; rate limits are shared with the Flask routes
+LLM_QUEUE = FairQueue(dataclasses.replace(
+    ROUTE_CLASSES['llm'],
+    concurrency=int(os.environ.get('ASYNC_LLM_CONCURRENCY', GROQ_MAX_CONNECTIONS)),
+    max_waiting=int(os.environ.get('ASYNC_LLM_QUEUE', 4 * GROQ_MAX_CONNECTIONS)),
+))
+
+# path -> operation in ai.LLM_OPERATIONS
+NATIVE_ROUTES = {
+    '/generate-assessment': 'generate_assessment',
+    '/generate-violation-report': 'violation_report',
+    '/analyze-candidate': 'analyze_candidate',
+}
+
+GROQ_CLIENT = web.AppKey('groq_client', object)
+WSGI_EXECUTOR = web.AppKey('wsgi_executor', ThreadPoolExecutor)
+
+
+async def _open_groq_client(app: web.Application) -> AsyncIterator[None]:
+    """One AsyncGroq client per worker, its connection pool sized for many in-flight calls"""
+    groq_api_key = os.environ.get("GROQ_API_KEY")
+    if not groq_api_key:
+        logger.warning("GROQ_API_KEY is not set; AI routes will return errors until it is.")
+        app[GROQ_CLIENT] = None
+    else:
+        import httpx
+        from groq import AsyncGroq, DefaultAsyncHttpxClient
+        app[GROQ_CLIENT] = AsyncGroq(
+            api_key=groq_api_key,
+            base_url=os.environ.get("GROQ_BASE_URL") or None,
+            http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS, max_keepalive_connections=GROQ_MAX_CONNECTIONS
+            ))
+        )
+    yield
+    if app[GROQ_CLIENT] is not None:
+        await app[GROQ_CLIENT].close()
+
+
+async def _start_delivery(app: web.Application) -> None:
+    """Email delivery threads run in the serving process, never in a preloading gunicorn master"""
+    email_service.outbox.start()
+    email_service.coalescer.start()
+
+
+async def routed_completion(client, operation: str, data: dict):
+    """Async version of ai.routed_completion"""
+    build_completion, _ = LLM_OPERATIONS[operation]
+    completion_args = build_completion(data)
+
+    async def complete(model: str) -> str:
+        chat_completion = await track_completion_async(
+            client.chat.completions.create, operation, **dict(completion_args, model=model)
+        )
+        return chat_completion.choices[0].message.content
+
+    return await routed_async(escalation(operation, data, lambda content: extract_json(content, operation)), complete)
+
+
+def llm_handler(operation: str) -> Callable:
+    """Native async version of ai.run_llm_route"""
+
+    async def handle(request: web.Request) -> web.Response:
+        try:
+            client = request.app[GROQ_CLIENT]
+            if client is None:
+                raise ValueError("GROQ_API_KEY environment variable is not set")
+            # The request/result hooks touch SQLite (and may wait on face analysis or a prefetch), so they run off the loop
+            loop = asyncio.get_running_loop()
+            executor = request.app[WSGI_EXECUTOR]
+            data = await request.json()
+            result = await loop.run_in_executor(executor, claim_llm_result, operation, data)
+            if result is None:
+                prepared = await loop.run_in_executor(executor, llm_request_data, operation, data)
+                result, error = await routed_completion(client, operation, prepared)
+                if error:
+                    return web.json_response({"error": error}, status=500)
+            await loop.run_in_executor(executor, record_llm_result, operation, data, result)
+            return web.json_response(result, dumps=dumps)
+        except Exception as e:
+            print(f"Error in {operation}: {str(e)}")
+            return web.json_response({"error": str(e)}, status=500)
+
+    return handle
+
+
+def too_many_requests(retry_after: float, headers: dict, reason: str) -> web.Response:
+    seconds = max(1, math.ceil(retry_after))
+    return web.json_response({'error': reason, 'retryAfter': seconds}, status=429,
+                             headers={'Retry-After': str(seconds), **headers})
+
+
+async def admit(request: web.Request, handler: Callable) -> web.StreamResponse:
+    """admission.install_admission for the native routes, waiting on the event loop"""
+    client, weight = identify(request.headers, request.remote)
+    retry_after, headers = admission.check(client, 'llm')
+    if retry_after is not None:
+        return too_many_requests(retry_after, headers, 'Rate limit exceeded')
+    granted = asyncio.get_running_loop().create_future()
+
+    def notify():
+        if not granted.done():
+            granted.set_result(None)
+
+    ticket = LLM_QUEUE.enter(client, weight, notify)
+    if ticket is None:
+        return too_many_requests(1, headers, 'Too many requests queued')
+    try:
+        if not ticket.granted:
+            try:
+                await asyncio.wait_for(granted, LLM_QUEUE.limits.queue_timeout)
+            except asyncio.TimeoutError:
+                return too_many_requests(LLM_QUEUE.limits.queue_timeout, headers, 'Timed out waiting for capacity')
+        response = await handler(request)
+        for name, value in headers.items():
+            response.headers.setdefault(name, value)
+        return response
+    finally:
+        LLM_QUEUE.release(ticket)
+
+
+@web.middleware
+async def native_route_middleware(request: web.Request, handler: Callable) -> web.StreamResponse:
+    """Admission, metrics, compression and CORS for the native routes; the Flask app does these for bridged ones"""
+    if request.path not in NATIVE_ROUTES or request.method != 'POST':
+        return await handler(request)
+    in_flight = IN_FLIGHT.labels('backend')
+    in_flight.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await (admit(request, handler) if ADMISSION_ENABLED else handler(request))
+        status = response.status
+        if response.body is not None and len(response.body) >= COMPRESS_MIN_BYTES:
+            # gzip or deflate per Accept-Encoding; aiohttp has no brotli encoder
+            response.enable_compression()
+        origin = request.headers.get('Origin')
+        if origin in CORS_ORIGINS:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Vary'] = 'Origin'
+        return response
+    finally:
+        in_flight.dec()
+        REQUEST_LATENCY.labels('backend', request.path, request.method, str(status)).observe(
+            time.perf_counter() - start
+        )
+
+
+class WSGIBridge:
+    """Serves a WSGI app from aiohttp, running it (and any streamed body) on a thread pool"""
+
+    def __init__(self, wsgi_app: Callable):
+        self.wsgi_app = wsgi_app
+
+    def environ(self, request: web.Request, body: bytes) -> dict:
+        host, _, port = (request.host or 'localhost').partition(':')
+        environ = {
+            'REQUEST_METHOD': request.method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote(request.raw_path.split('?', 1)[0], encoding='latin-1'),
+            'QUERY_STRING': request.query_string,
+            'SERVER_NAME': host,
+            'SERVER_PORT': port or ('443' if request.scheme == 'https' else '80'),
+            'SERVER_PROTOCOL': f'HTTP/{request.version.major}.{request.version.minor}',
+            'REMOTE_ADDR': request.remote or '',
+            'CONTENT_TYPE': request.headers.get('Content-Type', ''),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': request.scheme,
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name in request.headers.keys():
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            if key not in ('HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH') and key not in environ:
+                environ[key] = ','.join(request.headers.getall(name))
+        return environ
+
+    async def __call__(self, request: web.Request) -> web.StreamResponse:
+        loop = asyncio.get_running_loop()
+        executor = request.app[WSGI_EXECUTOR]
+        environ = self.environ(request, await request.read())
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = status
+            started['headers'] = headers
+
+        def call():
+            result = self.wsgi_app(environ, start_response)
+            return result, iter(result)
+
+        result, chunks = await loop.run_in_executor(executor, call)
+        try:
+            status = started['status']
+            response = web.StreamResponse(status=int(status[:3]), reason=status[4:] or None)
+            for name, value in started['headers']:
+                response.headers.add(name, value)
+            await response.prepare(request)
+            while True:
+                # NDJSON streams (bulk email) produce chunks as sends finish
+                chunk = await loop.run_in_executor(executor, next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await response.write(chunk)
+            await response.write_eof()
+            return response
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                await loop.run_in_executor(executor, close)
+
+
+def create_async_app() -> web.Application:
+    flask_app = create_app(start_workers=False)
+    app = web.Application(middlewares=[native_route_middleware], client_max_size=32 * 1024 ** 2)
+    app[WSGI_EXECUTOR] = ThreadPoolExecutor(max_workers=ASYNC_WSGI_THREADS, thread_name_prefix='wsgi')
+    # Native LLM routes queue here, not in admission.py; speculation yields to them too
+    prefetcher.busy_queues.append(LLM_QUEUE)
+    app.on_startup.append(_start_delivery)
+    app.cleanup_ctx.append(_open_groq_client)
+    for path, operation in NATIVE_ROUTES.items():
+        app.router.add_post(path, llm_handler(operation))
+    app.router.add_route('*', '/{path:.*}', WSGIBridge(flask_app.wsgi_app))
+    return app
+
+
+if __name__ == '__main__':
+    web.run_app(create_async_app(), port=int(os.environ.get('PORT', 5001)))
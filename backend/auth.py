@@ -0,0 +1,100 @@
+# backend/auth.py
+"""Firebase ID token checks for routes that expose candidate data or change shared settings.
+
+The frontend sends `Authorization: Bearer <ID token>` (auth.currentUser.getIdToken()). Tokens are
+verified with firebase-admin against FIREBASE_PROJECT_ID, and the caller's role and assessment
+ownership are read from Firestore the way the frontend writes them: users/<uid>.role and
+assessments/<id>.createdBy. Service credentials come from GOOGLE_APPLICATION_CREDENTIALS (or the
+platform's default credentials). Without firebase-admin installed these routes answer 503.
+"""
+import os
+import logging
+import threading
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from flask import g, jsonify, request
+
+try:
+    import firebase_admin
+    from firebase_admin import auth as firebase_auth, firestore
+except ImportError:
+    firebase_admin = None
+
+logger = logging.getLogger(__name__)
+
+FIREBASE_PROJECT_ID = os.environ.get('FIREBASE_PROJECT_ID', 'skill-asseser')
+
+# Created on first use, so a preloading gunicorn master never opens Firestore channels
+_app = None
+_app_lock = threading.Lock()
+
+
+class AuthError(Exception):
+    """Request refused; status is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status: int = 401):
+        super().__init__(message)
+        self.status = status
+
+
+def available() -> bool:
+    return firebase_admin is not None
+
+
+def firebase_app():
+    global _app
+    if firebase_admin is None:
+        raise AuthError('Authentication is not available on this server', 503)
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = firebase_admin.initialize_app(options={'projectId': FIREBASE_PROJECT_ID}, name='backend')
+    return _app
+
+
+def reset_app() -> None:
+    """Drop an app inherited from a preloading master; its gRPC channels are not fork-safe"""
+    global _app, _app_lock
+    _app = None
+    _app_lock = threading.Lock()
+
+
+def authenticate(authorization: Optional[str]) -> Dict[str, Any]:
+    """{uid, email} of a verified interviewer; AuthError otherwise"""
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        raise AuthError('Sign in required')
+    app = firebase_app()
+    try:
+        claims = firebase_auth.verify_id_token(token, app=app)
+    except Exception as e:
+        logger.info(f"Rejected ID token: {e}")
+        raise AuthError('Invalid or expired sign-in')
+    profile = firestore.client(app).collection('users').document(claims['uid']).get()
+    if not profile.exists or (profile.to_dict() or {}).get('role') != 'interviewer':
+        raise AuthError('Interviewer account required', 403)
+    return {'uid': claims['uid'], 'email': claims.get('email')}
+
+
+def owns_assessment(uid: str, assessment_id: str) -> bool:
+    snapshot = firestore.client(firebase_app()).collection('assessments').document(assessment_id).get()
+    return snapshot.exists and (snapshot.to_dict() or {}).get('createdBy') == uid
+
+
+def interviewer_required(view):
+    """Route decorator: 401/403/503 unless a signed-in interviewer calls; the caller is in g.interviewer.
+
+    With an assessment_id route argument, that assessment must also be the caller's own.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            g.interviewer = authenticate(request.headers.get('Authorization'))
+            assessment_id = kwargs.get('assessment_id')
+            if assessment_id is not None and not owns_assessment(g.interviewer['uid'], assessment_id):
+                raise AuthError('Not your assessment', 403)
+        except AuthError as e:
+            return jsonify({"error": str(e)}), e.status
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,90 @@
+# backend/bench/bench_cohort.py
+"""Cohort analytics: rank lookup and incremental insert cost by cohort size, and batch rebuild time.
+
+Lookups go through CohortIndex.rank (bisect over the sorted index) and are compared with a
+linear scan of the same scores. Rebuilds seed finalized attempts straight into a scratch attempt
+store and time the pandas recompute the backfill route runs.
+
+Usage (from backend/):
+    python bench/bench_cohort.py --sizes 1000 10000 100000 --output cohort.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from common import environment, write_results
+
+
+def per_call_us(fn, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return round((time.perf_counter() - start) / len(args_list) * 1e6, 2)
+
+
+def seed(store, assessment_id: str, scores: np.ndarray, used: np.ndarray) -> None:
+    now = time.time()
+    db = store._db()
+    db.executemany(
+        'INSERT INTO attempts (attempt_id, questions, passing_score, result, updated_at, assessment_id, '
+        'time_spent, time_limit) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        [(f'{assessment_id}-{i}', '[]', 70, json.dumps({'percentage': float(score)}), now, assessment_id,
+          float(ratio * 30), 30.0) for i, (score, ratio) in enumerate(zip(scores, used))]
+    )
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='cohort sizes')
+    parser.add_argument('--lookups', type=int, default=20000, help='rank lookups timed per size')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    os.environ['AUTOSAVE_DB_PATH'] = os.path.join(scratch, 'autosave.db')
+    from cohort_stats import CohortIndex, cohort_frame
+    from grading import attempt_store
+
+    rng = np.random.default_rng(1)
+    results = {'benchmark': 'cohort', 'environment': environment(), 'config': vars(args), 'sizes': {}}
+    for size in args.sizes:
+        assessment_id = f'bench-{size}'
+        # Scores in 5% steps, like a 20-question assessment, so ties are common
+        scores = np.clip(np.round(rng.normal(62, 18, size) / 5) * 5, 0, 100)
+        used = np.clip(rng.normal(0.7, 0.2, size), 0.05, 1.2)
+        seed(attempt_store, assessment_id, scores, used)
+
+        start = time.perf_counter()
+        frame = cohort_frame(assessment_id)
+        read_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        index = CohortIndex.from_frame(frame)
+        build_seconds = time.perf_counter() - start
+
+        queries = [(float(s), float(u)) for s, u in zip(rng.choice(scores, args.lookups),
+                                                        rng.choice(used, args.lookups))]
+        array = np.asarray(index.scores)
+        linear_queries = queries[:max(1, args.lookups * 1000 // size)]
+        inserts = [(f'extra-{i}', float(s), float(u)) for i, (s, u) in enumerate(queries[:2000])]
+        entry = {
+            'rebuild': {'readSeconds': round(read_seconds, 4), 'buildSeconds': round(build_seconds, 4)},
+            'rankUs': per_call_us(index.rank, queries),
+            'linearScanUs': per_call_us(
+                lambda s, u: ((array < s).sum() + 0.5 * (array == s).sum()) / len(array), linear_queries
+            ),
+            'insertUs': per_call_us(index.add, inserts),
+            'snapshotUs': per_call_us(index.snapshot, [()] * 200),
+        }
+        results['sizes'][str(size)] = entry
+        print(f'Finished {size}', file=sys.stderr)
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# backend/bench/bench_email.py
+"""Email throughput benchmark for email_service.py against a local SMTP sink.
+
+Usage (from backend/):
+    python bench/bench_email.py --requests 200 --concurrency 1,8,32 --latency-ms 20 --output email.json
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+
+from common import run_concurrent, HTTPDriver, environment, write_results
+from smtp_sink import SMTPSink
+
+ASSESSMENT = {
+    'title': 'Backend Engineer Screening',
+    'description': 'Python, SQL and system design fundamentals',
+    'timeLimit': 45,
+    'jobRole': 'Backend Engineer',
+    'difficulty': 'intermediate',
+}
+
+
+def load_app(sink: SMTPSink):
+    """Create the app configured for the sink, with digests off so every request sends"""
+    os.environ.update(sink.env())
+    os.environ.setdefault('OUTBOX_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='bench-outbox-'), 'outbox.db'))
+    os.environ['DIGEST_WINDOW_SECONDS'] = '0'
+    os.environ.setdefault('SMTP_RATE_LIMIT_PER_MINUTE', '1000000')
+    # Every request comes from one address; measure the routes, not the per-client limits
+    os.environ.setdefault('ADMISSION_ENABLED', '0')
+    from app import create_app
+    import auth
+    import email_service
+    # The bulk route checks a Firebase sign-in; this measures sending, so the caller is a local interviewer
+    auth.authenticate = lambda authorization: {'uid': 'bench', 'email': 'bench@example.com'}
+    app = create_app()
+    email_service.email_service.pool.ssl_context = sink.client_ssl_context()
+    return app, email_service
+
+
+def single_email_scenario(driver: HTTPDriver, sink: SMTPSink, path: str, make_payload, count: int,
+                          concurrency: int, drain_timeout: float):
+    """Request latency for enqueueing, plus end-to-end delivery throughput"""
+    baseline = sink.stats()['accepted']
+
+    def call(i):
+        status, _ = driver.request('POST', path, make_payload(i))
+        return status in (200, 202)
+
+    start = time.perf_counter()
+    result = run_concurrent(call, list(range(count)), concurrency)
+    accepted_target = baseline + count - result['errors']
+    drained = sink.wait_for(accepted_target, drain_timeout)
+    elapsed = time.perf_counter() - start
+    delivered = sink.stats()['accepted'] - baseline
+    result['delivery'] = {
+        'delivered': delivered,
+        'drained': drained,
+        'elapsedSeconds': round(elapsed, 4),
+        'deliveredPerSecond': round(delivered / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    return result
+
+
+def bulk_scenario(driver: HTTPDriver, sink: SMTPSink, batches: int, bulk_size: int, concurrency: int):
+    """Whole bulk requests; each streams per-recipient outcomes"""
+    baseline = sink.stats()['accepted']
+    outcomes = {'sent': 0, 'failed': 0}
+
+    def call(batch):
+        recipients = [{'email': f'bulk{batch}-{i}@example.com', 'name': f'Candidate {i}'} for i in range(bulk_size)]
+        status, body = driver.request('POST', '/send-assessment-emails/bulk', {
+            'assessment': ASSESSMENT, 'recipients': recipients
+        })
+        if status != 200:
+            return False
+        summary = json.loads(body.decode().strip().splitlines()[-1])
+        outcomes['sent'] += summary.get('sent', 0)
+        outcomes['failed'] += summary.get('failed', 0)
+        return True
+
+    result = run_concurrent(call, list(range(batches)), concurrency)
+    elapsed = result['elapsedSeconds']
+    result['recipients'] = {
+        **outcomes,
+        'delivered': sink.stats()['accepted'] - baseline,
+        'recipientsPerSecond': round(outcomes['sent'] / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100, help='requests per scenario and concurrency level')
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated concurrency levels')
+    parser.add_argument('--scenarios', default='assessment,result,bulk')
+    parser.add_argument('--bulk-size', type=int, default=50)
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='injected SMTP DATA latency')
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of messages answered 451')
+    parser.add_argument('--disconnect-rate', type=float, default=0.0, help='fraction answered 421')
+    parser.add_argument('--drain-timeout', type=float, default=120.0)
+    parser.add_argument('--base-url', help='benchmark a running server (configured for this sink) instead')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.port, args.latency_ms, args.jitter_ms, args.failure_rate, args.disconnect_rate).start()
+    try:
+        app, module = load_app(sink) if not args.base_url else (None, None)
+        driver = HTTPDriver(app, args.base_url)
+        scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+        levels = [int(c) for c in args.concurrency.split(',')]
+
+        results = {
+            'benchmark': 'email',
+            'environment': environment(),
+            'config': vars(args),
+            'scenarios': {},
+        }
+        for scenario in scenarios:
+            runs = {}
+            for concurrency in levels:
+                if scenario == 'assessment':
+                    runs[str(concurrency)] = single_email_scenario(
+                        driver, sink, '/send-assessment-email',
+                        lambda i: {'assessment': ASSESSMENT, 'candidateEmail': f'candidate{i}@example.com'},
+                        args.requests, concurrency, args.drain_timeout
+                    )
+                elif scenario == 'result':
+                    runs[str(concurrency)] = single_email_scenario(
+                        driver, sink, '/send-result-email',
+                        lambda i: {
+                            'assessment': ASSESSMENT,
+                            'submission': {'score': 80, 'timeSpent': 30, 'passed': i % 2 == 0},
+                            'candidate': {'name': f'Candidate {i}', 'email': f'candidate{i}@example.com'}
+                        },
+                        args.requests, concurrency, args.drain_timeout
+                    )
+                elif scenario == 'bulk':
+                    batches = max(1, args.requests // args.bulk_size)
+                    runs[str(concurrency)] = bulk_scenario(driver, sink, batches, args.bulk_size, concurrency)
+                else:
+                    raise SystemExit(f'Unknown scenario {scenario}')
+            results['scenarios'][scenario] = runs
+        results['sink'] = sink.stats()
+        if module:
+            module.outbox.stop()
+        write_results(results, args.output)
+    finally:
+        sink.stop()
+
+
+if __name__ == '__main__':
+    main()
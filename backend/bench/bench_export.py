@@ -0,0 +1,112 @@
+# backend/bench/bench_export.py
+"""Cohort export: rows/sec and peak memory by cohort size, streamed vs assembled in memory.
+
+Attempts are seeded straight into a scratch attempt store (20-question results, half of them with
+a candidate analysis); the streamed numbers go through the real /assessments/<id>/export route.
+
+Usage (from backend/):
+    python bench/bench_export.py --sizes 1000 10000 50000 --output export.json
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import tracemalloc
+
+from common import environment, write_results
+
+ANALYSIS = {
+    'skillsMatch': 72,
+    'overallAssessment': 'Solid fundamentals with gaps in system design.',
+    'strengths': ['Problem solving', 'Core language knowledge'],
+    'areasForImprovement': ['System design depth'],
+    'recommendation': 'Proceed to technical interview',
+}
+
+
+def seed(store, assessment_id: str, size: int, questions: int = 20) -> None:
+    results = [{'questionId': f'q{i}', 'correct': i % 3 != 0, 'feedback': 'Correct answer'} for i in range(questions)]
+    now = time.time()
+    rows = []
+    for i in range(size):
+        score = questions - 1 - i % questions
+        result = {'score': score, 'totalQuestions': questions, 'percentage': score / questions * 100,
+                  'passed': score / questions >= 0.7, 'results': results}
+        rows.append((f'{assessment_id}-{i}', '[]', 70, json.dumps(result), now, assessment_id,
+                     f'Candidate {i}', f'candidate{i}@example.com', now + i, now + i + 1800,
+                     20 + i % 10, i % 4, json.dumps(ANALYSIS) if i % 2 else None))
+    db = store._db()
+    db.executemany(
+        'INSERT INTO attempts (attempt_id, questions, passing_score, result, updated_at, assessment_id, '
+        'candidate_name, candidate_email, started_at, completed_at, time_spent, violations, analysis) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+    )
+    db.commit()
+
+
+def streamed(client, assessment_id: str, export_format: str) -> int:
+    response = client.get(f'/assessments/{assessment_id}/export?format={export_format}', buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return size
+
+
+def assembled(exports, assessment_id: str, export_format: str) -> int:
+    """The previous shape: every row in memory, then one body"""
+    rows = list(exports.cohort_rows(assessment_id))
+    return len(b''.join(exports.ENCODERS[export_format](rows)))
+
+
+def measure(fn) -> dict:
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'bytes': size, 'seconds': round(elapsed, 3), 'peakMemoryKb': round(peak / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000], help='cohort sizes')
+    parser.add_argument('--formats', nargs='+', default=['csv', 'ndjson'])
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    for name, filename in (('AUTOSAVE_DB_PATH', 'autosave.db'), ('FACE_DB_PATH', 'face.db'),
+                           ('OUTBOX_DB_PATH', 'outbox.db')):
+        os.environ[name] = os.path.join(scratch, filename)
+    os.environ.setdefault('ADMISSION_ENABLED', '0')
+    os.environ.setdefault('GROQ_API_KEY', 'unused')
+    from app import create_app
+    import auth
+    import exports
+    from grading import attempt_store
+
+    # The routes check a Firebase sign-in; this measures the export itself, so the caller is a local interviewer
+    auth.authenticate = lambda authorization: {'uid': 'bench', 'email': 'bench@example.com'}
+    auth.owns_assessment = lambda uid, assessment_id: True
+    client = create_app(start_workers=False).test_client()
+    results = {'benchmark': 'export', 'environment': environment(), 'config': vars(args), 'sizes': {}}
+    for size in args.sizes:
+        assessment_id = f'bench-{size}'
+        seed(attempt_store, assessment_id, size)
+        entry = {}
+        for export_format in args.formats:
+            stream = measure(lambda: streamed(client, assessment_id, export_format))
+            memory = measure(lambda: assembled(exports, assessment_id, export_format))
+            stream['rowsPerSecond'] = round(size / stream['seconds'])
+            memory['rowsPerSecond'] = round(size / memory['seconds'])
+            entry[export_format] = {'streamed': stream, 'assembled': memory}
+        results['sizes'][str(size)] = entry
+        print(f'Finished {size}', file=sys.stderr)
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
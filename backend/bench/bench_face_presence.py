@@ -0,0 +1,172 @@
+# backend/bench/bench_face_presence.py
+"""Face-presence analysis throughput (frames/sec per core) and memory per active session.
+
+Frames are synthetic webcam snapshots (drawn faces the Haar cascade detects, empty scenes and
+two-face scenes) encoded as JPEG at the size the client sends. Each run goes through the real
+FacePresenceAnalyzer: buffering, batches on the thread pool and the SQLite timeline.
+
+Usage (from backend/):
+    python bench/bench_face_presence.py --sessions 50 --frames 40 --output face.json
+"""
+import os
+import sys
+import time
+import base64
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+import numpy as np
+
+from common import environment, write_results
+
+import face_presence
+from face_presence import FaceDetector, FacePresenceAnalyzer, decode_frame
+
+cv2 = face_presence.cv2
+
+KINDS = ('face', 'none', 'multiple')
+
+
+def draw_face(img: np.ndarray, cx: int, cy: int, s: float) -> None:
+    fw, fh = int(28 * s), int(36 * s)
+    cv2.ellipse(img, (cx, cy), (fw, fh), 0, 0, 360, (150, 170, 210), -1)
+    for dx in (-11, 11):
+        cv2.ellipse(img, (cx + int(dx * s), cy - int(8 * s)), (int(6 * s), int(3 * s)), 0, 0, 360, (40, 40, 50), -1)
+        cv2.line(img, (cx + int((dx - 7) * s), cy - int(15 * s)), (cx + int((dx + 7) * s), cy - int(15 * s)),
+                 (50, 50, 60), max(1, int(2 * s)))
+    cv2.line(img, (cx, cy - int(4 * s)), (cx, cy + int(8 * s)), (120, 140, 180), max(1, int(2 * s)))
+    cv2.ellipse(img, (cx, cy + int(18 * s)), (int(10 * s), int(3 * s)), 0, 0, 360, (60, 60, 110), -1)
+    cv2.rectangle(img, (cx - fw, cy - fh - 4), (cx + fw, cy - fh + int(10 * s)), (30, 30, 40), -1)
+
+
+def snapshot(kind: str, width: int, rng: np.random.Generator) -> str:
+    """Base64 JPEG of one synthetic snapshot, like canvas.toDataURL('image/jpeg') on the client"""
+    height = width * 3 // 4
+    img = np.full((height, width, 3), (120, 130, 140), np.uint8)
+    img += rng.integers(0, 20, (height, width, 1), dtype=np.uint8)
+    scale = width / 160
+    jitter = rng.integers(-6, 7, 2) * scale
+    if kind == 'face':
+        draw_face(img, int(width / 2 + jitter[0]), int(height / 2 + jitter[1]), scale * rng.uniform(0.9, 1.2))
+    elif kind == 'multiple':
+        for cx in (width // 4, 3 * width // 4):
+            draw_face(img, int(cx + jitter[0] / 2), int(height / 2 + jitter[1]), scale * 0.75)
+    img = cv2.GaussianBlur(img, (3, 3), 0)
+    ok, encoded = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return base64.b64encode(encoded.tobytes()).decode()
+
+
+def detection_check(frames: dict) -> dict:
+    """Faces found per synthetic kind, so a throughput number is not measuring a blind detector"""
+    detector = FaceDetector()
+    found = {}
+    for kind, images in frames.items():
+        counts = [detector.count_faces(decode_frame(image)) for image in images]
+        found[kind] = {'frames': len(counts), 'meanFaces': round(float(np.mean(counts)), 2),
+                       'withFace': sum(c > 0 for c in counts), 'multiple': sum(c > 1 for c in counts)}
+    return found
+
+
+def single_frame_us(frames: list, repeat: int) -> float:
+    detector = FaceDetector()
+    data = [decode_frame(image) for image in frames]
+    start = time.perf_counter()
+    for i in range(repeat):
+        detector.count_faces(data[i % len(data)])
+    return round((time.perf_counter() - start) / repeat * 1e6, 1)
+
+
+def throughput(workers: int, sessions: int, frames_per_session: int, pool: list, db_dir: str) -> dict:
+    """Frames/sec through submit -> batch -> detect -> SQLite with `workers` pool threads"""
+    analyzer = FacePresenceAnalyzer(db_path=os.path.join(db_dir, f'face-{workers}.db'), workers=workers)
+    base = time.time() * 1000 - frames_per_session * 5000
+    start = time.perf_counter()
+    for i in range(frames_per_session):
+        for s in range(sessions):
+            image = pool[(i * sessions + s) % len(pool)]
+            analyzer.submit(f'session-{s}', [{'image': image, 'timestamp': base + i * 5000}])
+    for s in range(sessions):
+        if not analyzer.drain(f'session-{s}', timeout=600):
+            raise SystemExit(f'session-{s} did not drain')
+    elapsed = time.perf_counter() - start
+    analyzer.stop()
+    analyzer._pool.shutdown()
+    fps = sessions * frames_per_session / elapsed
+    return {'workers': workers, 'frames': sessions * frames_per_session, 'elapsedSeconds': round(elapsed, 3),
+            'framesPerSecond': round(fps, 1), 'framesPerSecondPerWorker': round(fps / workers, 1)}
+
+
+def session_memory(sessions: int, pool: list, db_dir: str) -> dict:
+    """Peak Python heap per session while every session holds its maximum backlog"""
+    analyzer = FacePresenceAnalyzer(db_path=os.path.join(db_dir, 'face-memory.db'), workers=1)
+    analyzer._executor()
+    # Keep the only pool thread busy so frames stay buffered instead of being analyzed
+    gate = threading.Event()
+    analyzer._pool.submit(gate.wait)
+    frames = [{'image': image} for image in pool[:face_presence.MAX_BUFFERED + 4]]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for s in range(sessions):
+        # More frames than the session may hold; the oldest are dropped
+        for _ in range(3):
+            analyzer.submit(f'session-{s}', frames)
+    held = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, 'filename'))
+    tracemalloc.stop()
+    frame_bytes = [len(data) for session in analyzer.sessions.values() for _, data in session.buffer]
+    gate.set()
+    for s in range(sessions):
+        analyzer.drain(f'session-{s}', timeout=600)
+    analyzer.stop()
+    analyzer._pool.shutdown()
+    bound = (face_presence.MAX_BUFFERED + face_presence.MAX_IN_FLIGHT * face_presence.BATCH_SIZE)
+    return {
+        'sessions': sessions,
+        'bufferedFramesPerSession': round(len(frame_bytes) / sessions, 1),
+        'meanFrameBytes': round(float(np.mean(frame_bytes)), 1),
+        'heapBytesPerSession': round(held / sessions),
+        'boundFramesPerSession': bound,
+        'boundBytesPerSession': bound * face_presence.MAX_FRAME_BYTES,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=50, help='concurrent assignments')
+    parser.add_argument('--frames', type=int, default=40, help='snapshots per assignment')
+    parser.add_argument('--width', type=int, default=160, help='snapshot width in pixels (4:3)')
+    parser.add_argument('--workers', type=int, nargs='+', help='pool sizes to sweep (default 1, 2, 4 ... cpus)')
+    parser.add_argument('--repeat', type=int, default=500, help='iterations for the single-frame timing')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+    if not face_presence.available():
+        raise SystemExit('opencv-python-headless is not installed')
+
+    cpus = os.cpu_count() or 1
+    workers = args.workers or sorted({1, *[2 ** i for i in range(1, cpus.bit_length()) if 2 ** i <= cpus], cpus})
+    rng = np.random.default_rng(1)
+    frames = {kind: [snapshot(kind, args.width, rng) for _ in range(20)] for kind in KINDS}
+    # Mostly present, like a real session
+    pool = frames['face'] * 8 + frames['none'] + frames['multiple']
+    rng.shuffle(pool)
+
+    results = {
+        'benchmark': 'face-presence',
+        'environment': environment(),
+        'config': dict(vars(args), workers=workers, batchSize=face_presence.BATCH_SIZE,
+                       detectWidth=face_presence.DETECT_WIDTH),
+        'detection': detection_check(frames),
+        'singleFrameUs': {kind: single_frame_us(images, args.repeat) for kind, images in frames.items()},
+        'throughput': [],
+    }
+    with tempfile.TemporaryDirectory() as db_dir:
+        for count in workers:
+            results['throughput'].append(throughput(count, args.sessions, args.frames, pool, db_dir))
+            print(f'Finished {count} workers', file=sys.stderr)
+        results['memory'] = session_memory(args.sessions, pool, db_dir)
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
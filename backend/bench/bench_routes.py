@@ -0,0 +1,163 @@
+# backend/bench/bench_routes.py
+"""End-to-end benchmark for every backend route against the local Groq and SMTP stand-ins.
+
+Each scenario sweeps its scaling dimension (question count, violation count, cohort size)
+across each concurrency level, using the fixed payloads in corpus.py.
+
+Usage (from backend/):
+    python bench/bench_routes.py --requests 50 --concurrency 1,8 --groq-latency-ms 300 --output head.json
+    python bench/bench_routes.py --baseline base.json --threshold 0.1   # exits 1 on regression
+"""
+import os
+import sys
+import logging
+import argparse
+import tempfile
+
+from common import run_concurrent, HTTPDriver, environment, write_results, report_regressions
+from corpus import CORPORA
+from fake_groq import FakeGroq, FakeGroqServer, parse_models
+from smtp_sink import SMTPSink
+
+
+def load_app(groq: FakeGroqServer, sink: SMTPSink):
+    """Create the app wired to the stand-ins, with throwaway databases"""
+    data_dir = tempfile.mkdtemp(prefix='bench-routes-')
+    os.environ.update(sink.env())
+    os.environ['GROQ_BASE_URL'] = groq.base_url
+    os.environ.setdefault('GROQ_API_KEY', 'bench')
+    os.environ['AUTOSAVE_DB_PATH'] = os.path.join(data_dir, 'autosave.db')
+    os.environ['OUTBOX_DB_PATH'] = os.path.join(data_dir, 'outbox.db')
+    os.environ['DIGEST_WINDOW_SECONDS'] = '0'
+    os.environ.setdefault('SMTP_RATE_LIMIT_PER_MINUTE', '1000000')
+    # Every request comes from one address; measure the routes, not the per-client limits
+    os.environ.setdefault('ADMISSION_ENABLED', '0')
+    from app import create_app
+    import email_service
+    app = create_app()
+    # The Groq SDK logs every HTTP request at INFO
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    email_service.email_service.pool.ssl_context = sink.client_ssl_context()
+    return app, email_service
+
+
+def run_scenario(driver: HTTPDriver, name: str, sizes, levels, requests: int, warmup: int):
+    """One summary per (size, concurrency) pair, after `warmup` untimed requests per size"""
+    method, path, make_payload, _dimension, _default_sizes = CORPORA[name]
+    runs = {}
+    for size in sizes:
+        payloads = [make_payload(size, i) if make_payload else None for i in range(requests)]
+
+        def call(payload):
+            status, _ = driver.request(method, path, payload)
+            return status in (200, 202)
+
+        for payload in payloads[:warmup]:
+            call(payload)
+        runs[str(size)] = {str(c): run_concurrent(call, payloads, c) for c in levels}
+    return runs
+
+
+def model_tier_report():
+    """Per operation: request count and mean Groq time for each routing tier, tokens and cost per model"""
+    from prometheus_client import REGISTRY
+    report = {}
+    for metric in REGISTRY.collect():
+        for sample in metric.samples:
+            labels = sample.labels
+            if sample.name in ('llm_route_duration_seconds_count', 'llm_route_duration_seconds_sum'):
+                entry = report.setdefault(labels['operation'], {}).setdefault('tiers', {}).setdefault(labels['tier'], {})
+                entry['count' if sample.name.endswith('_count') else 'seconds'] = sample.value
+            elif sample.name in ('groq_tokens_total', 'groq_cost_usd_total', 'llm_model_escalations_total'):
+                entry = report.setdefault(labels['operation'], {}).setdefault('models', {}).setdefault(labels['model'], {})
+                if sample.name == 'groq_tokens_total':
+                    entry[f"{labels['kind']}Tokens"] = int(sample.value)
+                elif sample.name == 'groq_cost_usd_total':
+                    entry['costUsd'] = round(sample.value, 6)
+                else:
+                    entry['escalations'] = int(sample.value)
+    for operation in report.values():
+        for entry in operation.get('tiers', {}).values():
+            seconds = entry.pop('seconds', 0.0)
+            entry['meanMs'] = round(1000 * seconds / entry['count'], 2) if entry.get('count') else None
+    return report
+
+
+def parse_sizes(value: str):
+    return [int(s) for s in value.split(',') if s.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=30, help='requests per size and concurrency level')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed requests before each size')
+    parser.add_argument('--concurrency', default='1,8', help='comma-separated concurrency levels')
+    parser.add_argument('--scenarios', default=','.join(CORPORA), help='comma-separated; see corpus.CORPORA')
+    parser.add_argument('--question-counts', help='override the question-count sweep')
+    parser.add_argument('--violation-counts', help='override the violation-count sweep')
+    parser.add_argument('--cohort-sizes', help='override the cohort-size sweep')
+    parser.add_argument('--groq-latency-ms', type=float, default=0.0, help='median fake Groq latency')
+    parser.add_argument('--groq-latency-sigma', type=float, default=0.0)
+    parser.add_argument('--groq-tokens-per-second', type=float, default=0.0)
+    parser.add_argument('--groq-error-rate', type=float, default=0.0)
+    parser.add_argument('--groq-malformed-rate', type=float, default=0.0)
+    parser.add_argument('--groq-model', action='append', default=[], metavar='NAME=SCALE[:MALFORMED]',
+                        help='per-model fake Groq latency multiplier and malformed rate (repeatable)')
+    parser.add_argument('--groq-port', type=int, default=0, help='0 picks a free port')
+    parser.add_argument('--smtp-port', type=int, default=8025)
+    parser.add_argument('--smtp-latency-ms', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--baseline', help='result file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed fractional slowdown vs baseline')
+    args = parser.parse_args()
+
+    overrides = {
+        'questions': args.question_counts,
+        'violations': args.violation_counts,
+        'cohort': args.cohort_sizes,
+    }
+    fake = FakeGroq(
+        'synthetic', latency_ms=args.groq_latency_ms, latency_sigma=args.groq_latency_sigma,
+        tokens_per_second=args.groq_tokens_per_second, error_rate=args.groq_error_rate,
+        malformed_rate=args.groq_malformed_rate, seed=args.seed, models=parse_models(args.groq_model)
+    )
+    groq = FakeGroqServer(fake, args.groq_port).start()
+    sink = SMTPSink(args.smtp_port, args.smtp_latency_ms).start()
+    try:
+        app, email_service = load_app(groq, sink)
+        driver = HTTPDriver(app)
+        levels = [int(c) for c in args.concurrency.split(',')]
+
+        results = {
+            'benchmark': 'routes',
+            'environment': environment(),
+            'config': vars(args),
+            'scenarios': {},
+        }
+        for name in [s.strip() for s in args.scenarios.split(',') if s.strip()]:
+            if name not in CORPORA:
+                raise SystemExit(f'Unknown scenario {name}')
+            _method, _path, _make, dimension, sizes = CORPORA[name]
+            if dimension and overrides.get(dimension):
+                sizes = parse_sizes(overrides[dimension])
+            results['scenarios'][name] = {
+                'dimension': dimension,
+                'runs': run_scenario(driver, name, sizes, levels, args.requests, args.warmup),
+            }
+            print(f"Finished {name}", file=sys.stderr)
+        results['groq'] = dict(fake.stats)
+        results['modelTiers'] = model_tier_report()
+        results['smtp'] = sink.stats()
+        email_service.outbox.stop()
+        write_results(results, args.output)
+    finally:
+        sink.stop()
+        groq.stop()
+
+    if args.baseline:
+        sys.exit(report_regressions(args.baseline, results, args.threshold))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# backend/bench/bench_serialization.py
+"""Serialization CPU and bytes on the wire: stock jsonify vs the responses.py layer.
+
+Response bodies come from the real routes (LLM routes via the synthetic fake_groq), so sizes
+and shapes match what clients receive.
+
+Usage (from backend/):
+    python bench/bench_serialization.py --repeat 200 --output serialization.json
+"""
+import sys
+import gzip
+import time
+import argparse
+import statistics
+
+from flask.json.provider import DefaultJSONProvider
+
+from bench_routes import load_app
+from common import environment, write_results
+from corpus import CORPORA
+from fake_groq import FakeGroq, FakeGroqServer
+from smtp_sink import SMTPSink
+
+# (scenario, size) pairs whose responses are large enough to matter
+RESPONSES = [
+    ('generate-assessment', 50),
+    ('evaluate-submission', 200),
+    ('violation-report', 1000),
+    ('grade-free-text', 200),
+    ('analyze-candidate', 0),
+]
+
+
+def median_us(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200, help='timed iterations per measurement')
+    parser.add_argument('--smtp-port', type=int, default=8025)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    groq = FakeGroqServer(FakeGroq('synthetic', seed=1), 0).start()
+    sink = SMTPSink(args.smtp_port).start()
+    try:
+        app, email_service = load_app(groq, sink)
+        import responses
+        client = app.test_client()
+        stock = DefaultJSONProvider(app)
+        results = {
+            'benchmark': 'serialization',
+            'environment': environment(),
+            'config': vars(args),
+            'provider': type(app.json).__name__,
+            'brotli': responses.brotli is not None,
+            'responses': {},
+        }
+        for name, size in RESPONSES:
+            method, path, make_payload, _dimension, _sizes = CORPORA[name]
+            response = client.open(path, method=method, json=make_payload(size, 0))
+            if response.status_code != 200:
+                raise SystemExit(f'{name} returned {response.status_code}')
+            obj = response.get_json()
+            with app.app_context():
+                body = stock.response(obj).get_data()
+                entry = {
+                    'size': size,
+                    'bytes': {'identity': len(body), 'gzip': len(responses._compress(body, 'gzip'))},
+                    'serializeUs': {
+                        'stock': median_us(lambda: stock.response(obj).get_data(), args.repeat),
+                        'current': median_us(lambda: app.json.response(obj).get_data(), args.repeat),
+                    },
+                    'compressUs': {'gzip': median_us(lambda: responses._compress(body, 'gzip'), args.repeat)},
+                }
+            if responses.brotli is not None:
+                entry['bytes']['br'] = len(responses._compress(body, 'br'))
+                entry['compressUs']['br'] = median_us(lambda: responses._compress(body, 'br'), args.repeat)
+            entry['serializeSpeedup'] = round(entry['serializeUs']['stock'] / entry['serializeUs']['current'], 2)
+            entry['gzipRatio'] = round(entry['bytes']['gzip'] / entry['bytes']['identity'], 3)
+            results['responses'][f'{name}:{size}'] = entry
+            print(f'Finished {name}', file=sys.stderr)
+        email_service.outbox.stop()
+        write_results(results, args.output)
+    finally:
+        groq.stop()
+        sink.stop()
+
+
+if __name__ == '__main__':
+    main()
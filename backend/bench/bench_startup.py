@@ -0,0 +1,221 @@
+# backend/bench/bench_startup.py
+"""Cold-start benchmark: import, app creation, first requests and time-to-healthy.
+
+Every run is a fresh interpreter. The AI route goes to the synthetic fake_groq server.
+
+Usage (from backend/):
+    python bench/bench_startup.py --runs 5 --output startup.json
+    python bench/bench_startup.py --memory --workers 4   # per-worker RSS/PSS under gunicorn.conf.py, preload on and off
+    python bench/bench_startup.py --app ai:app --cwd /path/to/older/checkout/backend   # compare an older tree
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+
+from common import BACKEND_DIR, environment, write_results
+from corpus import CORPORA
+from fake_groq import FakeGroq, FakeGroqServer
+
+# Runs in the child interpreter; prints one JSON line of phase timings
+CHILD = r'''
+import sys, json, time, resource, importlib
+t0 = time.perf_counter()
+module_name, _, attr = sys.argv[1].partition(':')
+module = importlib.import_module(module_name)
+t1 = time.perf_counter()
+app = getattr(module, attr[:-2])() if attr.endswith('()') else getattr(module, attr)
+t2 = time.perf_counter()
+client = app.test_client()
+health = client.get('/health').status_code
+t3 = time.perf_counter()
+payload = {'jobRole': 'Backend Engineer', 'numberOfQuestions': 5}
+first_ai = client.post('/generate-assessment', json=payload).status_code
+t4 = time.perf_counter()
+client.post('/generate-assessment', json=payload)
+t5 = time.perf_counter()
+print(json.dumps({
+    'importSeconds': t1 - t0,
+    'createSeconds': t2 - t1,
+    'firstHealthSeconds': t3 - t2,
+    'firstAiSeconds': t4 - t3,
+    'warmAiSeconds': t5 - t4,
+    'readySeconds': t2 - t0,
+    'modules': len(sys.modules),
+    'maxRssMb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'status': [health, first_ai],
+}))
+sys.stdout.flush()
+import os
+os._exit(0)
+'''
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def child_env(groq: FakeGroqServer) -> dict:
+    data_dir = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(os.environ)
+    env.update({
+        'GROQ_API_KEY': env.get('GROQ_API_KEY', 'bench'),
+        'GROQ_BASE_URL': groq.base_url,
+        'AUTOSAVE_DB_PATH': os.path.join(data_dir, 'autosave.db'),
+        'OUTBOX_DB_PATH': os.path.join(data_dir, 'outbox.db'),
+        'PYTHONUNBUFFERED': '1',
+        'ADMISSION_ENABLED': env.get('ADMISSION_ENABLED', '0'),
+    })
+    return env
+
+
+def in_process_run(app_spec: str, cwd: str, env: dict) -> dict:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD, app_spec], cwd=cwd, env=env,
+                            capture_output=True, text=True, timeout=300)
+    wall = time.perf_counter() - start
+    lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+    if not lines:
+        raise RuntimeError(f'Child failed: {result.stderr[-2000:]}')
+    timings = json.loads(lines[-1])
+    timings['processSeconds'] = wall
+    return timings
+
+
+def wait_healthy(port: int, process: subprocess.Popen, timeout: float = 120.0) -> float:
+    """Poll /health until it answers 200; seconds waited"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with {process.returncode}')
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError(f'Server did not become healthy within {timeout}s')
+
+
+def time_to_healthy(app_spec: str, cwd: str, env: dict, server: str, timeout: float = 120.0) -> float:
+    """Spawn a real server and poll /health until it answers 200"""
+    port = free_port()
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-w', '1', '-b', f'127.0.0.1:{port}', app_spec]
+    else:
+        command = [sys.executable, '-m', 'flask', '--app', app_spec, 'run', '--port', str(port)]
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return wait_healthy(port, process, timeout)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def post(port: int, path: str, payload: dict) -> int:
+    request = urllib.request.Request(f'http://127.0.0.1:{port}{path}', data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+        return response.status
+
+
+def process_memory(pid: int) -> dict:
+    """Resident and proportional set size in MB; PSS splits copy-on-write pages between sharers"""
+    with open(f'/proc/{pid}/status') as f:
+        rss = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        pss = next(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+    return {'rssMb': round(rss / 1024, 1), 'pssMb': round(pss / 1024, 1)}
+
+
+def worker_memory(cwd: str, env: dict, workers: int, preload: bool) -> dict:
+    """Run gunicorn.conf.py, exercise the AI and free-text routes on every worker, then read memory"""
+    port = free_port()
+    env = dict(env, PORT=str(port), WEB_CONCURRENCY=str(workers), GUNICORN_PRELOAD='1' if preload else '0',
+               PROMETHEUS_MULTIPROC_DIR=tempfile.mkdtemp(prefix='bench-prometheus-'))
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}']
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        healthy = wait_healthy(port, process)
+        # Sequential keep-alive-free requests land on workers more or less round-robin
+        for index in range(workers * 8):
+            for name, size in (('generate-assessment', 5), ('grade-free-text', 10)):
+                _, path, payload, _, _ = CORPORA[name]
+                post(port, path, payload(size, index))
+        with open(f'/proc/{process.pid}/task/{process.pid}/children') as f:
+            children = [int(pid) for pid in f.read().split()]
+        worker_stats = [process_memory(pid) for pid in children]
+        return {
+            'preload': preload,
+            'timeToHealthySeconds': round(healthy, 4),
+            'master': process_memory(process.pid),
+            'workers': worker_stats,
+            'workerRssMbMean': round(statistics.mean(w['rssMb'] for w in worker_stats), 1),
+            'workerPssMbMean': round(statistics.mean(w['pssMb'] for w in worker_stats), 1),
+            'totalPssMb': round(process_memory(process.pid)['pssMb'] + sum(w['pssMb'] for w in worker_stats), 1),
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def aggregate(runs: list) -> dict:
+    keys = [k for k, v in runs[0].items() if isinstance(v, (int, float))]
+    return {k: {
+        'median': round(statistics.median(r[k] for r in runs), 4),
+        'min': round(min(r[k] for r in runs), 4),
+        'max': round(max(r[k] for r in runs), 4),
+    } for k in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app', default='app:create_app()', help='module:attr or module:factory()')
+    parser.add_argument('--cwd', default=BACKEND_DIR, help='backend directory to run from')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--server', choices=['flask', 'gunicorn'], default='flask',
+                        help='server used for the time-to-healthy measurement')
+    parser.add_argument('--memory', action='store_true',
+                        help='also measure per-worker memory under gunicorn.conf.py, with and without preload')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers for --memory')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    groq = FakeGroqServer(FakeGroq('synthetic', seed=1), 0).start()
+    try:
+        env = child_env(groq)
+        runs = [in_process_run(args.app, args.cwd, env) for _ in range(args.runs)]
+        healthy = [time_to_healthy(args.app, args.cwd, env, args.server) for _ in range(args.runs)]
+        memory = [worker_memory(args.cwd, env, args.workers, preload) for preload in (True, False)] \
+            if args.memory else None
+    finally:
+        groq.stop()
+
+    results = {
+        'benchmark': 'startup',
+        'environment': environment(),
+        'config': vars(args),
+        'phases': aggregate(runs),
+        'timeToHealthySeconds': {
+            'median': round(statistics.median(healthy), 4),
+            'min': round(min(healthy), 4),
+            'max': round(max(healthy), 4),
+        },
+        'status': runs[-1]['status'],
+    }
+    if memory:
+        results['memory'] = memory
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# backend/bench/bench_templates.py
+"""Compare precompiled email templates with the previous f-string rendering.
+
+Usage (from backend/): python bench/bench_templates.py [--iterations N]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_templates import render, assessment_context  # noqa: E402
+
+ASSESSMENT = {
+    'title': 'Senior Backend Engineer Screening',
+    'description': 'Distributed systems, Python and SQL fundamentals',
+    'timeLimit': 45,
+    'jobRole': 'Backend Engineer',
+    'difficulty': 'advanced',
+}
+
+
+def legacy_html_template(content: str, title: str = "Assessment Notification") -> str:
+    """Pre-registry shell, rebuilt with an f-string on every call"""
+    return f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <title>{title}</title>
+        <style>
+            body {{
+                font-family: Arial, sans-serif;
+                line-height: 1.6;
+                color: #333;
+                max-width: 600px;
+                margin: 0 auto;
+                padding: 20px;
+            }}
+            .header {{
+                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                color: white;
+                padding: 30px;
+                text-align: center;
+                border-radius: 10px 10px 0 0;
+            }}
+            .content {{
+                background: #f8f9fa;
+                padding: 30px;
+                border: 1px solid #e9ecef;
+            }}
+            .footer {{
+                background: #6c757d;
+                color: white;
+                padding: 20px;
+                text-align: center;
+                border-radius: 0 0 10px 10px;
+                font-size: 14px;
+            }}
+            .btn {{
+                display: inline-block;
+                padding: 12px 24px;
+                background: #007bff;
+                color: white;
+                text-decoration: none;
+                border-radius: 5px;
+                margin: 10px 0;
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>{title}</h1>
+        </div>
+        <div class="content">
+            {content}
+        </div>
+        <div class="footer">
+            <p>Assessment Platform &copy; 2024</p>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def legacy_render(assessment, recipient_name):
+    """Invitation email as the route built it before the template registry"""
+    subject = f"Assessment Invitation: {assessment.get('title', 'New Assessment')}"
+    plain_message = f"""Dear {recipient_name},
+
+You have been invited to take the assessment: {assessment.get('title', 'New Assessment')}
+
+Assessment Details:
+• Description: {assessment.get('description', 'No description provided')}
+• Time Limit: {assessment.get('timeLimit', 30)} minutes
+• Job Role: {assessment.get('jobRole', 'Not specified')}
+• Difficulty: {assessment.get('difficulty', 'Medium')}
+"""
+    html_content = f"""
+        <h2>Assessment Invitation</h2>
+        <p>Dear {recipient_name},</p>
+        <h3>{assessment.get('title', 'New Assessment')}</h3>
+        <p><strong>Description:</strong> {assessment.get('description', 'No description provided')}</p>
+        <p><strong>Time Limit:</strong> {assessment.get('timeLimit', 30)} minutes</p>
+        <p><strong>Job Role:</strong> {assessment.get('jobRole', 'Not specified')}</p>
+        <p><strong>Difficulty:</strong> {assessment.get('difficulty', 'Medium')}</p>
+        """
+    return subject, plain_message, legacy_html_template(html_content, "Assessment Notification")
+
+
+def registry_render(assessment, recipient_name):
+    return render('assigned', recipient_name=recipient_name, **assessment_context(assessment, 'assigned'))
+
+
+def measure(fn, iterations, distinct_names):
+    names = [f'Candidate {i}' for i in range(distinct_names)]
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(ASSESSMENT, names[i % distinct_names])
+    elapsed = time.perf_counter() - start
+    return {'iterations': iterations, 'totalSeconds': round(elapsed, 6), 'usPerRender': round(elapsed / iterations * 1e6, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    results = {
+        'benchmark': 'email_templates',
+        'timestamp': datetime.now().isoformat(),
+        'legacy': measure(legacy_render, args.iterations, args.iterations),
+        'registryUncached': measure(registry_render, args.iterations, args.iterations),
+        'registryCached': measure(registry_render, args.iterations, 10),
+    }
+    results['speedupUncached'] = round(results['legacy']['usPerRender'] / results['registryUncached']['usPerRender'], 2)
+    results['speedupCached'] = round(results['legacy']['usPerRender'] / results['registryCached']['usPerRender'], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# backend/bench/bench_variants.py
+"""Local variants: cost per variant, key correctness and how different two variants are.
+
+The pool is a synthetic generated assessment (multiple choice, some "All of the above"
+options). Every variant is derived through VariantStore.get, graded against its own key with
+grade_submissions, and compared with other variants for shared question positions.
+
+Usage (from backend/):
+    python bench/bench_variants.py --variants 10000 --pool 40 --per-variant 20 --output variants.json
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from common import environment, write_results
+
+
+def make_pool(size: int) -> list:
+    rng = random.Random(1)
+    pool = []
+    for i in range(size):
+        options = [f'Option {i}.{j}' for j in range(4)]
+        if i % 5 == 0:
+            options[3] = 'All of the above'
+        pool.append({'id': f'q{i}', 'question': f'Question {i}?', 'type': 'multiple_choice',
+                     'options': options, 'correctAnswer': str(rng.randrange(4))})
+    return pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--variants', type=int, default=10000)
+    parser.add_argument('--pool', type=int, default=40, help='generated questions')
+    parser.add_argument('--per-variant', type=int, default=20, help='questions per variant')
+    parser.add_argument('--pairs', type=int, default=20000, help='variant pairs compared')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    os.environ['VARIANTS_DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'variants.db')
+    os.environ.setdefault('GROQ_API_KEY', 'unused')
+    from variants import VariantStore
+    from ai import grade_submissions
+
+    store = VariantStore()
+    pool = make_pool(args.pool)
+    start = time.perf_counter()
+    issued = store.issue('bench', pool, args.variants, args.per_variant)
+    issue_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    variants = [store.get('bench', variant_id) for variant_id in issued['variantIds']]
+    derive_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    wrong_keys = 0
+    for variant in variants:
+        answers = {q['id']: q['correctAnswer'] for q in variant.questions}
+        results = grade_submissions(variant.questions, [answers])[0]
+        wrong_keys += sum(not r['correct'] for r in results)
+        # The variant's answers mapped back must be right against the original key too
+        mapped = variant.pool_answers(answers)
+        wrong_keys += sum(mapped[q['id']] != q['correctAnswer'] for q in pool if q['id'] in mapped)
+    grade_seconds = time.perf_counter() - start
+
+    rng = random.Random(2)
+    same_question, same_form, positions = 0, 0, 0
+    for _ in range(args.pairs):
+        a, b = rng.sample(variants, 2)
+        layout_a = [(q['id'], tuple(q['options'])) for q in a.questions]
+        layout_b = [(q['id'], tuple(q['options'])) for q in b.questions]
+        same_question += sum(x[0] == y[0] for x, y in zip(layout_a, layout_b))
+        same_form += sum(x == y for x, y in zip(layout_a, layout_b))
+        positions += len(layout_a)
+
+    results = {
+        'benchmark': 'variants',
+        'environment': environment(),
+        'config': vars(args),
+        'llmCalls': 1,
+        'issueSeconds': round(issue_seconds, 4),
+        'deriveUsPerVariant': round(derive_seconds / args.variants * 1e6, 1),
+        'gradeUsPerVariant': round(grade_seconds / args.variants * 1e6, 1),
+        'wrongKeys': wrong_keys,
+        'distinctForms': len({tuple((q['id'], tuple(q['options'])) for q in v.questions) for v in variants}),
+        # Share of positions where two variants show the same question / the same question and option order
+        'samePositionQuestion': round(same_question / positions, 4),
+        'samePositionForm': round(same_form / positions, 4),
+    }
+    print(f'Finished {args.variants} variants', file=sys.stderr)
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
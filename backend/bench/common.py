@@ -0,0 +1,169 @@
+# backend/bench/common.py
+"""Shared helpers for the benchmark scripts: load drivers, percentiles and result files."""
+import os
+import sys
+import json
+import math
+import time
+import platform
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles (ms) and error rate for one run"""
+    ordered = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        'requests': total,
+        'errors': errors,
+        'errorRate': round(errors / total, 4) if total else 0.0,
+        'elapsedSeconds': round(elapsed, 4),
+        'throughputPerSecond': round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        'latencyMs': {
+            'mean': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+            'p50': round(percentile(ordered, 50) * 1000, 3),
+            'p95': round(percentile(ordered, 95) * 1000, 3),
+            'p99': round(percentile(ordered, 99) * 1000, 3),
+            'max': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        }
+    }
+
+
+def run_concurrent(call: Callable[[Any], bool], payloads: List[Any], concurrency: int) -> Dict[str, Any]:
+    """Drive call(payload) from `concurrency` threads; call returns True on success"""
+    latencies: List[float] = []
+    errors = 0
+
+    def timed(payload) -> Tuple[bool, float]:
+        start = time.perf_counter()
+        try:
+            ok = call(payload)
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for ok, latency in executor.map(timed, payloads):
+            if ok:
+                latencies.append(latency)
+            else:
+                errors += 1
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+class HTTPDriver:
+    """POST/GET JSON against a Flask app in-process, or a live server when base_url is set"""
+
+    def __init__(self, app=None, base_url: Optional[str] = None):
+        self.base_url = base_url.rstrip('/') if base_url else None
+        if self.base_url:
+            import requests
+            self.session = requests.Session()
+        else:
+            self.client = app.test_client()
+
+    def request(self, method: str, path: str, payload: Any = None,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        if self.base_url:
+            response = self.session.request(method, self.base_url + path, json=payload, headers=headers, timeout=120)
+            return response.status_code, response.content
+        response = self.client.open(path, method=method, json=payload, headers=headers)
+        return response.status_code, response.data
+
+
+def environment() -> Dict[str, Any]:
+    """Identify the run so result files can be compared between commits"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except Exception:
+        commit = ''
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def write_results(results: Dict[str, Any], output: Optional[str]) -> None:
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+def _runs(results: Dict[str, Any], path: Tuple[str, ...] = ()):
+    """Yield (path, summary) for every run summary nested in a result file"""
+    if isinstance(results, dict):
+        if 'latencyMs' in results and 'throughputPerSecond' in results:
+            yield path, results
+            return
+        for key, value in results.items():
+            if key not in ('environment', 'config'):
+                yield from _runs(value, path + (str(key),))
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1,
+                    min_delta_ms: float = 1.0) -> List[Dict[str, Any]]:
+    """Regressions between two result files of the same benchmark.
+
+    A run regresses when p50/p95 latency grows, or throughput drops, by more than `threshold`
+    (a fraction), or its error rate rises. Latency changes under `min_delta_ms` are noise.
+    """
+    previous = dict(_runs(baseline))
+    regressions = []
+    for path, run in _runs(current):
+        before = previous.get(path)
+        if before is None:
+            continue
+        name = '/'.join(path)
+        for metric in ('p50', 'p95'):
+            old, new = before['latencyMs'][metric], run['latencyMs'][metric]
+            if new - old > min_delta_ms and old > 0 and (new - old) / old > threshold:
+                regressions.append({'run': name, 'metric': f'latencyMs.{metric}', 'baseline': old, 'current': new,
+                                    'change': round((new - old) / old, 4)})
+        old, new = before['throughputPerSecond'], run['throughputPerSecond']
+        if old > 0 and (old - new) / old > threshold:
+            regressions.append({'run': name, 'metric': 'throughputPerSecond', 'baseline': old, 'current': new,
+                                'change': round((new - old) / old, 4)})
+        if run['errorRate'] > before['errorRate']:
+            regressions.append({'run': name, 'metric': 'errorRate', 'baseline': before['errorRate'],
+                                'current': run['errorRate'], 'change': round(run['errorRate'] - before['errorRate'], 4)})
+    return regressions
+
+
+def report_regressions(baseline_path: str, results: Dict[str, Any], threshold: float) -> int:
+    """Print regressions against a baseline file; returns a process exit code"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare_results(baseline, results, threshold)
+    base_commit = baseline.get('environment', {}).get('commit', '?')
+    head_commit = results.get('environment', {}).get('commit', '?')
+    if not regressions:
+        print(f"No regressions over {threshold:.0%} ({base_commit} -> {head_commit})", file=sys.stderr)
+        return 0
+    print(f"{len(regressions)} regressions over {threshold:.0%} ({base_commit} -> {head_commit}):", file=sys.stderr)
+    for r in regressions:
+        print(f"  {r['run']} {r['metric']}: {r['baseline']} -> {r['current']} ({r['change']:+.1%})", file=sys.stderr)
+    return 1
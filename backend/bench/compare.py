@@ -0,0 +1,27 @@
+# backend/bench/compare.py
+"""Compare two benchmark result files and fail on regressions.
+
+Usage (from backend/):
+    python bench/compare.py baseline.json current.json --threshold 0.1
+"""
+import sys
+import json
+import argparse
+
+from common import report_regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed fractional slowdown')
+    args = parser.parse_args()
+
+    with open(args.current) as f:
+        current = json.load(f)
+    sys.exit(report_regressions(args.baseline, current, args.threshold))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# backend/bench/corpus.py
+"""Fixed payload corpora for the route benchmarks.
+
+Every generator is seeded, so the same (size, index) always produces the same payload
+and runs on different commits send byte-identical requests. `python bench/corpus.py --dump DIR`
+writes the default corpora to disk for inspection or for replaying with other tools.
+"""
+import os
+import json
+import random
+import argparse
+from typing import Dict, Any, List
+
+SEED = 20240601
+
+ROLES = ['Backend Engineer', 'Frontend Developer', 'Data Scientist', 'DevOps Engineer', 'QA Engineer']
+VIOLATION_TYPES = ['tab_switch', 'face_not_detected', 'multiple_faces', 'copy_paste', 'fullscreen_exit']
+SHORT_ANSWERS = [
+    ('What does HTTP status 404 mean?', 'The requested resource was not found on the server'),
+    ('What is a database index used for?', 'Speeding up lookups by avoiding a full table scan'),
+    ('What does idempotent mean for an API call?', 'Repeating the call has the same effect as making it once'),
+    ('Why use a connection pool?', 'To reuse open connections instead of paying setup cost per request'),
+]
+
+ASSESSMENT = {
+    'id': 'bench-assessment',
+    'title': 'Backend Engineer Screening',
+    'description': 'Python, SQL and system design fundamentals',
+    'timeLimit': 45,
+    'jobRole': 'Backend Engineer',
+    'difficulty': 'intermediate',
+    'passingScore': 70,
+}
+
+
+def _rng(*key) -> random.Random:
+    return random.Random(f'{SEED}:' + ':'.join(str(k) for k in key))
+
+
+def questions(count: int, free_text_ratio: float = 0.2) -> List[Dict[str, Any]]:
+    """Mostly multiple choice with a share of short answers"""
+    rng = _rng('questions', count, free_text_ratio)
+    result = []
+    for i in range(count):
+        if rng.random() < free_text_ratio:
+            prompt, reference = SHORT_ANSWERS[i % len(SHORT_ANSWERS)]
+            result.append({'id': f'q{i}', 'type': 'short_answer', 'question': prompt,
+                           'correctAnswer': reference})
+        else:
+            result.append({'id': f'q{i}', 'type': 'multiple_choice',
+                           'question': f'Question {i}: pick the correct option',
+                           'options': [f'Option {j}' for j in range(4)],
+                           'correctAnswer': str(rng.randint(0, 3))})
+    return result
+
+
+def answers(question_list: List[Dict[str, Any]], index: int, accuracy: float = 0.7) -> Dict[str, str]:
+    """One candidate's answers; correct with probability `accuracy`"""
+    rng = _rng('answers', len(question_list), index)
+    result = {}
+    for q in question_list:
+        correct = rng.random() < accuracy
+        if q['type'] == 'multiple_choice':
+            result[q['id']] = q['correctAnswer'] if correct else str((int(q['correctAnswer']) + 1) % 4)
+        else:
+            result[q['id']] = q['correctAnswer'].lower() if correct else 'I am not sure about this one'
+    return result
+
+
+def generate_assessment(num_questions: int, index: int) -> Dict[str, Any]:
+    return {
+        'jobRole': ROLES[index % len(ROLES)],
+        'type': 'multiple_choice',
+        'difficulty': 'intermediate',
+        'numberOfQuestions': num_questions,
+    }
+
+
+def generate_beginner_assessment(num_questions: int, index: int) -> Dict[str, Any]:
+    """Small enough for model_routing to try the small model first"""
+    return dict(generate_assessment(num_questions, index), difficulty='beginner')
+
+
+def evaluate_submission(num_questions: int, index: int) -> Dict[str, Any]:
+    question_list = questions(num_questions)
+    return {'questions': question_list, 'answers': answers(question_list, index), 'passingScore': 70}
+
+
+def violation_report(num_violations: int, index: int) -> Dict[str, Any]:
+    rng = _rng('violations', num_violations, index)
+    violations = [{
+        'type': rng.choice(VIOLATION_TYPES),
+        'timestamp': f'2024-06-01T10:{(i // 60) % 60:02d}:{i % 60:02d}Z',
+        'severity': rng.choice(['low', 'medium', 'high']),
+        'details': 'Detected by the browser proctoring client',
+    } for i in range(num_violations)]
+    return {'assignmentId': f'assignment-{index}', 'violations': violations}
+
+
+def analyze_candidate(_size: int, index: int) -> Dict[str, Any]:
+    rng = _rng('analysis', index)
+    return {
+        'assessment': ASSESSMENT,
+        'submission': {'score': rng.randint(30, 100), 'timeSpent': rng.randint(10, 45),
+                       'violations': rng.randint(0, 5)},
+        'candidate': {'name': f'Candidate {index}', 'email': f'candidate{index}@example.com'},
+        'jobDescription': 'Build and operate Python services backed by PostgreSQL.',
+    }
+
+
+def grade_free_text(cohort_size: int, index: int, num_questions: int = 10) -> Dict[str, Any]:
+    """A cohort of submissions against one question set"""
+    question_list = questions(num_questions, free_text_ratio=0.5)
+    return {
+        'questions': question_list,
+        'submissions': [{'submissionId': f's{index}-{i}', 'answers': answers(question_list, index * 100000 + i)}
+                        for i in range(cohort_size)],
+        'passingScore': 70,
+    }
+
+
+def assessment_email(_size: int, index: int) -> Dict[str, Any]:
+    return {'assessment': ASSESSMENT, 'candidateEmail': f'candidate{index}@example.com', 'type': 'assigned'}
+
+
+def result_email(_size: int, index: int) -> Dict[str, Any]:
+    return {
+        'assessment': ASSESSMENT,
+        'submission': {'score': 40 + index % 60, 'timeSpent': 30, 'passed': index % 2 == 0},
+        'candidate': {'name': f'Candidate {index}', 'email': f'candidate{index}@example.com'},
+    }
+
+
+# name -> (method, path, payload generator, sweep dimension, default sizes)
+CORPORA = {
+    'health': ('GET', '/health', None, None, [0]),
+    'generate-assessment': ('POST', '/generate-assessment', generate_assessment, 'questions', [5, 20, 50]),
+    'generate-assessment-beginner': ('POST', '/generate-assessment', generate_beginner_assessment, 'questions', [5, 10]),
+    'evaluate-submission': ('POST', '/evaluate-submission', evaluate_submission, 'questions', [10, 50, 200]),
+    'violation-report': ('POST', '/generate-violation-report', violation_report, 'violations', [10, 100, 1000]),
+    'analyze-candidate': ('POST', '/analyze-candidate', analyze_candidate, None, [0]),
+    'grade-free-text': ('POST', '/grade-free-text', grade_free_text, 'cohort', [10, 50, 200]),
+    'assessment-email': ('POST', '/send-assessment-email', assessment_email, None, [0]),
+    'result-email': ('POST', '/send-result-email', result_email, None, [0]),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write the default benchmark corpora as JSON files')
+    parser.add_argument('--dump', required=True, help='output directory')
+    parser.add_argument('--requests', type=int, default=10, help='payloads per corpus and size')
+    args = parser.parse_args()
+
+    os.makedirs(args.dump, exist_ok=True)
+    for name, (method, path, make_payload, _dimension, sizes) in CORPORA.items():
+        for size in sizes:
+            payloads = [make_payload(size, i) if make_payload else None for i in range(args.requests)]
+            with open(os.path.join(args.dump, f'{name}-{size}.json'), 'w') as f:
+                json.dump({'method': method, 'path': path, 'size': size, 'payloads': payloads}, f, indent=2)
+    print(f"Wrote {len(CORPORA)} corpora to {args.dump}")
+
+
+if __name__ == '__main__':
+    main()
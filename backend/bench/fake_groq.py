@@ -0,0 +1,340 @@
+# backend/bench/fake_groq.py
+"""Local Groq/OpenAI-compatible stand-in with record, replay and synthetic modes.
+
+Point ai.py at it with GROQ_BASE_URL=http://localhost:8090 (any GROQ_API_KEY works).
+
+Usage (from backend/):
+    python bench/fake_groq.py --mode synthetic --latency-ms 800 --latency-sigma 0.4
+    python bench/fake_groq.py --latency-ms 800 --model llama-3.1-8b-instant=0.25:0.1   # faster, flakier small model
+    python bench/fake_groq.py --mode record --cassettes bench/cassettes   # needs a real GROQ_API_KEY
+    python bench/fake_groq.py --mode replay --cassettes bench/cassettes
+"""
+import os
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+
+from flask import Flask, request, jsonify, Response
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+UPSTREAM_URL = 'https://api.groq.com/openai/v1/chat/completions'
+
+
+def request_key(body: Dict[str, Any]) -> str:
+    """Stable cassette key for a chat completion request"""
+    relevant = {k: body.get(k) for k in ('model', 'messages', 'temperature', 'max_tokens', 'response_format')}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class SyntheticResponder:
+    """Plausible JSON answers for each prompt the backend sends"""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.random = random.Random(seed)
+
+    def content(self, prompt: str) -> str:
+        if 'Create a' in prompt and 'assessment for a' in prompt:
+            return self._assessment(prompt)
+        if 'proctoring violations' in prompt:
+            return self._violation_report(prompt)
+        if "candidate's assessment performance" in prompt:
+            return self._analysis(prompt)
+        if 'Grade these candidate answers' in prompt:
+            return self._grades(prompt)
+        return json.dumps({'message': 'synthetic response'})
+
+    def _assessment(self, prompt: str) -> str:
+        count = int((re.search(r'Generate (\d+) questions', prompt) or [0, 5])[1])
+        role = (re.search(r'for a (.+?) position', prompt) or [0, 'Software Developer'])[1]
+        questions = []
+        for i in range(1, count + 1):
+            questions.append({
+                'id': f'q{i}',
+                'question': f'Synthetic question {i} for {role}: which option is correct?',
+                'type': 'multiple_choice',
+                'options': [f'Option {j}' for j in range(1, 5)],
+                'correctAnswer': str(self.random.randint(0, 3)),
+                'codeTemplate': '',
+                'testCases': []
+            })
+        body = {
+            'title': f'{role} Assessment',
+            'description': f'Synthetic assessment for {role}',
+            'jobRole': role,
+            'type': 'multiple_choice',
+            'difficulty': 'intermediate',
+            'questions': questions,
+            'timeLimit': 30,
+            'passingScore': 70
+        }
+        return 'Here is the assessment:\n' + json.dumps(body, indent=2)
+
+    def _violation_report(self, prompt: str) -> str:
+        total = int((re.search(r'Total Violations: (\d+)', prompt) or [0, 0])[1])
+        high = total // 4
+        medium = total // 3
+        return json.dumps({
+            'summary': f'{total} violations detected during the session.',
+            'severityBreakdown': {'low': total - high - medium, 'medium': medium, 'high': high},
+            'recommendations': ['Review the recording for flagged intervals', 'Confirm identity before the next round'],
+            'confidence': self.random.choice(['high', 'medium', 'low'])
+        })
+
+    def _analysis(self, prompt: str) -> str:
+        score = int(float((re.search(r'Score: ([\d.]+)%', prompt) or [0, 0])[1]))
+        return json.dumps({
+            'skillsMatch': min(100, score + self.random.randint(-10, 10)),
+            'overallScore': score,
+            'overallAssessment': f'Candidate scored {score}% on the assessment.',
+            'strengths': ['Problem solving', 'Core language knowledge'],
+            'areasForImprovement': ['System design depth'],
+            'recommendation': 'Proceed to technical interview' if score >= 70 else 'Do not proceed'
+        })
+
+    def _grades(self, prompt: str) -> str:
+        count = len(re.findall(r'"index":', prompt))
+        return json.dumps({'grades': [{'index': i, 'correct': self.random.random() < 0.5} for i in range(count)]})
+
+
+class FakeGroq:
+    """Serves /openai/v1/chat/completions in one of three modes"""
+
+    def __init__(self, mode: str = 'synthetic', cassette_dir: Optional[str] = None,
+                 latency_ms: float = 0.0, latency_sigma: float = 0.0, tokens_per_second: float = 0.0,
+                 error_rate: float = 0.0, error_statuses: List[int] = (429, 500, 503),
+                 malformed_rate: float = 0.0, replay_latency: bool = False,
+                 upstream_url: str = UPSTREAM_URL, seed: Optional[int] = None,
+                 models: Optional[Dict[str, Tuple[float, float]]] = None):
+        if mode not in ('synthetic', 'record', 'replay'):
+            raise ValueError(f'Unknown mode {mode}')
+        if mode != 'synthetic' and not cassette_dir:
+            raise ValueError(f'{mode} mode needs a cassette directory')
+        self.mode = mode
+        self.cassette_dir = cassette_dir
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.malformed_rate = malformed_rate
+        self.replay_latency = replay_latency
+        self.upstream_url = upstream_url
+        # model -> (latency multiplier, malformed rate) for synthetic replies
+        self.models = dict(models or {})
+        self.random = random.Random(seed)
+        self.synthetic = SyntheticResponder(seed)
+        self.stats = {'requests': 0, 'errors': 0, 'malformed': 0, 'replayMisses': 0}
+        self.lock = threading.Lock()
+        if cassette_dir:
+            os.makedirs(cassette_dir, exist_ok=True)
+
+    def _count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+    def _latency(self) -> float:
+        """Lognormal around the median latency, in seconds"""
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.latency_sigma <= 0:
+            return self.latency_ms / 1000.0
+        return self.random.lognormvariate(0.0, self.latency_sigma) * self.latency_ms / 1000.0
+
+    def _cassette_path(self, key: str) -> str:
+        return os.path.join(self.cassette_dir, f'{key}.json')
+
+    def _completion(self, body: Dict[str, Any], content: str) -> Dict[str, Any]:
+        prompt = ''.join(str(m.get('content', '')) for m in body.get('messages', []))
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(content)
+        return {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'llama-3.3-70b-versatile'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        }
+
+    def _malform(self, content: str) -> str:
+        """Truncated JSON or prose with no JSON at all"""
+        if self.random.random() < 0.5 and len(content) > 20:
+            return content[:len(content) // 2]
+        return 'I am unable to produce that in JSON right now.'
+
+    def handle(self, body: Dict[str, Any]):
+        self._count('requests')
+        if self.error_rate and self.random.random() < self.error_rate:
+            self._count('errors')
+            status = self.random.choice(self.error_statuses)
+            time.sleep(self._latency() / 4)
+            return jsonify({'error': {'message': 'Injected upstream error', 'type': 'fake_groq'}}), status
+
+        recorded_latency = None
+        if self.mode == 'synthetic':
+            prompt = ''.join(str(m.get('content', '')) for m in body.get('messages', []))
+            completion = self._completion(body, self.synthetic.content(prompt))
+        else:
+            key = request_key(body)
+            path = self._cassette_path(key)
+            if self.mode == 'replay':
+                if not os.path.exists(path):
+                    self._count('replayMisses')
+                    return jsonify({'error': {'message': f'No cassette for request {key}'}}), 404
+                with open(path) as f:
+                    cassette = json.load(f)
+                completion = cassette['response']
+                recorded_latency = cassette.get('latencySeconds')
+            else:
+                completion, recorded_latency = self._record(body, path)
+                if completion is None:
+                    return jsonify({'error': {'message': 'Upstream request failed'}}), 502
+
+        latency_scale, malformed_rate = self.models.get(body.get('model'), (1.0, self.malformed_rate))
+        if malformed_rate and self.random.random() < malformed_rate:
+            self._count('malformed')
+            completion['choices'][0]['message']['content'] = self._malform(completion['choices'][0]['message']['content'])
+
+        if body.get('stream'):
+            return Response(self._stream(completion), mimetype='text/event-stream')
+
+        if self.mode == 'replay' and self.replay_latency and recorded_latency:
+            time.sleep(recorded_latency)
+        elif self.mode == 'synthetic':
+            delay = self._latency()
+            if self.tokens_per_second > 0:
+                delay += completion['usage']['completion_tokens'] / self.tokens_per_second
+            time.sleep(delay * latency_scale)
+        return jsonify(completion)
+
+    def _record(self, body: Dict[str, Any], path: str):
+        import requests
+        start = time.perf_counter()
+        upstream = requests.post(
+            self.upstream_url, json={**body, 'stream': False}, timeout=120,
+            headers={'Authorization': request.headers.get('Authorization', '')}
+        )
+        latency = time.perf_counter() - start
+        if upstream.status_code != 200:
+            return None, latency
+        completion = upstream.json()
+        with open(path, 'w') as f:
+            json.dump({'request': body, 'response': completion, 'latencySeconds': latency}, f, indent=2)
+        return completion, latency
+
+    def _stream(self, completion: Dict[str, Any]):
+        """Server-sent chunks: first token after the latency, then at tokens_per_second"""
+        time.sleep(self._latency())
+        content = completion['choices'][0]['message']['content']
+        chunk_size = 16
+        interval = (chunk_size / 4) / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        base = {k: completion[k] for k in ('id', 'created', 'model')}
+        for start in range(0, len(content), chunk_size):
+            chunk = {**base, 'object': 'chat.completion.chunk', 'choices': [{
+                'index': 0, 'delta': {'content': content[start:start + chunk_size]}, 'finish_reason': None
+            }]}
+            yield f'data: {json.dumps(chunk)}\n\n'
+            if interval:
+                time.sleep(interval)
+        final = {**base, 'object': 'chat.completion.chunk',
+                 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+                 'x_groq': {'usage': completion['usage']}}
+        yield f'data: {json.dumps(final)}\n\n'
+        yield 'data: [DONE]\n\n'
+
+
+def create_app(fake: FakeGroq) -> Flask:
+    app = Flask(__name__)
+
+    @app.route('/openai/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        return fake.handle(request.get_json(force=True))
+
+    @app.route('/stats', methods=['GET'])
+    def stats():
+        return jsonify({'mode': fake.mode, **fake.stats})
+
+    return app
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """No per-request access log while benchmarking"""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class FakeGroqServer:
+    """Run the stand-in on a background thread (for benchmarks)"""
+
+    def __init__(self, fake: FakeGroq, port: int = 8090):
+        self.fake = fake
+        self.server = make_server('127.0.0.1', port, create_app(fake), threaded=True,
+                                  request_handler=QuietRequestHandler)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> 'FakeGroqServer':
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+
+def parse_models(specs: List[str]) -> Dict[str, Tuple[float, float]]:
+    """"name=scale[:malformed]" options to FakeGroq(models=...)"""
+    models = {}
+    for spec in specs:
+        name, _, profile = spec.partition('=')
+        scale, _, malformed = profile.partition(':')
+        models[name] = (float(scale or 1), float(malformed or 0))
+    return models
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['synthetic', 'record', 'replay'], default='synthetic')
+    parser.add_argument('--cassettes', help='cassette directory for record/replay')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='median time to first byte')
+    parser.add_argument('--latency-sigma', type=float, default=0.0, help='lognormal sigma; 0 for fixed latency')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='generation rate; 0 for instant')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-statuses', default='429,500,503')
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--replay-latency', action='store_true', help='sleep for the recorded latency in replay')
+    parser.add_argument('--model', action='append', default=[], metavar='NAME=SCALE[:MALFORMED]',
+                        help='per-model latency multiplier and malformed rate, default 0 (repeatable)')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    fake = FakeGroq(
+        args.mode, args.cassettes, args.latency_ms, args.latency_sigma, args.tokens_per_second,
+        args.error_rate, [int(s) for s in args.error_statuses.split(',')], args.malformed_rate,
+        args.replay_latency, seed=args.seed, models=parse_models(args.model)
+    )
+    print(f"Fake Groq ({args.mode}) on http://127.0.0.1:{args.port}; set GROQ_BASE_URL to use it")
+    create_app(fake).run(host='127.0.0.1', port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
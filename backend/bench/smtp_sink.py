@@ -0,0 +1,149 @@
+# backend/bench/smtp_sink.py
+"""Local SMTP stand-in with STARTTLS, AUTH and injectable latency/failures.
+
+Run standalone (from backend/): python bench/smtp_sink.py --port 8025 --latency-ms 50
+"""
+import os
+import ssl
+import time
+import random
+import logging
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from typing import Dict, Any, Optional
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+SINK_USER = 'bench@localhost'
+SINK_PASSWORD = 'bench-password'
+
+# aiosmtpd logs every SMTP command at INFO
+logging.getLogger('mail.log').setLevel(logging.WARNING)
+
+
+def self_signed_cert(directory: str) -> tuple:
+    """Create a localhost certificate with openssl; returns (cert_path, key_path)"""
+    cert = os.path.join(directory, 'sink-cert.pem')
+    key = os.path.join(directory, 'sink-key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-keyout', key, '-out', cert, '-subj', '/CN=localhost',
+         '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1'],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+class SinkHandler:
+    """Accepts messages after an injected delay; fails a fraction with 451"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0,
+                 disconnect_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.disconnect_rate = disconnect_rate
+        self.accepted = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        delay = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000.0
+        if delay:
+            await asyncio.sleep(delay)
+        roll = random.random()
+        if roll < self.disconnect_rate:
+            with self.lock:
+                self.rejected += 1
+            return '421 Closing connection'
+        if roll < self.disconnect_rate + self.failure_rate:
+            with self.lock:
+                self.rejected += 1
+            return '451 Temporary failure, try again later'
+        with self.lock:
+            self.accepted += len(envelope.rcpt_tos)
+        return '250 Message accepted'
+
+
+def _authenticate(server, session, envelope, mechanism, auth_data):
+    ok = getattr(auth_data, 'login', None) == SINK_USER.encode() and \
+        getattr(auth_data, 'password', None) == SINK_PASSWORD.encode()
+    return AuthResult(success=ok)
+
+
+class SMTPSink:
+    """Background aiosmtpd server configured like a real submission port"""
+
+    def __init__(self, port: int = 8025, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 failure_rate: float = 0.0, disconnect_rate: float = 0.0, cert_dir: Optional[str] = None):
+        self.port = port
+        self.cert_dir = cert_dir or tempfile.mkdtemp(prefix='smtp-sink-')
+        self.cert, key = self_signed_cert(self.cert_dir)
+        tls_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        tls_context.load_cert_chain(self.cert, key)
+        self.handler = SinkHandler(latency_ms, jitter_ms, failure_rate, disconnect_rate)
+        self.controller = Controller(
+            self.handler, hostname='localhost', port=port, tls_context=tls_context,
+            require_starttls=True, authenticator=_authenticate, auth_require_tls=True
+        )
+
+    def client_ssl_context(self) -> ssl.SSLContext:
+        """Verifying client context that trusts the sink's certificate"""
+        context = ssl.create_default_context()
+        context.load_verify_locations(self.cert)
+        return context
+
+    def env(self) -> Dict[str, str]:
+        """Environment for pointing the email services at this sink"""
+        return {
+            'SMTP_SERVER': 'localhost',
+            'SMTP_PORT': str(self.port),
+            'EMAIL_USER': SINK_USER,
+            'EMAIL_PASSWORD': SINK_PASSWORD,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {'accepted': self.handler.accepted, 'rejected': self.handler.rejected}
+
+    def wait_for(self, count: int, timeout: float) -> bool:
+        """Block until `count` messages were accepted"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.handler.accepted >= count:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def start(self) -> 'SMTPSink':
+        self.controller.start()
+        return self
+
+    def stop(self) -> None:
+        self.controller.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--disconnect-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.port, args.latency_ms, args.jitter_ms, args.failure_rate, args.disconnect_rate).start()
+    print(f"SMTP sink on localhost:{args.port} (user {SINK_USER}, password {SINK_PASSWORD}, CA {sink.cert})")
+    try:
+        while True:
+            time.sleep(5)
+            print(sink.stats())
+    except KeyboardInterrupt:
+        sink.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+# backend/cohort_stats.py
+"""Cohort analytics: how a candidate compares to everyone who took the same assessment.
+
+Each assessment keeps its finalized scores and time-used ratios (time spent / time limit) as
+sorted lists, with fixed-bin histograms and running moments, all updated as attempts are
+finalized. Percentile rank and z-score are a bisect, O(log n), and the distributions are
+already counted. The attempt store is the source of truth: an assessment is rebuilt from it
+in one pandas batch the first time this process looks it up, again once it is
+COHORT_REFRESH_SECONDS old (to take in attempts finalized by other workers), and on demand
+for backfills.
+"""
+import os
+import math
+import time
+import bisect
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from grading import attempt_store
+
+logger = logging.getLogger(__name__)
+
+# Equal-width percentage bins over 0-100
+COHORT_SCORE_BINS = int(os.environ.get('COHORT_SCORE_BINS', 10))
+# Equal-width bins over 0-1 of the time limit used; overtime counts in the last bin
+COHORT_TIME_BINS = int(os.environ.get('COHORT_TIME_BINS', 10))
+# Rebuild an assessment from the attempt store on lookup once its index is this old
+COHORT_REFRESH_SECONDS = float(os.environ.get('COHORT_REFRESH_SECONDS', 300))
+
+# attempt id -> (percentage, share of the time limit used or None)
+Entry = Tuple[float, Optional[float]]
+
+
+def _bin(value: float, bins: int, upper: float) -> int:
+    return min(max(int(value * bins / upper), 0), bins - 1)
+
+
+def _bins(values: np.ndarray, bins: int, upper: float) -> np.ndarray:
+    """Vectorized _bin, for batch rebuilds"""
+    return np.clip((values * bins / upper).astype(np.int64), 0, bins - 1)
+
+
+def time_used(time_spent: Any, time_limit: Any) -> Optional[float]:
+    """Share of the time limit used; None without both"""
+    if time_spent is None or not time_limit:
+        return None
+    return float(time_spent) / float(time_limit)
+
+
+def percentile_rank(values: List[float], value: float) -> Optional[float]:
+    """Percent of the sorted values below value, counting ties as half"""
+    if not values:
+        return None
+    below = bisect.bisect_left(values, value)
+    equal = bisect.bisect_right(values, value) - below
+    return round((below + 0.5 * equal) / len(values) * 100, 2)
+
+
+def _quantile(values: List[float], q: float) -> float:
+    """Linear-interpolated quantile of a sorted list"""
+    position = q * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class CohortIndex:
+    """Sorted scores, time-used ratios, histograms and moments for one assessment"""
+
+    def __init__(self):
+        self.entries: Dict[str, Entry] = {}
+        self.scores: List[float] = []
+        self.time_used: List[float] = []
+        self.score_counts = np.zeros(COHORT_SCORE_BINS, dtype=np.int64)
+        self.time_counts = np.zeros(COHORT_TIME_BINS, dtype=np.int64)
+        self.sum = 0.0
+        self.sum2 = 0.0
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def from_frame(cls, frame) -> 'CohortIndex':
+        """Batch build from a DataFrame of attempt_id, percentage, time_spent, time_limit"""
+        index = cls()
+        frame = frame.dropna(subset=['percentage'])
+        if frame.empty:
+            return index
+        scores = frame['percentage'].to_numpy(dtype=np.float64)
+        limits = frame['time_limit'].to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            used = np.where(limits > 0, frame['time_spent'].to_numpy(dtype=np.float64) / limits, np.nan)
+        timed = used[~np.isnan(used)]
+
+        index.entries = {
+            attempt_id: (score, None if math.isnan(ratio) else ratio)
+            for attempt_id, score, ratio in zip(frame['attempt_id'], scores.tolist(), used.tolist())
+        }
+        index.scores = np.sort(scores).tolist()
+        index.time_used = np.sort(timed).tolist()
+        index.score_counts = np.bincount(_bins(scores, COHORT_SCORE_BINS, 100.0), minlength=COHORT_SCORE_BINS)
+        index.time_counts = np.bincount(_bins(timed, COHORT_TIME_BINS, 1.0), minlength=COHORT_TIME_BINS)
+        index.sum = float(scores.sum())
+        index.sum2 = float((scores * scores).sum())
+        return index
+
+    def add(self, attempt_id: str, score: float, used: Optional[float]) -> None:
+        """Insert one finalized attempt, replacing its previous entry"""
+        if attempt_id in self.entries:
+            self.remove(attempt_id)
+        self.entries[attempt_id] = (score, used)
+        bisect.insort(self.scores, score)
+        self.score_counts[_bin(score, COHORT_SCORE_BINS, 100.0)] += 1
+        self.sum += score
+        self.sum2 += score * score
+        if used is not None:
+            bisect.insort(self.time_used, used)
+            self.time_counts[_bin(used, COHORT_TIME_BINS, 1.0)] += 1
+
+    def remove(self, attempt_id: str) -> None:
+        score, used = self.entries.pop(attempt_id)
+        del self.scores[bisect.bisect_left(self.scores, score)]
+        self.score_counts[_bin(score, COHORT_SCORE_BINS, 100.0)] -= 1
+        self.sum -= score
+        self.sum2 -= score * score
+        if used is not None:
+            del self.time_used[bisect.bisect_left(self.time_used, used)]
+            self.time_counts[_bin(used, COHORT_TIME_BINS, 1.0)] -= 1
+
+    def moments(self) -> Tuple[float, float]:
+        """(mean, population standard deviation) of the scores"""
+        n = len(self.scores)
+        mean = self.sum / n
+        return mean, math.sqrt(max(self.sum2 / n - mean * mean, 0.0))
+
+    def rank(self, score: float, used: Optional[float] = None) -> Dict[str, Any]:
+        """Percentile rank and z-score of a score, and how its time compares"""
+        mean, std = self.moments()
+        z_score = (score - mean) / std if len(self.scores) > 1 and std > 1e-9 else None
+        time_percentile = percentile_rank(self.time_used, used) if used is not None else None
+        return {
+            'cohortSize': len(self.scores),
+            'score': score,
+            'percentileRank': percentile_rank(self.scores, score),
+            'zScore': round(z_score, 3) if z_score is not None else None,
+            'timeUsed': round(used, 4) if used is not None else None,
+            # Share of timed candidates who took longer
+            'fasterThanPercent': round(100 - time_percentile, 2) if time_percentile is not None else None,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary statistics and both distributions"""
+        mean, std = self.moments()
+        return {
+            'submissions': len(self.scores),
+            'mean': round(mean, 2),
+            'std': round(std, 2),
+            'min': self.scores[0],
+            'max': self.scores[-1],
+            'quartiles': [round(_quantile(self.scores, q), 2) for q in (0.25, 0.5, 0.75)],
+            'scoreHistogram': {
+                'edges': np.linspace(0, 100, COHORT_SCORE_BINS + 1).round(2).tolist(),
+                'counts': self.score_counts.tolist(),
+            },
+            'timeUsedHistogram': {
+                'timed': len(self.time_used),
+                'edges': np.linspace(0, 1, COHORT_TIME_BINS + 1).round(3).tolist(),
+                'counts': self.time_counts.tolist(),
+                'median': round(_quantile(self.time_used, 0.5), 4) if self.time_used else None,
+            },
+        }
+
+
+def cohort_frame(assessment_id: Optional[str] = None):
+    """Finalized attempts (one assessment, or all) as a DataFrame for batch rebuilds"""
+    import pandas as pd
+
+    query = ("SELECT assessment_id, attempt_id, json_extract(result, '$.percentage') AS percentage, "
+             "time_spent, time_limit FROM attempts WHERE result IS NOT NULL AND assessment_id IS NOT NULL")
+    params: Tuple = ()
+    if assessment_id is not None:
+        query += ' AND assessment_id = ?'
+        params = (assessment_id,)
+    with attempt_store.reader() as conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+
+class CohortStatsStore:
+    """Cohort indexes for the assessments looked up by this process"""
+
+    def __init__(self, refresh_seconds: float = COHORT_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.assessments: Dict[str, CohortIndex] = {}
+        # Attempts finalized while their assessment is being rebuilt, applied after the swap
+        self.pending: Dict[str, List[Tuple[str, float, Optional[float]]]] = {}
+        self.lock = threading.Lock()
+
+    def record(self, assessment_id: str, attempt_id: str, score: float, used: Optional[float]) -> None:
+        """Fold a finalized attempt into its assessment's index, if this process holds one"""
+        with self.lock:
+            if assessment_id in self.pending:
+                self.pending[assessment_id].append((attempt_id, score, used))
+            index = self.assessments.get(assessment_id)
+            # An assessment not loaded yet is built from the store, which already has this attempt
+            if index is not None:
+                index.add(attempt_id, score, used)
+
+    def record_attempt(self, attempt_id: str) -> None:
+        """record() for a finalized attempt in the attempt store"""
+        entry = attempt_store.cohort_entry(attempt_id)
+        if entry and entry['assessment_id'] and entry['percentage'] is not None:
+            self.record(entry['assessment_id'], attempt_id, entry['percentage'],
+                        time_used(entry['time_spent'], entry['time_limit']))
+
+    def backfill(self, assessment_id: str) -> CohortIndex:
+        """Rebuild one assessment from the attempt store"""
+        with self.lock:
+            self.pending.setdefault(assessment_id, [])
+        try:
+            index = CohortIndex.from_frame(cohort_frame(assessment_id))
+        finally:
+            with self.lock:
+                pending = self.pending.pop(assessment_id, [])
+        with self.lock:
+            for attempt_id, score, used in pending:
+                index.add(attempt_id, score, used)
+            self.assessments[assessment_id] = index
+        return index
+
+    def backfill_all(self) -> Dict[str, int]:
+        """Rebuild every assessment in the attempt store; assessment id -> submissions"""
+        frame = cohort_frame()
+        built = {assessment_id: CohortIndex.from_frame(group)
+                 for assessment_id, group in frame.groupby('assessment_id', sort=False)}
+        with self.lock:
+            self.assessments.update(built)
+        logger.info(f"Rebuilt cohort stats for {len(built)} assessments ({len(frame)} attempts)")
+        return {assessment_id: len(index.scores) for assessment_id, index in built.items()}
+
+    def _index(self, assessment_id: str) -> CohortIndex:
+        with self.lock:
+            index = self.assessments.get(assessment_id)
+        if index is None or time.monotonic() - index.built_at > self.refresh_seconds:
+            index = self.backfill(assessment_id)
+        return index
+
+    def get(self, assessment_id: str) -> Optional[Dict[str, Any]]:
+        index = self._index(assessment_id)
+        with self.lock:
+            return index.snapshot() if index.scores else None
+
+    def rank(self, assessment_id: str, score: float, used: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        index = self._index(assessment_id)
+        with self.lock:
+            return index.rank(score, used) if index.scores else None
+
+    def rank_attempt(self, attempt_id: str) -> Optional[Dict[str, Any]]:
+        """Cohort standing of a finalized attempt; None if it is unknown or not finalized"""
+        entry = attempt_store.cohort_entry(attempt_id)
+        if not entry or not entry['assessment_id'] or entry['percentage'] is None:
+            return None
+        ranked = self.rank(entry['assessment_id'], entry['percentage'],
+                           time_used(entry['time_spent'], entry['time_limit']))
+        return dict(ranked, assessmentId=entry['assessment_id']) if ranked else None
+
+
+# Shared store used by the Flask routes
+cohort_stats = CohortStatsStore()
@@ -0,0 +1,140 @@
+# backend/digest.py
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from email_templates import render as render_template, render_digest
+from outbox import Outbox
+
+logger = logging.getLogger(__name__)
+
+# Seconds to hold non-urgent notifications per recipient; 0 disables coalescing
+DIGEST_WINDOW_SECONDS = float(os.environ.get('DIGEST_WINDOW_SECONDS', 120))
+# Email types that are always sent immediately
+DIGEST_URGENT_TYPES = {
+    t.strip() for t in os.environ.get('DIGEST_URGENT_TYPES', 'passed,failed').split(',') if t.strip()
+}
+
+
+class DigestCoalescer:
+    """Merges bursts of non-urgent notifications per recipient into one digest email.
+
+    The first notification to a recipient goes out at once and opens a window; any that follow
+    within it are held in the outbox database as 'held' rows and merged into a single digest when
+    the window closes, so one isolated invitation is never delayed. Held rows have a message id
+    (their /email-status follows the digest), keep the caller's idempotency key and survive a
+    restart. Every worker runs a flusher; claiming the due rows and enqueueing their digest is one
+    transaction, so each digest is sent once.
+    """
+
+    def __init__(self, outbox: Outbox, window: float = DIGEST_WINDOW_SECONDS,
+                 urgent_types=DIGEST_URGENT_TYPES, poll_interval: float = 1.0):
+        self.outbox = outbox
+        self.window = window
+        self.urgent_types = set(urgent_types)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pid: Optional[int] = None
+
+    def submit(self, to_email: str, template_name: str, context: Dict[str, Any],
+               idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Send now if urgent or the recipient's window is closed, otherwise hold until it closes"""
+        if self.window <= 0 or template_name in self.urgent_types:
+            subject, plain_message, html_message = render_template(template_name, **context)
+            message_id = self.outbox.enqueue(to_email, subject, plain_message, html_message, idempotency_key)
+            return {'held': False, 'messageId': message_id}
+
+        self.start()
+        recipient = to_email.strip().lower()
+        now = time.time()
+        with self.outbox.transaction() as db:
+            flush_at = db.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE recipient = ? AND status = 'held'", (recipient,)
+            ).fetchone()[0]
+            if flush_at is None:
+                recent = db.execute(
+                    "SELECT 1 FROM outbox WHERE recipient = ? AND status != 'held' AND created_at > ? LIMIT 1",
+                    (recipient, now - self.window)
+                ).fetchone()
+                if recent is None:
+                    subject, plain_message, html_message = render_template(template_name, **context)
+                    message = {'to': to_email, 'subject': subject, 'text': plain_message, 'html': html_message}
+                    message_id = self.outbox.insert(db, message, idempotency_key, recipient=recipient)
+                    return {'held': False, 'messageId': message_id}
+                flush_at = now + self.window
+            notification = {'to': to_email, 'template': template_name, 'context': context}
+            message_id = self.outbox.insert(db, notification, idempotency_key, status='held', due=flush_at,
+                                            recipient=recipient)
+            pending = db.execute(
+                "SELECT COUNT(*) FROM outbox WHERE recipient = ? AND status = 'held'", (recipient,)
+            ).fetchone()[0]
+        return {'held': True, 'messageId': message_id, 'pending': pending, 'flushAt': flush_at}
+
+    def start(self) -> None:
+        """Start the flusher thread (and the outbox workers it feeds) once per process"""
+        self.outbox.start()
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop.clear()
+            threading.Thread(target=self._run, name='digest-flusher', daemon=True).start()
+            self._pid = os.getpid()
+
+    def stop(self) -> None:
+        """Stop flushing in this process; held notifications stay in the outbox for the next one"""
+        self._stop.set()
+        self._pid = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Digest flush failed: {str(e)}")
+
+    def flush(self, force: bool = False) -> int:
+        """Enqueue every digest whose window has closed; returns the number of emails queued"""
+        due = float('inf') if force else time.time()
+        flushed = 0
+        with self.outbox.transaction() as db:
+            recipients = [row[0] for row in db.execute(
+                "SELECT DISTINCT recipient FROM outbox WHERE status = 'held' AND next_attempt_at <= ?", (due,)
+            )]
+            for recipient in recipients:
+                rows = db.execute(
+                    "SELECT id, payload FROM outbox WHERE recipient = ? AND status = 'held' ORDER BY created_at",
+                    (recipient,)
+                ).fetchall()
+                held_ids = [row[0] for row in rows]
+                items = [json.loads(row[1]) for row in rows]
+                try:
+                    if len(items) == 1:
+                        subject, plain_message, html_message = render_template(items[0]['template'],
+                                                                                **items[0]['context'])
+                    else:
+                        recipient_name = items[0]['context'].get('recipient_name', 'Candidate')
+                        subject, plain_message, html_message = render_digest(
+                            recipient_name, [(item['template'], item['context']) for item in items]
+                        )
+                except Exception as e:
+                    logger.error(f"Failed to render digest for {recipient}: {str(e)}")
+                    db.executemany(
+                        "UPDATE outbox SET status = 'failed', last_error = ?, updated_at = ? WHERE id = ?",
+                        [(f'Digest rendering failed: {e}', time.time(), held_id) for held_id in held_ids]
+                    )
+                    continue
+                message = {'to': items[-1]['to'], 'subject': subject, 'text': plain_message, 'html': html_message}
+                digest_id = self.outbox.insert(db, message, recipient=recipient)
+                db.executemany(
+                    "UPDATE outbox SET status = 'merged', merged_into = ?, updated_at = ? WHERE id = ?",
+                    [(digest_id, time.time(), held_id) for held_id in held_ids]
+                )
+                logger.info(f"Flushed {len(items)} notifications to {recipient}")
+                flushed += 1
+        return flushed
@@ -0,0 +1,411 @@
+# backend/email_templates.py
+import re
+from html import escape
+from string import Formatter
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+from metrics import CACHE_LOOKUPS, CACHE_MISSES
+
+# Shared HTML shell; {title} is fixed per template, {content} is the body template
+HTML_SHELL = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <title>{title}</title>
+        <style>
+            body {{
+                font-family: Arial, sans-serif;
+                line-height: 1.6;
+                color: #333;
+                max-width: 600px;
+                margin: 0 auto;
+                padding: 20px;
+            }}
+            .header {{
+                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                color: white;
+                padding: 30px;
+                text-align: center;
+                border-radius: 10px 10px 0 0;
+            }}
+            .content {{
+                background: #f8f9fa;
+                padding: 30px;
+                border: 1px solid #e9ecef;
+            }}
+            .footer {{
+                background: #6c757d;
+                color: white;
+                padding: 20px;
+                text-align: center;
+                border-radius: 0 0 10px 10px;
+                font-size: 14px;
+            }}
+            .btn {{
+                display: inline-block;
+                padding: 12px 24px;
+                background: #007bff;
+                color: white;
+                text-decoration: none;
+                border-radius: 5px;
+                margin: 10px 0;
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>{title}</h1>
+        </div>
+        <div class="content">
+            {content}
+        </div>
+        <div class="footer">
+            <p>Assessment Platform &copy; 2024</p>
+        </div>
+    </body>
+    </html>
+    """
+
+_STYLE_BLOCK = re.compile(r'\s*<style>(.*?)</style>', re.S)
+_CSS_RULE = re.compile(r'([.\w-]+)\s*\{\{(.*?)\}\}', re.S)
+
+
+def inline_css(html: str) -> str:
+    """Move the shell's <style> rules onto the elements (many mail clients drop <style>)"""
+    match = _STYLE_BLOCK.search(html)
+    if not match:
+        return html
+    html = html[:match.start()] + html[match.end():]
+    for selector, declarations in _CSS_RULE.findall(match.group(1)):
+        style = ' '.join(line.strip() for line in declarations.strip().splitlines())
+        if selector.startswith('.'):
+            html = html.replace(f'class="{selector[1:]}"', f'class="{selector[1:]}" style="{style}"')
+        else:
+            html = html.replace(f'<{selector}>', f'<{selector} style="{style}">')
+    return html
+
+
+# Slot values repeat heavily (titles, roles, names across a cohort)
+_escape = lru_cache(maxsize=4096)(escape)
+
+
+class CompiledTemplate:
+    """Static text segments interleaved with named slots"""
+
+    __slots__ = ('segments', 'slots', 'html', 'raw')
+
+    def __init__(self, source: str, html: bool = False, raw: Tuple[str, ...] = ()):
+        self.segments: List[str] = []
+        self.slots: List[str] = []
+        self.html = html
+        self.raw = raw
+        for literal, field, _, _ in Formatter().parse(source):
+            self.segments.append(literal)
+            if field is not None:
+                self.slots.append(field)
+        if len(self.segments) == len(self.slots):
+            self.segments.append('')
+
+    def _value(self, slot: str, context: Dict[str, Any]) -> str:
+        if self.html and slot not in self.raw:
+            return _escape(str(context[slot]))
+        return str(context[slot])
+
+    def bind(self, context: Dict[str, Any]) -> 'CompiledTemplate':
+        """Copy with the slots in context filled in; the remaining slots stay open"""
+        bound = CompiledTemplate.__new__(CompiledTemplate)
+        bound.html, bound.raw = self.html, self.raw
+        bound.segments, bound.slots = [self.segments[0]], []
+        for slot, literal in zip(self.slots, self.segments[1:]):
+            if slot in context:
+                bound.segments[-1] += self._value(slot, context) + literal
+            else:
+                bound.slots.append(slot)
+                bound.segments.append(literal)
+        return bound
+
+    def render(self, context: Dict[str, Any]) -> str:
+        values = [self._value(slot, context) for slot in self.slots]
+        parts = [None] * (len(self.segments) + len(values))
+        parts[::2] = self.segments
+        parts[1::2] = values
+        return ''.join(parts)
+
+
+class EmailTemplate:
+    """Subject, plain text and HTML templates for one email type"""
+
+    def __init__(self, subject: str, plain: str, content: str, title: str, raw: Tuple[str, ...] = ()):
+        self.subject = CompiledTemplate(subject)
+        self.plain = CompiledTemplate(plain)
+        self.content = CompiledTemplate(content, html=True, raw=raw)
+        shell = inline_css(HTML_SHELL).replace('{title}', title)
+        self.html = CompiledTemplate(shell.replace('{content}', content), html=True, raw=raw)
+
+    def render(self, context: Dict[str, Any]) -> Tuple[str, str, str]:
+        return self.subject.render(context), self.plain.render(context), self.html.render(context)
+
+    def bind(self, context: Dict[str, Any]) -> 'EmailTemplate':
+        """Copy with the slots in context filled in, leaving the rest (e.g. the name) per recipient"""
+        bound = EmailTemplate.__new__(EmailTemplate)
+        for part in ('subject', 'plain', 'content', 'html'):
+            setattr(bound, part, getattr(self, part).bind(context))
+        return bound
+
+    def render_section(self, context: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Subject, plain text and inner HTML, for embedding in a digest"""
+        return self.subject.render(context), self.plain.render(context), self.content.render(context)
+
+
+ASSIGNED = EmailTemplate(
+    subject="Assessment Invitation: {title}",
+    plain="""Dear {recipient_name},
+
+You have been invited to take the assessment: {title}
+
+Assessment Details:
+• Description: {description}
+• Time Limit: {time_limit} minutes
+• Job Role: {job_role}
+• Difficulty: {difficulty}
+
+Please log in to your account to complete the assessment at your earliest convenience.
+
+Important Notes:
+- Make sure you have a stable internet connection
+- Complete the assessment in one session
+- Contact support if you experience any technical issues
+
+Best regards,
+Assessment Team
+""",
+    content="""
+        <h2>Assessment Invitation</h2>
+        <p>Dear {recipient_name},</p>
+        <p>You have been invited to take the following assessment:</p>
+        <h3>{title}</h3>
+        <div style="background: #e9ecef; padding: 20px; border-radius: 5px; margin: 20px 0;">
+            <p><strong>Description:</strong> {description}</p>
+            <p><strong>Time Limit:</strong> {time_limit} minutes</p>
+            <p><strong>Job Role:</strong> {job_role}</p>
+            <p><strong>Difficulty:</strong> {difficulty}</p>
+        </div>
+        <p>Please log in to your account to complete the assessment.</p>
+        <p><strong>Important:</strong> Ensure you have a stable internet connection and complete the assessment in one session.</p>
+        """,
+    title="Assessment Notification"
+)
+
+COMPLETED = EmailTemplate(
+    subject="Assessment Completed: {title}",
+    plain="""Dear {recipient_name},
+
+Thank you for completing the assessment: {title}
+
+Your submission has been received and will be reviewed by our team. You will be notified once the evaluation is complete.
+
+Assessment Summary:
+• Completed on: {completed_on}
+• Duration: {duration}
+
+Next Steps:
+Our team will review your responses and provide feedback within 3-5 business days.
+
+Thank you for your participation.
+
+Best regards,
+Assessment Team
+""",
+    content="""
+        <h2>Assessment Completed Successfully</h2>
+        <p>Thank you for completing: <strong>{title}</strong></p>
+        <div style="background: #d4edda; padding: 20px; border-radius: 5px; margin: 20px 0; border-left: 4px solid #28a745;">
+            <p><strong>Completed on:</strong> {completed_on}</p>
+            <p><strong>Duration:</strong> {duration}</p>
+        </div>
+        <p>Your submission has been received and will be reviewed by our team.</p>
+        <p><strong>Next Steps:</strong> You will receive feedback within 3-5 business days.</p>
+        """,
+    title="Assessment Notification"
+)
+
+PASSED = EmailTemplate(
+    subject="Assessment Results: {title}",
+    plain="""Dear {recipient_name},
+
+Congratulations! You have successfully passed the assessment: {title}
+
+Your Results:
+• Score: {score}%
+• Time Spent: {time_spent} minutes
+• Status: PASSED ✓
+
+We are impressed with your performance and will be in touch regarding the next steps in the process.
+
+Keep up the excellent work!
+
+Best regards,
+Assessment Team
+""",
+    content="""
+        <h2>Congratulations! 🎉</h2>
+        <p>Dear {recipient_name},</p>
+        <p>You have successfully <strong style="color: #28a745;">PASSED</strong> the assessment: <strong>{title}</strong></p>
+        <div style="background: #d4edda; padding: 20px; border-radius: 5px; margin: 20px 0; border-left: 4px solid #28a745;">
+            <p><strong>Score:</strong> {score}%</p>
+            <p><strong>Time Spent:</strong> {time_spent} minutes</p>
+            <p><strong>Status:</strong> <span style="color: #28a745;">PASSED ✓</span></p>
+        </div>
+        <p>We are impressed with your performance and will be in touch regarding the next steps.</p>
+        """,
+    title="Assessment Results"
+)
+
+FAILED = EmailTemplate(
+    subject="Assessment Results: {title}",
+    plain="""Dear {recipient_name},
+
+Thank you for completing the assessment: {title}
+
+Your Results:
+• Score: {score}%
+• Time Spent: {time_spent} minutes
+• Status: Not Passed
+
+While you didn't meet the passing criteria this time, we appreciate your effort and encourage you to continue developing your skills.
+
+We wish you the best in your future endeavors.
+
+Best regards,
+Assessment Team
+""",
+    content="""
+        <h2>Assessment Results</h2>
+        <p>Dear {recipient_name},</p>
+        <p>Thank you for completing the assessment: <strong>{title}</strong></p>
+        <div style="background: #f8d7da; padding: 20px; border-radius: 5px; margin: 20px 0; border-left: 4px solid #dc3545;">
+            <p><strong>Score:</strong> {score}%</p>
+            <p><strong>Time Spent:</strong> {time_spent} minutes</p>
+            <p><strong>Status:</strong> <span style="color: #dc3545;">Not Passed</span></p>
+        </div>
+        <p>While you didn't meet the passing criteria this time, we encourage you to continue developing your skills.</p>
+        """,
+    title="Assessment Results"
+)
+
+EXPORT = EmailTemplate(
+    subject="Cohort Export: {title}",
+    plain="""Hello,
+
+The results export for {title} is attached ({filename}, {rows} candidates, gzip-compressed {format}).
+
+Best regards,
+Assessment Team
+""",
+    content="""
+        <h2>Cohort Export</h2>
+        <p>The results export for <strong>{title}</strong> is attached.</p>
+        <div style="background: #f8f9fa; padding: 20px; border-radius: 5px; margin: 20px 0;">
+            <p><strong>File:</strong> {filename}</p>
+            <p><strong>Candidates:</strong> {rows}</p>
+            <p><strong>Format:</strong> gzip-compressed {format}</p>
+        </div>
+        """,
+    title="Cohort Export"
+)
+
+# Sections are pre-rendered (and escaped) by render_digest
+DIGEST = EmailTemplate(
+    subject="Assessment Updates: {count} new notifications",
+    plain="""Dear {recipient_name},
+
+You have {count} new assessment notifications.
+
+{sections}
+Best regards,
+Assessment Team
+""",
+    content="""
+        <h2>Your Assessment Updates</h2>
+        <p>Dear {recipient_name},</p>
+        <p>You have {count} new assessment notifications.</p>
+        {sections}
+        """,
+    title="Assessment Updates",
+    raw=('sections',)
+)
+
+# Compiled once at import
+TEMPLATES: Dict[str, EmailTemplate] = {
+    'assigned': ASSIGNED,
+    'completed': COMPLETED,
+    'passed': PASSED,
+    'failed': FAILED,
+    'digest': DIGEST,
+    'export': EXPORT,
+}
+
+
+_render_lookups = CACHE_LOOKUPS.labels('email_render')
+_render_misses = CACHE_MISSES.labels('email_render')
+
+
+@lru_cache(maxsize=1024)
+def _render_cached(template_name: str, items: Tuple[Tuple[str, Any], ...]) -> Tuple[str, str, str]:
+    _render_misses.inc()
+    return TEMPLATES[template_name].render(dict(items))
+
+
+def render(template_name: str, **context: Any) -> Tuple[str, str, str]:
+    """Render (subject, plain, html) for an email type, cached on identical inputs"""
+    if template_name not in TEMPLATES:
+        raise KeyError(f'Unknown email template {template_name}')
+    _render_lookups.inc()
+    try:
+        return _render_cached(template_name, tuple(context.items()))
+    except TypeError:
+        # Unhashable slot value; render without caching
+        _render_misses.inc()
+        return TEMPLATES[template_name].render(context)
+
+
+def bind(template_name: str, **context: Any) -> EmailTemplate:
+    """Template with the given slots rendered once; render() the returned one with the rest"""
+    if template_name not in TEMPLATES:
+        raise KeyError(f'Unknown email template {template_name}')
+    return TEMPLATES[template_name].bind(context)
+
+
+def assessment_context(assessment: Dict[str, Any], email_type: str) -> Dict[str, Any]:
+    """Slot values taken from an assessment, with the routes' historical defaults"""
+    if email_type == 'assigned':
+        return {
+            'title': assessment.get('title', 'New Assessment'),
+            'description': assessment.get('description', 'No description provided'),
+            'time_limit': assessment.get('timeLimit', 30),
+            'job_role': assessment.get('jobRole', 'Not specified'),
+            'difficulty': assessment.get('difficulty', 'Medium'),
+        }
+    return {'title': assessment.get('title', 'Assessment')}
+
+
+def render_digest(recipient_name: str, items: List[Tuple[str, Dict[str, Any]]]) -> Tuple[str, str, str]:
+    """Merge several (template_name, context) notifications into one email"""
+    plain_sections = []
+    html_sections = []
+    for template_name, context in items:
+        subject, plain, content = TEMPLATES[template_name].render_section(context)
+        plain_sections.append(f"{subject}\n{'-' * len(subject)}\n{plain}\n")
+        html_sections.append(
+            '<div style="border-top: 1px solid #dee2e6; margin-top: 20px; padding-top: 10px;">'
+            f'{content}</div>'
+        )
+    digest = TEMPLATES['digest']
+    count = len(items)
+    return (
+        digest.subject.render({'count': count}),
+        digest.plain.render({'recipient_name': recipient_name, 'count': count, 'sections': ''.join(plain_sections)}),
+        digest.html.render({'recipient_name': recipient_name, 'count': count, 'sections': ''.join(html_sections)})
+    )
@@ -0,0 +1,257 @@
+# backend/exports.py
+"""Streaming cohort exports: one row per attempt of an assessment, as CSV or NDJSON.
+
+Rows are read from the attempt store a batch at a time and written out as they arrive, so memory
+stays flat whatever the cohort size. The same chunk generators feed the download (gzip-compressed
+on the fly when the client accepts it) and the emailed attachment, which is spooled to disk
+compressed and handed to the outbox.
+
+Both routes need a signed-in interviewer who created the assessment, and an emailed export only
+goes to that interviewer's own address.
+"""
+import io
+import os
+import re
+import csv
+import json
+import zlib
+import uuid
+import logging
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Blueprint, Response, g, jsonify, request
+
+import email_service
+from auth import interviewer_required
+from email_templates import render as render_template
+from face_presence import face_analyzer
+from grading import attempt_store
+from responses import GZIP_LEVEL, dumps
+
+logger = logging.getLogger(__name__)
+
+# Export routes; registered by app.create_app()
+bp = Blueprint('exports', __name__)
+
+# Compressed exports waiting to be emailed; the outbox deletes each once its message is done
+EXPORT_SPOOL_DIR = os.environ.get(
+    'EXPORT_SPOOL_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'export_spool')
+)
+# Rows encoded per chunk written to the client or the spool file
+EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', 200))
+# Most providers reject messages over 25 MB, and base64 adds a third
+EXPORT_MAX_ATTACHMENT_BYTES = int(os.environ.get('EXPORT_MAX_ATTACHMENT_BYTES', 15 * 1024 ** 2))
+
+FIELDS = [
+    'attemptId', 'candidateName', 'candidateEmail', 'status', 'score', 'totalQuestions', 'percentage',
+    'passed', 'passingScore', 'timeSpent', 'startedAt', 'completedAt', 'violations', 'snapshots',
+    'absentWindows', 'multipleFaceWindows', 'absentSeconds', 'missingWindows', 'skillsMatch',
+    'overallAssessment', 'strengths', 'areasForImprovement', 'recommendation',
+]
+
+# format -> (mimetype, file extension)
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+# Cells a spreadsheet would evaluate as a formula
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class AttachmentTooLarge(ValueError):
+    pass
+
+
+def _iso(seconds: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat() if seconds else None
+
+
+def cohort_rows(assessment_id: str) -> Iterator[Dict[str, Any]]:
+    """Export rows: score, pass/fail, violation aggregates and candidate analysis per attempt"""
+    for attempt in attempt_store.iter_cohort(assessment_id):
+        result = json.loads(attempt['result']) if attempt['result'] else {}
+        analysis = json.loads(attempt['analysis']) if attempt['analysis'] else {}
+        percentage = result.get('percentage')
+        yield {
+            'attemptId': attempt['attempt_id'],
+            'candidateName': attempt['candidate_name'],
+            'candidateEmail': attempt['candidate_email'],
+            'status': 'completed' if result else 'in_progress',
+            'score': result.get('score'),
+            'totalQuestions': result.get('totalQuestions'),
+            'percentage': round(percentage, 2) if percentage is not None else None,
+            'passed': result.get('passed'),
+            'passingScore': attempt['passing_score'],
+            'timeSpent': attempt['time_spent'],
+            'startedAt': _iso(attempt['started_at']),
+            'completedAt': _iso(attempt['completed_at']),
+            'violations': attempt['violations'],
+            **face_analyzer.summary(attempt['attempt_id'], attempt['started_at'], attempt['completed_at']),
+            'skillsMatch': analysis.get('skillsMatch'),
+            'overallAssessment': analysis.get('overallAssessment'),
+            'strengths': analysis.get('strengths'),
+            'areasForImprovement': analysis.get('areasForImprovement'),
+            'recommendation': analysis.get('recommendation'),
+        }
+
+
+def _csv_cell(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, list):
+        value = '; '.join(str(item) for item in value)
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Header, then EXPORT_CHUNK_ROWS rows per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_cell(row.get(field)) for field in FIELDS])
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """One JSON object per line, EXPORT_CHUNK_ROWS lines per chunk"""
+    lines: List[str] = []
+    for row in rows:
+        lines.append(dumps(row))
+        if len(lines) == EXPORT_CHUNK_ROWS:
+            yield ('\n'.join(lines) + '\n').encode()
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+ENCODERS = {'csv': csv_chunks, 'ndjson': ndjson_chunks}
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Incremental gzip stream of the chunks"""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def open_export(assessment_id: str, export_format: str) -> Tuple[Optional[Iterator[bytes]], List[int]]:
+    """(encoded chunks, [row count so far]); chunks is None for an assessment without attempts"""
+    rows = cohort_rows(assessment_id)
+    first = next(rows, None)
+    if first is None:
+        return None, [0]
+    counter = [0]
+
+    def counted():
+        for row in chain([first], rows):
+            counter[0] += 1
+            yield row
+
+    return ENCODERS[export_format](counted()), counter
+
+
+def export_filename(assessment_id: str, export_format: str) -> str:
+    safe_id = re.sub(r'[^\w.-]', '_', assessment_id)
+    return f"{safe_id}-cohort-{datetime.now().strftime('%Y%m%d')}.{FORMATS[export_format][1]}"
+
+
+def spool_export(chunks: Iterator[bytes]) -> Tuple[str, int]:
+    """Write the gzip-compressed chunks to a spool file; (path, compressed bytes)"""
+    os.makedirs(EXPORT_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_SPOOL_DIR, f'{uuid.uuid4().hex}.gz')
+    size = 0
+    try:
+        with open(path, 'wb') as f:
+            for compressed in gzip_chunks(chunks):
+                size += len(compressed)
+                if size > EXPORT_MAX_ATTACHMENT_BYTES:
+                    raise AttachmentTooLarge(
+                        f'Compressed export exceeds {EXPORT_MAX_ATTACHMENT_BYTES} bytes; download it instead'
+                    )
+                f.write(compressed)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, size
+
+
+@bp.route('/assessments/<assessment_id>/export', methods=['GET'])
+@interviewer_required
+def export_cohort(assessment_id):
+    """Stream the cohort as CSV or NDJSON (?format=), gzip-compressed when accepted"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(FORMATS)}"}), 400
+    try:
+        chunks, _ = open_export(assessment_id, export_format)
+        if chunks is None:
+            return jsonify({"error": "No attempts recorded for this assessment"}), 404
+
+        headers = {
+            'Content-Disposition': f'attachment; filename="{export_filename(assessment_id, export_format)}"',
+            'X-Cohort-Attempts': str(attempt_store.cohort_size(assessment_id)),
+        }
+        if request.accept_encodings.best_match(['gzip']):
+            chunks = gzip_chunks(chunks)
+            headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+        return Response(chunks, mimetype=FORMATS[export_format][0], headers=headers)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route('/assessments/<assessment_id>/export/email', methods=['POST'])
+@interviewer_required
+def email_cohort_export(assessment_id):
+    """Queue the cohort export as a gzip-compressed attachment to the signed-in interviewer"""
+    try:
+        data = request.get_json(silent=True) or {}
+        to_email = g.interviewer.get('email')
+        export_format = data.get('format', 'csv')
+        if not to_email:
+            return jsonify({'success': False, 'error': 'Your account has no email address'}), 400
+        if (data.get('to') or to_email).strip().lower() != to_email.lower():
+            return jsonify({'success': False, 'error': 'Exports can only be emailed to your own address'}), 403
+        if export_format not in FORMATS:
+            return jsonify({'success': False, 'error': f"format must be one of {', '.join(FORMATS)}"}), 400
+
+        chunks, counter = open_export(assessment_id, export_format)
+        if chunks is None:
+            return jsonify({'success': False, 'error': 'No attempts recorded for this assessment'}), 404
+        path, size = spool_export(chunks)
+
+        filename = export_filename(assessment_id, export_format) + '.gz'
+        subject, plain_message, html_message = render_template(
+            'export', title=data.get('title') or assessment_id, filename=filename,
+            rows=counter[0], format=export_format.upper()
+        )
+        message_id = email_service.outbox.enqueue(
+            to_email, subject, plain_message, html_message,
+            attachments=[{'path': path, 'filename': filename, 'mimetype': 'application/gzip'}]
+        )
+        logger.info(f"Queued {export_format} export of {assessment_id} ({counter[0]} rows, {size} bytes) for {to_email}")
+        return jsonify({'success': True, 'queued': True, 'messageId': message_id,
+                        'rows': counter[0], 'bytes': size}), 202
+
+    except AttachmentTooLarge as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+    except Exception as e:
+        logger.error(f"Error in email_cohort_export: {str(e)}")
+        return jsonify({'success': False, 'error': f'Server error: {str(e)}'}), 500
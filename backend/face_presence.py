@@ -0,0 +1,444 @@
+# backend/face_presence.py
+"""Server-side face presence for proctoring snapshots.
+
+Clients post low-resolution webcam snapshots per assignment. Frames are buffered per session and
+handed to a thread pool in batches; each batch is decoded and run through OpenCV's Haar cascade
+(OpenCV releases the GIL, so the pool uses every core). Per-window counts go to SQLite, so the
+timeline survives restarts and is shared between gunicorn workers. A flusher thread analyzes
+partial batches once they have waited FACE_FLUSH_SECONDS, even if no further frames arrive.
+
+Frames are counted per window when they are received, before analysis, so a window with no row at
+all inside the attempt's time span really had no snapshots; the timeline reports it as missing.
+
+Memory per active session is bounded: at most FACE_MAX_BUFFERED frames waiting plus
+FACE_MAX_IN_FLIGHT batches of FACE_BATCH_SIZE being analyzed, each at most FACE_MAX_FRAME_BYTES.
+opencv-python-headless is optional; without it the endpoints report the analyzer as unavailable.
+"""
+import os
+import time
+import base64
+import sqlite3
+import logging
+import binascii
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import FACE_BATCH_LATENCY, FACE_FRAMES
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+FACE_DB_PATH = os.environ.get(
+    'FACE_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'face_presence.db')
+)
+# Matches the client's "no face for 15 seconds" rule: three snapshots five seconds apart
+WINDOW_SECONDS = int(os.environ.get('FACE_WINDOW_SECONDS', 15))
+BATCH_SIZE = int(os.environ.get('FACE_BATCH_SIZE', 16))
+# A partial batch is analyzed once its oldest frame has waited this long
+FLUSH_SECONDS = float(os.environ.get('FACE_FLUSH_SECONDS', 30))
+WORKERS = int(os.environ.get('FACE_WORKERS', os.cpu_count() or 1))
+MAX_FRAME_BYTES = int(os.environ.get('FACE_MAX_FRAME_BYTES', 64 * 1024))
+MAX_BUFFERED = int(os.environ.get('FACE_MAX_BUFFERED', 2 * BATCH_SIZE))
+MAX_IN_FLIGHT = int(os.environ.get('FACE_MAX_IN_FLIGHT', 2))
+MAX_SESSIONS = int(os.environ.get('FACE_MAX_SESSIONS', 1000))
+# Frames are downscaled to this width before detection
+DETECT_WIDTH = int(os.environ.get('FACE_DETECT_WIDTH', 160))
+CASCADE = os.environ.get('FACE_CASCADE', 'haarcascade_frontalface_default.xml')
+# Pyramid step between detection scales; larger is faster but can miss faces between scales
+SCALE_FACTOR = float(os.environ.get('FACE_SCALE_FACTOR', 1.15))
+
+# A window is absent when fewer than this share of its decodable frames shows a face
+MIN_PRESENCE = float(os.environ.get('FACE_MIN_PRESENCE', 0.34))
+# ...and shows multiple faces when at least this many frames have more than one
+MULTIPLE_MIN_FRAMES = int(os.environ.get('FACE_MULTIPLE_MIN_FRAMES', 2))
+
+# Violation types the server decides once it has frames for an assignment
+SERVER_VIOLATION_TYPES = {'no_face_detected', 'multiple_faces', 'no_snapshots'}
+
+
+def available() -> bool:
+    return cv2 is not None
+
+
+def decode_frame(image: str) -> bytes:
+    """JPEG/PNG bytes from base64, with or without a data: URL prefix"""
+    if image.startswith('data:'):
+        image = image.partition(',')[2]
+    try:
+        data = base64.b64decode(image, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError('image is not valid base64')
+    if len(data) > MAX_FRAME_BYTES:
+        raise ValueError(f'frame is {len(data)} bytes; the limit is {MAX_FRAME_BYTES}')
+    return data
+
+
+class FaceDetector:
+    """Haar cascade face counter; one cascade per thread, since detectMultiScale is not thread-safe"""
+
+    def __init__(self, cascade: str = CASCADE, detect_width: int = DETECT_WIDTH):
+        self.cascade_path = cascade if os.path.isabs(cascade) else os.path.join(cv2.data.haarcascades, cascade)
+        self.detect_width = detect_width
+        self._local = threading.local()
+
+    def _cascade(self):
+        cascade = getattr(self._local, 'cascade', None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.cascade_path)
+            if cascade.empty():
+                raise ValueError(f'Could not load face cascade {self.cascade_path}')
+            self._local.cascade = cascade
+        return cascade
+
+    def count_faces(self, data: bytes) -> Optional[int]:
+        """Faces in one encoded frame, or None if it does not decode"""
+        gray = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            return None
+        height, width = gray.shape
+        if width > self.detect_width:
+            gray = cv2.resize(gray, (self.detect_width, round(height * self.detect_width / width)),
+                              interpolation=cv2.INTER_AREA)
+        gray = cv2.equalizeHist(gray)
+        # A candidate at a webcam is never a small part of the frame; skipping tiny scales halves the cost
+        min_face = max(20, gray.shape[1] // 6)
+        faces = self._cascade().detectMultiScale(gray, scaleFactor=SCALE_FACTOR, minNeighbors=4,
+                                                 minSize=(min_face, min_face))
+        return len(faces)
+
+
+class FaceSession:
+    """Frames waiting for analysis for one assignment"""
+    __slots__ = ('assignment_id', 'buffer', 'oldest', 'in_flight', 'dropped', 'done')
+
+    def __init__(self, assignment_id: str, lock: threading.Lock):
+        self.assignment_id = assignment_id
+        self.buffer: List[Tuple[float, bytes]] = []
+        self.oldest = 0.0
+        self.in_flight = 0
+        self.dropped = 0
+        self.done = threading.Condition(lock)
+
+
+def _status(frames: int, faces: int, multiple: int, undecodable: int) -> str:
+    decoded = frames - undecodable
+    if decoded <= 0:
+        return 'unknown'
+    if multiple >= MULTIPLE_MIN_FRAMES:
+        return 'multiple'
+    return 'present' if faces / decoded >= MIN_PRESENCE else 'absent'
+
+
+def _iso(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+class FacePresenceAnalyzer:
+    """Buffers snapshots per assignment, analyzes them in batches and keeps a windowed timeline"""
+
+    def __init__(self, db_path: str = FACE_DB_PATH, batch_size: int = BATCH_SIZE,
+                 workers: int = WORKERS, window_seconds: int = WINDOW_SECONDS):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.workers = workers
+        self.window_seconds = window_seconds
+        self.sessions: 'OrderedDict[str, FaceSession]' = OrderedDict()
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._detector: Optional[FaceDetector] = None
+        self._stop = threading.Event()
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS face_windows ('
+                'assignment_id TEXT NOT NULL, window_start INTEGER NOT NULL, '
+                'frames INTEGER NOT NULL, faces INTEGER NOT NULL, multiple INTEGER NOT NULL, '
+                'undecodable INTEGER NOT NULL, received INTEGER NOT NULL DEFAULT 0, '
+                'PRIMARY KEY (assignment_id, window_start))'
+            )
+            if 'received' not in {row[1] for row in conn.execute('PRAGMA table_info(face_windows)')}:
+                conn.execute('ALTER TABLE face_windows ADD COLUMN received INTEGER NOT NULL DEFAULT 0')
+            self._local.conn = conn
+        return conn
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Created on first use, so a preloading gunicorn master never starts threads
+        if self._pool is None:
+            with self.lock:
+                if self._pool is None:
+                    # One OpenCV thread per pool thread; the pool already spreads across cores
+                    cv2.setNumThreads(1)
+                    self._detector = FaceDetector()
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='face')
+                    self._stop.clear()
+                    threading.Thread(target=self._run_flusher, name='face-flusher', daemon=True).start()
+        return self._pool
+
+    def _run_flusher(self) -> None:
+        """Analyze partial batches that have waited FLUSH_SECONDS, whether or not more frames arrive"""
+        while not self._stop.wait(max(0.5, FLUSH_SECONDS / 4)):
+            cutoff = time.time() - FLUSH_SECONDS
+            with self.lock:
+                for session in self.sessions.values():
+                    if session.buffer and session.oldest <= cutoff:
+                        self._flush(session, force=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def reset_pool(self) -> None:
+        """Fresh pool, sessions and connections in a forked worker"""
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()
+        self._local = threading.local()
+        self._pool = None
+        self._stop = threading.Event()
+
+    def _window(self, seconds: float) -> int:
+        return int(seconds // self.window_seconds) * self.window_seconds
+
+    def _session(self, assignment_id: str) -> FaceSession:
+        """Caller holds the lock"""
+        session = self.sessions.get(assignment_id)
+        if session is not None:
+            self.sessions.move_to_end(assignment_id)
+            return session
+        session = FaceSession(assignment_id, self.lock)
+        self.sessions[assignment_id] = session
+        if len(self.sessions) > MAX_SESSIONS:
+            # Forget the least recently seen idle session; its buffered frames are still analyzed
+            for other in self.sessions.values():
+                if not other.in_flight:
+                    self._flush(other, force=True)
+                    del self.sessions[other.assignment_id]
+                    break
+        return session
+
+    def submit(self, assignment_id: str, frames: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Buffer snapshots of {image: base64 JPEG/PNG, timestamp: ms since epoch}"""
+        if not available():
+            raise RuntimeError('Face analysis needs opencv-python-headless')
+        now = time.time()
+        decoded = []
+        for frame in frames:
+            if not isinstance(frame, dict) or not isinstance(frame.get('image'), str):
+                raise ValueError('each frame needs an image')
+            timestamp = frame.get('timestamp')
+            # Snapshot time as the client saw it, but never in the future
+            seconds = min(float(timestamp) / 1000, now) if timestamp is not None else now
+            decoded.append((seconds, decode_frame(frame['image'])))
+        self._executor()
+        received: Dict[int, int] = {}
+        for seconds, _ in decoded:
+            window = self._window(seconds)
+            received[window] = received.get(window, 0) + 1
+        self._db().executemany(
+            'INSERT INTO face_windows (assignment_id, window_start, frames, faces, multiple, undecodable, received) '
+            'VALUES (?, ?, 0, 0, 0, 0, ?) ON CONFLICT (assignment_id, window_start) DO UPDATE SET '
+            'received = received + excluded.received',
+            [(assignment_id, window, count) for window, count in received.items()]
+        )
+        with self.lock:
+            session = self._session(assignment_id)
+            if not session.buffer:
+                session.oldest = now
+            session.buffer.extend(decoded)
+            overflow = len(session.buffer) - MAX_BUFFERED
+            if overflow > 0:
+                # Analysis is behind; keep the newest frames
+                del session.buffer[:overflow]
+                session.dropped += overflow
+                FACE_FRAMES.labels('dropped').inc(overflow)
+            self._flush(session, force=now - session.oldest >= FLUSH_SECONDS)
+            return {
+                'assignmentId': assignment_id,
+                'accepted': len(decoded) - max(0, overflow),
+                'buffered': len(session.buffer),
+                'analyzing': session.in_flight,
+                'dropped': session.dropped,
+            }
+
+    def _flush(self, session: FaceSession, force: bool = False) -> None:
+        """Hand full batches (or everything, when forced) to the pool; caller holds the lock"""
+        while session.buffer and session.in_flight < MAX_IN_FLIGHT and (
+                force or len(session.buffer) >= self.batch_size):
+            batch = session.buffer[:self.batch_size]
+            del session.buffer[:self.batch_size]
+            session.oldest = time.time()
+            session.in_flight += 1
+            self._pool.submit(self._analyze, session, batch)
+
+    def _analyze(self, session: FaceSession, batch: List[Tuple[float, bytes]]) -> None:
+        start = time.perf_counter()
+        windows: Dict[int, List[int]] = {}
+        try:
+            for timestamp, data in batch:
+                try:
+                    faces = self._detector.count_faces(data)
+                except cv2.error:
+                    faces = None
+                counts = windows.setdefault(self._window(timestamp), [0, 0, 0, 0])
+                counts[0] += 1
+                if faces is None:
+                    counts[3] += 1
+                    FACE_FRAMES.labels('undecodable').inc()
+                else:
+                    counts[1] += faces > 0
+                    counts[2] += faces > 1
+                    FACE_FRAMES.labels('multiple' if faces > 1 else 'face' if faces else 'no_face').inc()
+            self._db().executemany(
+                'INSERT INTO face_windows (assignment_id, window_start, frames, faces, multiple, undecodable) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (assignment_id, window_start) DO UPDATE SET '
+                'frames = frames + excluded.frames, faces = faces + excluded.faces, '
+                'multiple = multiple + excluded.multiple, undecodable = undecodable + excluded.undecodable',
+                [(session.assignment_id, window, *counts) for window, counts in windows.items()]
+            )
+        except Exception as e:
+            logger.error(f"Face analysis failed for {session.assignment_id}: {str(e)}")
+        finally:
+            FACE_BATCH_LATENCY.observe(time.perf_counter() - start)
+            with self.lock:
+                session.in_flight -= 1
+                # Frames that queued up behind this batch
+                self._flush(session)
+                session.done.notify_all()
+
+    def drain(self, assignment_id: str, timeout: float = 10.0) -> bool:
+        """Analyze everything this process holds for an assignment; False if it timed out"""
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            session = self.sessions.get(assignment_id)
+            if session is None:
+                return True
+            while session.buffer or session.in_flight:
+                self._flush(session, force=True)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                session.done.wait(remaining)
+            return True
+
+    def _span(self, starts: List[int], start: Optional[float], end: Optional[float]) -> range:
+        """Window starts from the attempt's start (or first snapshot) to its end (or last snapshot)"""
+        first = min(starts[0], self._window(start)) if start is not None else starts[0]
+        last = max(starts[-1], self._window(end - 1e-6)) if end is not None else starts[-1]
+        return range(first, last + 1, self.window_seconds)
+
+    def timeline(self, assignment_id: str, timeout: float = 10.0, start: Optional[float] = None,
+                 end: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Per-window face presence and the violations derived from it; None without any frames.
+
+        start and end (epoch seconds) are the attempt's time span; windows inside it without a
+        single snapshot are reported as missing.
+        """
+        complete = self.drain(assignment_id, timeout)
+        rows = self._db().execute(
+            'SELECT window_start, frames, faces, multiple, undecodable, received FROM face_windows '
+            'WHERE assignment_id = ? ORDER BY window_start', (assignment_id,)
+        ).fetchall()
+        if not rows:
+            return None
+        by_start = {row[0]: row[1:] for row in rows}
+        span = self._span([row[0] for row in rows], start, end)
+        windows = []
+        for window_start in span:
+            frames, faces, multiple, undecodable, received = by_start.get(window_start, (0, 0, 0, 0, 0))
+            decoded = frames - undecodable
+            windows.append({
+                'start': _iso(window_start),
+                'end': _iso(window_start + self.window_seconds),
+                'received': max(received, frames),
+                'frames': frames,
+                'faceFrames': faces,
+                'multipleFaceFrames': multiple,
+                'undecodable': undecodable,
+                'presence': round(faces / decoded, 3) if decoded else None,
+                'status': _status(frames, faces, multiple, undecodable) if window_start in by_start else 'missing',
+            })
+        with self.lock:
+            session = self.sessions.get(assignment_id)
+            dropped = session.dropped if session is not None else 0
+        return {
+            'assignmentId': assignment_id,
+            'windowSeconds': self.window_seconds,
+            'complete': complete,
+            'droppedFrames': dropped,
+            'windows': windows,
+            'violations': self.violations(list(span), windows),
+        }
+
+    def summary(self, assignment_id: str, start: Optional[float] = None,
+                end: Optional[float] = None) -> Dict[str, Any]:
+        """Window counts for exports, from what has been analyzed so far (no draining)"""
+        counts = {'frames': 0, 'present': 0, 'absent': 0, 'multiple': 0, 'unknown': 0}
+        starts = []
+        for row in self._db().execute(
+            'SELECT window_start, frames, faces, multiple, undecodable FROM face_windows '
+            'WHERE assignment_id = ? ORDER BY window_start', (assignment_id,)
+        ):
+            starts.append(row[0])
+            counts['frames'] += row[1]
+            counts[_status(*row[1:])] += 1
+        return {
+            'snapshots': counts['frames'],
+            'absentWindows': counts['absent'],
+            'multipleFaceWindows': counts['multiple'],
+            'absentSeconds': counts['absent'] * self.window_seconds,
+            'missingWindows': len(self._span(starts, start, end)) - len(starts) if starts else None,
+        }
+
+    def violations(self, starts: List[int], windows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One violation per run of consecutive absent, multiple-face or missing windows"""
+        messages = {
+            'absent': ('no_face_detected', 'high', 'No face detected for {} seconds'),
+            'multiple': ('multiple_faces', 'high', 'Multiple faces detected for {} seconds'),
+            'missing': ('no_snapshots', 'medium', 'No snapshots received for {} seconds'),
+        }
+        found = []
+        run_start = run_end = run_status = None
+        for start, window in zip(starts + [None], windows + [None]):
+            status = window['status'] if window else None
+            if run_status and (status != run_status or start != run_end):
+                seconds = run_end - run_start
+                violation_type, severity, message = messages[run_status]
+                found.append({'type': violation_type, 'severity': severity, 'message': message.format(seconds),
+                              'timestamp': _iso(run_start), 'durationSeconds': seconds, 'source': 'server'})
+                run_status = None
+            if status in messages and run_status is None:
+                run_start, run_status = start, status
+            if run_status:
+                run_end = start + self.window_seconds
+        return found
+
+    def merge_violations(self, data: Dict[str, Any], start: Optional[float] = None,
+                         end: Optional[float] = None) -> Dict[str, Any]:
+        """Violation report input with client face claims replaced by the server's, when it has frames"""
+        assignment_id = data.get('assignmentId')
+        if not assignment_id or not available():
+            return data
+        timeline = self.timeline(assignment_id, start=start, end=end)
+        if timeline is None:
+            return data
+        violations = [v for v in data.get('violations', []) if v.get('type') not in SERVER_VIOLATION_TYPES]
+        return dict(data, violations=violations + timeline['violations'])
+
+
+# Shared analyzer used by the Flask routes
+face_analyzer = FacePresenceAnalyzer()
@@ -0,0 +1,172 @@
+# backend/free_text.py
+import os
+import re
+import time
+import sqlite3
+import threading
+import unicodedata
+from typing import Dict, Any, List, Optional, Callable, Sequence, Tuple
+
+import numpy as np
+
+# Question types graded by exact match; everything else is free text
+EXACT_MATCH_TYPES = {'multiple_choice', 'true_false'}
+
+# Calibrated accept thresholds, shared by every worker and kept across restarts
+FREE_TEXT_DB_PATH = os.environ.get(
+    'FREE_TEXT_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'free_text.db')
+)
+
+# Similarity at or above which an answer is accepted locally, until a calibration is stored
+ACCEPT_THRESHOLD = float(os.environ.get('FREE_TEXT_ACCEPT_THRESHOLD', 0.7))
+# Half-width of the band around the threshold that is escalated to the LLM
+BORDERLINE_MARGIN = float(os.environ.get('FREE_TEXT_BORDERLINE_MARGIN', 0.15))
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(text: Any) -> str:
+    """Case-fold, strip punctuation and collapse whitespace"""
+    text = unicodedata.normalize('NFKC', str(text or '')).casefold()
+    text = _PUNCTUATION.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def is_free_text(question: Dict[str, Any]) -> bool:
+    return question.get('type', 'multiple_choice') not in EXACT_MATCH_TYPES
+
+
+def reference_text(question: Dict[str, Any]) -> str:
+    """Reference answer plus rubric, if the question has one"""
+    parts = [question.get('referenceAnswer') or question.get('correctAnswer', '')]
+    rubric = question.get('rubric')
+    if isinstance(rubric, list):
+        parts.extend(str(item) for item in rubric)
+    elif rubric:
+        parts.append(str(rubric))
+    return ' '.join(str(p) for p in parts if p)
+
+
+class FreeTextGrader:
+    """Batched character n-gram cosine grading with an LLM fallback for borderline scores.
+
+    N-grams are hashed into a fixed feature space instead of fitting a vocabulary and IDF on
+    each batch, so a pair's similarity does not depend on what it is graded alongside and a
+    calibrated threshold holds for every batch.
+    """
+
+    def __init__(self, accept_threshold: float = ACCEPT_THRESHOLD,
+                 borderline_margin: float = BORDERLINE_MARGIN, db_path: str = FREE_TEXT_DB_PATH):
+        self.default_threshold = accept_threshold
+        self.borderline_margin = borderline_margin
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS calibrations ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, threshold REAL NOT NULL, examples INTEGER NOT NULL, '
+                'calibrated_by TEXT, created_at REAL NOT NULL)'
+            )
+        return self._conn
+
+    def reset_connection(self) -> None:
+        """Reopen the database in a forked worker instead of sharing the parent's connection"""
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def accept_threshold(self) -> float:
+        """The latest stored calibration, else the configured default"""
+        with self.lock:
+            row = self._db().execute('SELECT threshold FROM calibrations ORDER BY id DESC LIMIT 1').fetchone()
+        return row[0] if row else self.default_threshold
+
+    def similarities(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        """Cosine similarity of each (reference, answer) pair in one sparse pass"""
+        if not pairs:
+            return np.zeros(0)
+        # scikit-learn costs about a second to import; only pay it once free text is graded
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.preprocessing import normalize as l2_normalize
+        references = [normalize(ref) for ref, _ in pairs]
+        answers = [normalize(ans) for _, ans in pairs]
+        vectorizer = HashingVectorizer(analyzer='char_wb', ngram_range=(3, 5), n_features=2 ** 20,
+                                       alternate_sign=False, norm=None)
+        matrix = vectorizer.transform(references + answers)
+        # Sublinear term frequency, then unit rows
+        matrix.data = 1.0 + np.log(matrix.data)
+        matrix = l2_normalize(matrix)
+        ref_rows, ans_rows = matrix[:len(pairs)], matrix[len(pairs):]
+        # Rows are L2-normalized, so the row-wise dot product is the cosine
+        scores = np.asarray(ref_rows.multiply(ans_rows).sum(axis=1)).ravel()
+        exact = np.array([bool(a) and a == r for r, a in zip(references, answers)])
+        scores[exact] = 1.0
+        return scores
+
+    def is_borderline(self, score: float, threshold: Optional[float] = None) -> bool:
+        threshold = self.accept_threshold if threshold is None else threshold
+        return abs(score - threshold) < self.borderline_margin
+
+    def grade_batch(self, items: List[Dict[str, Any]],
+                    escalate: Optional[Callable[[List[Dict[str, Any]]], List[Optional[bool]]]] = None
+                    ) -> List[Dict[str, Any]]:
+        """Grade items of {questionId, question, reference, answer}; borderline ones go to escalate"""
+        scores = self.similarities([(item['reference'], item['answer']) for item in items])
+        threshold = self.accept_threshold
+        results = []
+        borderline = []
+        for item, score in zip(items, scores):
+            score = float(score)
+            result = {
+                'questionId': item['questionId'],
+                'correct': score >= threshold,
+                'similarity': round(score, 4),
+                'gradedBy': 'similarity'
+            }
+            if escalate and normalize(item['answer']) and self.is_borderline(score, threshold):
+                borderline.append((item, result))
+            results.append(result)
+
+        if borderline:
+            verdicts = escalate([item for item, _ in borderline])
+            for (_, result), verdict in zip(borderline, verdicts):
+                if verdict is not None:
+                    result['correct'] = bool(verdict)
+                    result['gradedBy'] = 'llm'
+
+        for result in results:
+            result['feedback'] = (
+                f"Answer matches the reference ({result['similarity']:.0%} similarity)"
+                if result['correct'] else
+                f"Answer does not sufficiently match the reference ({result['similarity']:.0%} similarity)"
+            )
+        return results
+
+    def calibrate(self, scores: Sequence[float], labels: Sequence[bool], calibrated_by: Optional[str] = None) -> float:
+        """Store the accept threshold that best separates human-labelled scores"""
+        scores = np.asarray(scores, dtype=np.float64)
+        labels = np.asarray(labels, dtype=bool)
+        if scores.size == 0:
+            return self.accept_threshold
+        candidates = np.unique(scores)
+        accuracy = [np.mean((scores >= t) == labels) for t in candidates]
+        threshold = float(candidates[int(np.argmax(accuracy))])
+        with self.lock:
+            db = self._db()
+            db.execute(
+                'INSERT INTO calibrations (threshold, examples, calibrated_by, created_at) VALUES (?, ?, ?, ?)',
+                (threshold, int(scores.size), calibrated_by, time.time())
+            )
+            db.commit()
+        return threshold
+
+
+# Shared grader used by the Flask routes
+free_text_grader = FreeTextGrader()
@@ -0,0 +1,405 @@
+# backend/grading.py
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Iterator, Callable, Tuple
+
+from free_text import is_free_text, reference_text
+
+logger = logging.getLogger(__name__)
+
+# Durable fallback for in-progress attempts
+AUTOSAVE_DB_PATH = os.environ.get(
+    'AUTOSAVE_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'autosave.db')
+)
+# Attempt states cached in memory per worker; every attempt stays in SQLite
+AUTOSAVE_MAX_CACHED = int(os.environ.get('AUTOSAVE_MAX_CACHED', 1024))
+
+# Question fields an attempt keeps: the key, what free-text answers are graded against, and the
+# options, which bound the choice indices recorded in item statistics
+KEY_FIELDS = ('id', 'correctAnswer', 'type', 'question', 'referenceAnswer', 'rubric', 'options')
+
+# Free-text items ({questionId, question, reference, answer}) -> results, as FreeTextGrader.grade_batch
+FreeTextGrade = Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]
+
+
+def grade_answer(question_id: str, correct_answer: Any, user_answer: Any) -> Dict[str, Any]:
+    """Grade a single answer against the key"""
+    if user_answer == correct_answer:
+        return {
+            'questionId': question_id,
+            'correct': True,
+            'feedback': 'Correct answer'
+        }
+    return {
+        'questionId': question_id,
+        'correct': False,
+        'feedback': f'Expected: {correct_answer}, Got: {user_answer}'
+    }
+
+
+def build_summary(results: List[Dict[str, Any]], score: int, total_questions: int,
+                  passing_score: float) -> Dict[str, Any]:
+    """Build the /evaluate-submission response body"""
+    percentage = (score / total_questions) * 100 if total_questions > 0 else 0
+    return {
+        'score': score,
+        'totalQuestions': total_questions,
+        'percentage': percentage,
+        'passed': percentage >= passing_score,
+        'results': results
+    }
+
+
+class AttemptState:
+    """Running score for one in-progress attempt"""
+
+    __slots__ = ('attempt_id', 'key', 'order', 'free_text', 'passing_score', 'answers', 'results', 'score',
+                 'finalized', 'updated_at')
+
+    def __init__(self, attempt_id: str, questions: List[Dict[str, Any]], passing_score: float):
+        self.attempt_id = attempt_id
+        self.key = {q['id']: q.get('correctAnswer', '') for q in questions}
+        self.order = [q['id'] for q in questions]
+        # Free-text questions: exact match only catches verbatim answers, the rest are graded at finalize
+        self.free_text = {
+            q['id']: {'question': q.get('question', ''), 'reference': reference_text(q)}
+            for q in questions if is_free_text(q)
+        }
+        self.passing_score = passing_score
+        self.answers: Dict[str, Any] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.score = 0
+        self.finalized: Optional[Dict[str, Any]] = None
+        # attempts.updated_at this state was read or written at; another value means another worker wrote
+        self.updated_at: Optional[float] = None
+
+    def apply(self, question_id: str, answer: Any) -> Dict[str, Any]:
+        """Re-grade one question and adjust the running score"""
+        previous = self.results.get(question_id)
+        if previous and previous['correct']:
+            self.score -= 1
+        result = grade_answer(question_id, self.key[question_id], answer)
+        if result['correct']:
+            self.score += 1
+        self.answers[question_id] = answer
+        self.results[question_id] = result
+        return result
+
+    def regrade(self, question_id: str, result: Dict[str, Any]) -> None:
+        """Replace one question's result (free-text grading) and adjust the running score"""
+        self.score += int(bool(result['correct'])) - int(bool(self.results[question_id]['correct']))
+        self.results[question_id] = result
+
+    def free_text_items(self) -> List[Dict[str, Any]]:
+        """Answered free-text questions exact match rejected, in FreeTextGrader.grade_batch shape"""
+        return [
+            {'questionId': qid, 'question': spec['question'], 'reference': spec['reference'],
+             'answer': str(self.answers[qid])}
+            for qid, spec in self.free_text.items()
+            if str(self.answers.get(qid, '')).strip() and not self.results[qid]['correct']
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        """Current result in /evaluate-submission shape"""
+        results = [
+            self.results.get(qid) or grade_answer(qid, self.key[qid], '')
+            for qid in self.order
+        ]
+        return build_summary(results, self.score, len(self.order), self.passing_score)
+
+
+# Cohort columns added after the attempts table first shipped; created on open if missing
+COHORT_COLUMNS = {
+    'assessment_id': 'TEXT',
+    'candidate_name': 'TEXT',
+    'candidate_email': 'TEXT',
+    'started_at': 'REAL',
+    'completed_at': 'REAL',
+    'time_spent': 'REAL',
+    'time_limit': 'REAL',
+    'violations': 'INTEGER',
+    'analysis': 'TEXT',
+    'variant_id': 'TEXT',
+}
+
+
+class AttemptStore:
+    """Attempt states cached in memory over SQLite, which is the source of truth.
+
+    Every worker writes the same database, so a cached state is used only while its updated_at
+    still matches the row's; answer and finalize check and write inside one BEGIN IMMEDIATE
+    transaction, which serializes them with the other workers' writes. The cache keeps the
+    AUTOSAVE_MAX_CACHED most recently used attempts; finalized ones are discarded by the caller.
+    """
+
+    def __init__(self, db_path: str = AUTOSAVE_DB_PATH):
+        self.db_path = db_path
+        self.attempts: 'OrderedDict[str, AttemptState]' = OrderedDict()
+        self.lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS attempts ('
+                'attempt_id TEXT PRIMARY KEY, questions TEXT NOT NULL, '
+                'passing_score REAL NOT NULL, result TEXT, updated_at REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS attempt_answers ('
+                'attempt_id TEXT NOT NULL, question_id TEXT NOT NULL, answer TEXT NOT NULL, '
+                'PRIMARY KEY (attempt_id, question_id))'
+            )
+            existing = {row[1] for row in self._conn.execute('PRAGMA table_info(attempts)')}
+            for column, kind in COHORT_COLUMNS.items():
+                if column not in existing:
+                    self._conn.execute(f'ALTER TABLE attempts ADD COLUMN {column} {kind}')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS attempts_cohort ON attempts (assessment_id, started_at)')
+        return self._conn
+
+    def reset_connection(self) -> None:
+        """Reopen the database in a forked worker instead of sharing the parent's connection"""
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that holds off other workers' writes until commit; caller holds the lock"""
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+
+    def start(self, attempt_id: str, questions: List[Dict[str, Any]], passing_score: float = 70,
+              assessment_id: Optional[str] = None, candidate: Optional[Dict[str, Any]] = None,
+              variant_id: Optional[str] = None) -> AttemptState:
+        """Cache the answer key for an attempt, recording its assessment, variant and candidate"""
+        with self.lock:
+            state = self.attempts.get(attempt_id) or self._load(attempt_id)
+            if state is not None:
+                self._cache(state)
+                return state
+            key_only = [{field: q[field] for field in KEY_FIELDS if field in q} for q in questions]
+            state = AttemptState(attempt_id, key_only, passing_score)
+            self._cache(state)
+            db = self._db()
+            candidate = candidate or {}
+            now = time.time()
+            state.updated_at = now
+            db.execute(
+                'INSERT OR REPLACE INTO attempts (attempt_id, questions, passing_score, result, updated_at, '
+                'assessment_id, candidate_name, candidate_email, started_at, variant_id) '
+                'VALUES (?, ?, ?, NULL, ?, ?, ?, ?, ?, ?)',
+                (attempt_id, json.dumps(key_only), passing_score, now,
+                 assessment_id, candidate.get('name'), candidate.get('email'), now, variant_id)
+            )
+            db.commit()
+            return state
+
+    def answer(self, attempt_id: str, question_id: str, answer: Any) -> Dict[str, Any]:
+        """Grade one answer change into the running state"""
+        with self.lock, self._transaction() as db:
+            state = self._get(attempt_id)
+            if state.finalized is not None:
+                raise ValueError(f'Attempt {attempt_id} is already finalized')
+            if question_id not in state.key:
+                raise KeyError(f'Unknown question {question_id}')
+            result = self._apply(db, state, question_id, answer)
+            return {'result': result, 'score': state.score, 'totalQuestions': len(state.order)}
+
+    def finalize(self, attempt_id: str, details: Optional[Dict[str, Any]] = None,
+                 grade_free_text: Optional[FreeTextGrade] = None) -> Dict[str, Any]:
+        """Freeze and return the result; details carries the final answers, timeSpent, timeLimit and violations.
+
+        Final answers that differ from the autosaved ones (lost, reordered or throttled on the way)
+        are graded in first. Free-text answers are then graded by grade_free_text, outside the
+        lock and transaction since it may call the LLM.
+        """
+        details = details or {}
+        with self.lock, self._transaction() as db:
+            state = self._get(attempt_id)
+            if state.finalized is None:
+                for question_id, answer in (details.get('answers') or {}).items():
+                    if question_id in state.key and (question_id not in state.answers
+                                                     or state.answers[question_id] != answer):
+                        self._apply(db, state, question_id, answer)
+            items = state.free_text_items() if state.finalized is None and grade_free_text else []
+        graded = grade_free_text(items) if items else []
+
+        with self.lock, self._transaction() as db:
+            state = self._get(attempt_id)
+            if state.finalized is None:
+                for item, result in zip(items, graded):
+                    # Skip answers changed by another request while grading ran
+                    if item['questionId'] in state.answers and str(state.answers[item['questionId']]) == item['answer']:
+                        state.regrade(item['questionId'], result)
+                state.finalized = state.summary()
+                now = time.time()
+                db.execute(
+                    'UPDATE attempts SET result = ?, updated_at = ?, completed_at = ? WHERE attempt_id = ?',
+                    (json.dumps(state.finalized), now, now, attempt_id)
+                )
+                state.updated_at = now
+            if details:
+                db.execute(
+                    'UPDATE attempts SET time_spent = coalesce(?, time_spent), '
+                    'time_limit = coalesce(?, time_limit), violations = coalesce(?, violations) '
+                    'WHERE attempt_id = ?',
+                    (details.get('timeSpent'), details.get('timeLimit'), details.get('violations'), attempt_id)
+                )
+            return state.finalized
+
+    def _apply(self, db: sqlite3.Connection, state: AttemptState, question_id: str, answer: Any) -> Dict[str, Any]:
+        """Grade and write one answer; caller holds a transaction"""
+        result = state.apply(question_id, answer)
+        now = time.time()
+        db.execute(
+            'INSERT OR REPLACE INTO attempt_answers VALUES (?, ?, ?)',
+            (state.attempt_id, question_id, json.dumps(answer))
+        )
+        db.execute('UPDATE attempts SET updated_at = ? WHERE attempt_id = ?', (now, state.attempt_id))
+        state.updated_at = now
+        return result
+
+    def record_analysis(self, attempt_id: str, analysis: Dict[str, Any]) -> bool:
+        """Keep the latest candidate analysis with the attempt; False for an unknown attempt"""
+        with self.lock:
+            db = self._db()
+            updated = db.execute(
+                'UPDATE attempts SET analysis = ? WHERE attempt_id = ?', (json.dumps(analysis), attempt_id)
+            ).rowcount
+            db.commit()
+            return bool(updated)
+
+    def cohort_entry(self, attempt_id: str) -> Optional[Dict[str, Any]]:
+        """Assessment, percentage and timing of one attempt; percentage is None until finalized"""
+        with self.lock:
+            row = self._db().execute(
+                "SELECT assessment_id, json_extract(result, '$.percentage'), time_spent, time_limit "
+                'FROM attempts WHERE attempt_id = ?', (attempt_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('assessment_id', 'percentage', 'time_spent', 'time_limit'), row))
+
+    def span(self, attempt_id: str) -> Optional[Tuple[float, Optional[float]]]:
+        """Start and completion time (epoch seconds) of one attempt; completion is None while in progress"""
+        with self.lock:
+            row = self._db().execute(
+                'SELECT started_at, completed_at FROM attempts WHERE attempt_id = ?', (attempt_id,)
+            ).fetchone()
+        return tuple(row) if row is not None and row[0] is not None else None
+
+    def responses(self, attempt_id: str) -> Optional[Dict[str, Any]]:
+        """Assessment, variant, questions and saved answers of one attempt, for item statistics"""
+        with self.lock:
+            db = self._db()
+            row = db.execute(
+                'SELECT assessment_id, variant_id, questions FROM attempts WHERE attempt_id = ?', (attempt_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            answers = {
+                question_id: json.loads(answer) for question_id, answer in db.execute(
+                    'SELECT question_id, answer FROM attempt_answers WHERE attempt_id = ?', (attempt_id,)
+                )
+            }
+        return {'assessment_id': row[0], 'variant_id': row[1], 'questions': json.loads(row[2]), 'answers': answers}
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Private connection for long reads; WAL lets them run beside autosaves without the store lock"""
+        with self.lock:
+            # Make sure the table and cohort columns exist before reading on a second connection
+            self._db()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def cohort_size(self, assessment_id: str) -> int:
+        """Attempts recorded for one assessment"""
+        with self.reader() as conn:
+            return conn.execute('SELECT COUNT(*) FROM attempts WHERE assessment_id = ?', (assessment_id,)).fetchone()[0]
+
+    def iter_cohort(self, assessment_id: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Attempts of one assessment in start order, read in batches on a private connection.
+
+        Only one batch of rows is in memory at a time whatever the cohort size.
+        """
+        with self.reader() as conn:
+            cursor = conn.execute(
+                'SELECT attempt_id, candidate_name, candidate_email, passing_score, result, '
+                'started_at, completed_at, time_spent, violations, analysis '
+                'FROM attempts WHERE assessment_id = ? ORDER BY started_at, attempt_id', (assessment_id,)
+            )
+            columns = [d[0] for d in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(columns, row))
+
+    def discard(self, attempt_id: str) -> None:
+        """Drop the in-memory state; the durable copy is kept"""
+        with self.lock:
+            self.attempts.pop(attempt_id, None)
+
+    def _get(self, attempt_id: str) -> AttemptState:
+        """The attempt as SQLite has it, from the cache while no other worker has written since"""
+        row = self._db().execute('SELECT updated_at FROM attempts WHERE attempt_id = ?', (attempt_id,)).fetchone()
+        if row is None:
+            raise KeyError(f'Unknown attempt {attempt_id}')
+        state = self.attempts.get(attempt_id)
+        if state is None or state.updated_at != row[0]:
+            state = self._load(attempt_id)
+        self._cache(state)
+        return state
+
+    def _cache(self, state: AttemptState) -> None:
+        """Keep a state as most recently used, evicting the least recently used; caller holds the lock"""
+        self.attempts[state.attempt_id] = state
+        self.attempts.move_to_end(state.attempt_id)
+        while len(self.attempts) > AUTOSAVE_MAX_CACHED:
+            self.attempts.popitem(last=False)
+
+    def _load(self, attempt_id: str) -> Optional[AttemptState]:
+        """Rebuild an attempt from the durable store (restart, or written by another worker)"""
+        db = self._db()
+        row = db.execute(
+            'SELECT questions, passing_score, result, updated_at FROM attempts WHERE attempt_id = ?',
+            (attempt_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        state = AttemptState(attempt_id, json.loads(row[0]), row[1])
+        for question_id, answer in db.execute(
+            'SELECT question_id, answer FROM attempt_answers WHERE attempt_id = ?', (attempt_id,)
+        ):
+            if question_id in state.key:
+                state.apply(question_id, json.loads(answer))
+        if row[2]:
+            state.finalized = json.loads(row[2])
+        state.updated_at = row[3]
+        self._cache(state)
+        logger.debug(f"Loaded attempt {attempt_id} from autosave store")
+        return state
+
+
+# Shared store used by the Flask routes
+attempt_store = AttemptStore()
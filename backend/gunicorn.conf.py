@@ -0,0 +1,47 @@
+# backend/gunicorn.conf.py
+# gunicorn -c gunicorn.conf.py
+import gc
+import os
+import glob
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+wsgi_app = 'wsgi:app'
+
+# Load the app in the master and fork workers from it, so imports and compiled templates are
+# paid for once and shared copy-on-write. GUNICORN_PRELOAD=0 restores per-worker loading
+# (needed for code reloads on HUP).
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Per-worker metric files are aggregated by /metrics. This must be set before
+# prometheus_client is first imported, which picks its value storage at import time.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.prometheus'))
+
+from prometheus_client import multiprocess  # noqa: E402
+
+
+def on_starting(server):
+    """Start from an empty metrics directory so counters from a previous run don't leak in"""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        import app
+        app.preload()
+        # Keep the collector from touching (and so copying) the master's objects in every worker
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    """Fork-unsafe state (Groq and SMTP pools, SQLite, delivery threads) is created per worker"""
+    import app
+    app.post_fork()
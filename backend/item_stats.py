@@ -0,0 +1,237 @@
+# backend/item_stats.py
+import os
+import math
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+# Every graded response, so statistics are the same on every worker and survive restarts
+ITEM_STATS_DB_PATH = os.environ.get(
+    'ITEM_STATS_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'item_stats.db')
+)
+# Rebuild an assessment's aggregates from SQLite on lookup once they are this old
+ITEM_STATS_REFRESH_SECONDS = float(os.environ.get('ITEM_STATS_REFRESH_SECONDS', 300))
+
+# Initial column count for option choice counts; grows on demand
+DEFAULT_OPTION_SLOTS = 4
+# Widest option list counted; choices are also bounded by each question's own options
+ITEM_STATS_MAX_OPTIONS = int(os.environ.get('ITEM_STATS_MAX_OPTIONS', 26))
+
+# Per question: responses, correct count and the sums over each submission's total score
+ITEM_SUMS_SQL = (
+    'WITH totals AS (SELECT attempt_id, SUM(correct) AS total FROM item_responses '
+    'WHERE assessment_id = ? GROUP BY attempt_id) '
+    'SELECT r.question_id, COUNT(*), SUM(r.correct), SUM(t.total), SUM(t.total * t.total), '
+    'SUM(r.correct * t.total) FROM item_responses r JOIN totals t ON t.attempt_id = r.attempt_id '
+    'WHERE r.assessment_id = ? GROUP BY r.question_id ORDER BY MIN(r.rowid)'
+)
+
+
+class AssessmentItemStats:
+    """Running per-question aggregates for one assessment, stored as parallel arrays"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.question_ids: List[str] = []
+        self.n = np.zeros(0, dtype=np.int64)          # submissions that included the item
+        self.sum_x = np.zeros(0, dtype=np.int64)      # times answered correctly
+        self.sum_y = np.zeros(0, dtype=np.float64)    # total scores of those submissions
+        self.sum_y2 = np.zeros(0, dtype=np.float64)
+        self.sum_xy = np.zeros(0, dtype=np.float64)   # total scores when the item was correct
+        self.options = np.zeros((0, DEFAULT_OPTION_SLOTS), dtype=np.int64)
+        self.submissions = 0
+        self.built_at = time.monotonic()
+
+    def _slots(self, question_ids: List[str]) -> np.ndarray:
+        """Map question ids to array rows, growing the arrays for new items"""
+        new = [qid for qid in question_ids if qid not in self.index]
+        if new:
+            for qid in new:
+                self.index[qid] = len(self.question_ids)
+                self.question_ids.append(qid)
+            grow = len(new)
+            self.n = np.concatenate([self.n, np.zeros(grow, dtype=np.int64)])
+            self.sum_x = np.concatenate([self.sum_x, np.zeros(grow, dtype=np.int64)])
+            self.sum_y = np.concatenate([self.sum_y, np.zeros(grow)])
+            self.sum_y2 = np.concatenate([self.sum_y2, np.zeros(grow)])
+            self.sum_xy = np.concatenate([self.sum_xy, np.zeros(grow)])
+            self.options = np.vstack([self.options, np.zeros((grow, self.options.shape[1]), dtype=np.int64)])
+        return np.fromiter((self.index[qid] for qid in question_ids), dtype=np.int64, count=len(question_ids))
+
+    def _widen(self, widest: int) -> None:
+        widest = min(widest, ITEM_STATS_MAX_OPTIONS)
+        if widest > self.options.shape[1]:
+            pad = np.zeros((self.options.shape[0], widest - self.options.shape[1]), dtype=np.int64)
+            self.options = np.hstack([self.options, pad])
+
+    def record(self, question_ids: List[str], correct: List[bool], choices: List[Optional[int]],
+               option_counts: List[int]) -> None:
+        """Fold one graded submission into the aggregates; choices outside a question's options are ignored"""
+        if not question_ids:
+            return
+        rows = self._slots(question_ids)
+        x = np.asarray(correct, dtype=np.int64)
+        total = float(x.sum())
+
+        self.n[rows] += 1
+        self.sum_x[rows] += x
+        self.sum_y[rows] += total
+        self.sum_y2[rows] += total * total
+        self.sum_xy[rows] += x * total
+
+        picked = [(row, choice) for row, choice, options in zip(rows, choices, option_counts)
+                  if choice is not None and 0 <= choice < min(options, ITEM_STATS_MAX_OPTIONS)]
+        if picked:
+            self._widen(max(choice for _, choice in picked) + 1)
+            prow, pcol = zip(*picked)
+            np.add.at(self.options, (np.asarray(prow), np.asarray(pcol)), 1)
+        self.submissions += 1
+
+    @classmethod
+    def from_db(cls, db: sqlite3.Connection, assessment_id: str) -> 'AssessmentItemStats':
+        """Batch build from the persisted responses of one assessment"""
+        stats = cls()
+        sums = db.execute(ITEM_SUMS_SQL, (assessment_id, assessment_id)).fetchall()
+        if not sums:
+            return stats
+        rows = stats._slots([row[0] for row in sums])
+        columns = list(zip(*(row[1:] for row in sums)))
+        stats.n[rows] = columns[0]
+        stats.sum_x[rows] = columns[1]
+        stats.sum_y[rows] = columns[2]
+        stats.sum_y2[rows] = columns[3]
+        stats.sum_xy[rows] = columns[4]
+        for question_id, choice, count in db.execute(
+            'SELECT question_id, choice, COUNT(*) FROM item_responses '
+            'WHERE assessment_id = ? AND choice >= 0 AND choice < ? GROUP BY question_id, choice',
+            (assessment_id, ITEM_STATS_MAX_OPTIONS)
+        ):
+            stats._widen(choice + 1)
+            stats.options[stats.index[question_id], choice] = count
+        stats.submissions, = db.execute(
+            'SELECT COUNT(DISTINCT attempt_id) FROM item_responses WHERE assessment_id = ?', (assessment_id,)
+        ).fetchone()
+        return stats
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Difficulty and discrimination for every item, computed from the running sums"""
+        n = self.n.astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p_value = np.where(n > 0, self.sum_x / n, np.nan)
+            # Corrected item-total correlation: each total leaves the item itself out (x is 0/1,
+            # so the rest-score sums follow from the ones kept)
+            sum_rest = self.sum_y - self.sum_x
+            sum_rest2 = self.sum_y2 - 2 * self.sum_xy + self.sum_x
+            sum_x_rest = self.sum_xy - self.sum_x
+            numerator = n * sum_x_rest - self.sum_x * sum_rest
+            var_x = n * self.sum_x - self.sum_x.astype(np.float64) ** 2
+            var_rest = n * sum_rest2 - sum_rest ** 2
+            denominator = np.sqrt(var_x * var_rest)
+            point_biserial = np.where(denominator > 0, numerator / denominator, np.nan)
+
+        items = []
+        for row, qid in enumerate(self.question_ids):
+            items.append({
+                'questionId': qid,
+                'responses': int(self.n[row]),
+                'pValue': _finite(p_value[row]),
+                'pointBiserial': _finite(point_biserial[row]),
+                'optionCounts': self.options[row].tolist()
+            })
+        return {'submissions': self.submissions, 'items': items}
+
+
+def _finite(value: float) -> Optional[float]:
+    return None if math.isnan(value) else round(float(value), 4)
+
+
+def _choice_index(answer: Any, options: int) -> Optional[int]:
+    """Option index of a multiple-choice answer ("0".."options - 1"), otherwise None"""
+    if isinstance(answer, bool):
+        return None
+    if isinstance(answer, str) and answer.isdigit():
+        answer = int(answer)
+    if isinstance(answer, int) and 0 <= answer < min(options, ITEM_STATS_MAX_OPTIONS):
+        return answer
+    return None
+
+
+def option_counts(questions: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Number of options of every question, keyed by question id"""
+    return {q['id']: len(q['options']) if isinstance(q.get('options'), list) else 0 for q in questions}
+
+
+class ItemStatsStore:
+    """Item statistics per assessment: responses persisted in SQLite, aggregates cached per process.
+
+    Aggregates are rebuilt from SQLite the first time this process looks an assessment up, and
+    again once ITEM_STATS_REFRESH_SECONDS old, to take in submissions recorded by other workers.
+    """
+
+    def __init__(self, db_path: str = ITEM_STATS_DB_PATH, refresh_seconds: float = ITEM_STATS_REFRESH_SECONDS):
+        self.db_path = db_path
+        self.refresh_seconds = refresh_seconds
+        self.assessments: Dict[str, AssessmentItemStats] = {}
+        self.lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS item_responses ('
+                'assessment_id TEXT NOT NULL, attempt_id TEXT NOT NULL, question_id TEXT NOT NULL, '
+                'correct INTEGER NOT NULL, choice INTEGER, PRIMARY KEY (attempt_id, question_id))'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS item_responses_assessment ON item_responses (assessment_id)')
+        return self._conn
+
+    def reset_connection(self) -> None:
+        """Reopen the database in a forked worker instead of sharing the parent's connection"""
+        self.lock = threading.Lock()
+        self._conn = None
+        self.assessments = {}
+
+    def record_submission(self, assessment_id: str, results: List[Dict[str, Any]], answers: Dict[str, Any],
+                          options: Dict[str, int], attempt_id: Optional[str] = None) -> bool:
+        """Record a graded submission once per attempt; False if the attempt was already recorded.
+
+        options maps question ids to their option counts (option_counts()); a choice outside them is
+        stored as NULL, so a client can't make the option count matrices arbitrarily wide.
+        """
+        question_ids = [r['questionId'] for r in results]
+        correct = [bool(r['correct']) for r in results]
+        counts = [options.get(qid, 0) for qid in question_ids]
+        choices = [_choice_index(answers.get(qid), count) for qid, count in zip(question_ids, counts)]
+        attempt_id = attempt_id or uuid.uuid4().hex
+        with self.lock:
+            db = self._db()
+            inserted = db.executemany(
+                'INSERT OR IGNORE INTO item_responses VALUES (?, ?, ?, ?, ?)',
+                [(assessment_id, attempt_id, qid, int(x), choice)
+                 for qid, x, choice in zip(question_ids, correct, choices)]
+            ).rowcount
+            db.commit()
+            stats = self.assessments.get(assessment_id)
+            # An assessment not loaded yet is built from SQLite, which already has this submission
+            if inserted and stats is not None:
+                stats.record(question_ids, correct, choices, counts)
+            return bool(inserted)
+
+    def get(self, assessment_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            stats = self.assessments.get(assessment_id)
+            if stats is None or time.monotonic() - stats.built_at > self.refresh_seconds:
+                stats = AssessmentItemStats.from_db(self._db(), assessment_id)
+                self.assessments[assessment_id] = stats
+            return stats.snapshot() if stats.submissions else None
+
+
+# Shared store used by the Flask routes
+item_stats = ItemStatsStore()
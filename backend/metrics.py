@@ -0,0 +1,208 @@
+# backend/metrics.py
+"""Prometheus metrics shared by ai.py and email_service.py.
+
+Under gunicorn, point PROMETHEUS_MULTIPROC_DIR at an empty directory before the app is
+imported (gunicorn.conf.py clears it on start and marks dead workers); each worker then
+writes to its own mmap files and /metrics aggregates all of them.
+
+Cache hit ratio: 1 - rate(cache_misses_total) / rate(cache_lookups_total), per cache label.
+"""
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+# Seconds; LLM routes sit in the upper buckets, grading and email enqueueing in the lower ones
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency per route',
+    ['app', 'route', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'Requests currently being handled', ['app'], multiprocess_mode='livesum'
+)
+GROQ_LATENCY = Histogram(
+    'groq_request_duration_seconds', 'Groq chat completion latency',
+    ['operation', 'model', 'outcome'], buckets=LATENCY_BUCKETS
+)
+GROQ_TTFT = Histogram(
+    'groq_time_to_first_token_seconds',
+    'First streamed token, or queue_time + prompt_time from usage for non-streamed calls',
+    ['operation', 'model'], buckets=LATENCY_BUCKETS
+)
+GROQ_TOKENS = Counter(
+    'groq_tokens', 'Tokens from the API usage field (kind is prompt, completion or cached)',
+    ['operation', 'model', 'kind']
+)
+GROQ_COST = Counter(
+    'groq_cost_usd', 'Estimated spend from token usage and GROQ_PRICES', ['operation', 'model']
+)
+LLM_ROUTE_LATENCY = Histogram(
+    'llm_route_duration_seconds', 'Groq work per request, by the tier that produced the answer',
+    ['operation', 'tier'], buckets=LATENCY_BUCKETS
+)
+MODEL_ESCALATIONS = Counter(
+    'llm_model_escalations', 'Small-model replies rejected and retried on the large model', ['operation', 'model']
+)
+JSON_PARSE_FAILURES = Counter(
+    'llm_json_parse_failures', 'LLM responses with no parseable JSON', ['operation']
+)
+SMTP_CONNECT = Histogram(
+    'smtp_connect_duration_seconds', 'SMTP connect, STARTTLS and login time',
+    ['host', 'outcome'], buckets=LATENCY_BUCKETS
+)
+SMTP_SEND = Histogram(
+    'smtp_send_duration_seconds', 'Time to hand one message to the SMTP server',
+    ['host', 'outcome'], buckets=LATENCY_BUCKETS
+)
+CACHE_LOOKUPS = Counter('cache_lookups', 'Cache lookups', ['cache'])
+CACHE_MISSES = Counter('cache_misses', 'Cache lookups that had to compute the value', ['cache'])
+FACE_FRAMES = Counter(
+    'face_frames', 'Proctoring snapshots by analysis outcome (face, no_face, multiple, undecodable, dropped)',
+    ['outcome']
+)
+PREFETCH_OUTCOMES = Counter(
+    'assessment_prefetch', 'Speculative assessment generations by outcome (started, hit, mismatch, skipped_budget, ...)',
+    ['outcome']
+)
+FACE_BATCH_LATENCY = Histogram(
+    'face_batch_duration_seconds', 'Decode and detection time per batch of snapshots', buckets=LATENCY_BUCKETS
+)
+
+
+def parse_prices(value: str) -> Dict[str, Tuple[float, float]]:
+    """USD per million prompt / completion tokens, from "model=in/out,..." """
+    prices = {
+        'llama-3.3-70b-versatile': (0.59, 0.79),
+        'llama-3.1-8b-instant': (0.05, 0.08),
+    }
+    for entry in value.split(','):
+        model, _, price = entry.strip().partition('=')
+        if model and '/' in price:
+            prompt_price, completion_price = price.split('/', 1)
+            prices[model] = (float(prompt_price), float(completion_price))
+    return prices
+
+
+MODEL_PRICES = parse_prices(os.environ.get('GROQ_PRICES', ''))
+
+
+def instrument_app(app: Flask, name: str) -> None:
+    """Time every request by route template and serve /metrics"""
+    in_flight = IN_FLIGHT.labels(name)
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        in_flight.inc()
+
+    @app.after_request
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _observe_request(exc):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        in_flight.dec()
+        # The route template keeps label cardinality bounded (/attempts/<attempt_id>/answer)
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        status = g.pop('metrics_status', 500)
+        REQUEST_LATENCY.labels(name, route, request.method, str(status)).observe(time.perf_counter() - start)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        if MULTIPROC_DIR:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def record_usage(operation: str, model: str, usage: Any, server_ttft: bool = True) -> None:
+    """Token counts, cost and Groq's server-side timings from a completion's usage field"""
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    GROQ_TOKENS.labels(operation, model, 'prompt').inc(prompt_tokens)
+    GROQ_TOKENS.labels(operation, model, 'completion').inc(completion_tokens)
+    if model in MODEL_PRICES:
+        prompt_price, completion_price = MODEL_PRICES[model]
+        GROQ_COST.labels(operation, model).inc((prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6)
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached = getattr(details, 'cached_tokens', 0) if details is not None else 0
+    if cached:
+        GROQ_TOKENS.labels(operation, model, 'cached').inc(cached)
+    if server_ttft:
+        queue_time = getattr(usage, 'queue_time', None)
+        prompt_time = getattr(usage, 'prompt_time', None)
+        if prompt_time is not None:
+            GROQ_TTFT.labels(operation, model).observe((queue_time or 0) + prompt_time)
+
+
+def track_completion(create: Callable[..., Any], operation: str, **kwargs: Any) -> Any:
+    """Call a chat.completions.create and record latency, TTFT and token usage"""
+    model = kwargs.get('model', '')
+    start = time.perf_counter()
+    try:
+        completion = create(**kwargs)
+    except Exception:
+        GROQ_LATENCY.labels(operation, model, 'error').observe(time.perf_counter() - start)
+        raise
+    if kwargs.get('stream'):
+        return _track_stream(completion, operation, model, start)
+    GROQ_LATENCY.labels(operation, model, 'ok').observe(time.perf_counter() - start)
+    record_usage(operation, model, getattr(completion, 'usage', None))
+    return completion
+
+
+def _track_stream(chunks: Iterator[Any], operation: str, model: str, start: float) -> Iterator[Any]:
+    """Pass stream chunks through, timing the first token and reading usage from x_groq.
+
+    Closing the returned generator early closes the upstream response, so generation stops there.
+    """
+    first_token = False
+    outcome = 'error'
+    try:
+        for chunk in chunks:
+            if not first_token and chunk.choices and chunk.choices[0].delta.content:
+                first_token = True
+                GROQ_TTFT.labels(operation, model).observe(time.perf_counter() - start)
+            x_groq = getattr(chunk, 'x_groq', None)
+            if x_groq is not None and getattr(x_groq, 'usage', None) is not None:
+                record_usage(operation, model, x_groq.usage, server_ttft=False)
+            yield chunk
+        outcome = 'ok'
+    except GeneratorExit:
+        outcome = 'cancelled'
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+        raise
+    finally:
+        GROQ_LATENCY.labels(operation, model, outcome).observe(time.perf_counter() - start)
+
+
+async def track_completion_async(create: Callable[..., Any], operation: str, **kwargs: Any) -> Any:
+    """Async counterpart of track_completion for AsyncGroq (non-streamed calls)"""
+    model = kwargs.get('model', '')
+    start = time.perf_counter()
+    try:
+        completion = await create(**kwargs)
+    except Exception:
+        GROQ_LATENCY.labels(operation, model, 'error').observe(time.perf_counter() - start)
+        raise
+    GROQ_LATENCY.labels(operation, model, 'ok').observe(time.perf_counter() - start)
+    record_usage(operation, model, getattr(completion, 'usage', None))
+    return completion
@@ -0,0 +1,194 @@
+# backend/model_routing.py
+"""Pick the Groq model per request, and check small-model replies before trusting them.
+
+Small, easy requests (a few beginner multiple-choice questions, a short violation list) go to
+GROQ_SMALL_MODEL first; a reply that fails to parse or fails validate() is retried on
+GROQ_LARGE_MODEL. Everything else goes straight to the large model. MODEL_ROUTING=0 sends
+every call to the large model.
+
+escalation() is the one escalation loop. It yields each model to try and is sent back that
+model's reply text; routed() and routed_async() drive it with a blocking or an async transport,
+so the Flask routes, the aiohttp routes and prefetch share it.
+"""
+import os
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Generator, List, Optional, Tuple
+
+from metrics import MODEL_ESCALATIONS, LLM_ROUTE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+ROUTING_ENABLED = os.environ.get('MODEL_ROUTING', '1') == '1'
+SMALL_MODEL = os.environ.get('GROQ_SMALL_MODEL', 'llama-3.1-8b-instant')
+LARGE_MODEL = os.environ.get('GROQ_LARGE_MODEL', 'llama-3.3-70b-versatile')
+
+SMALL_MAX_QUESTIONS = int(os.environ.get('ROUTING_SMALL_MAX_QUESTIONS', 10))
+SMALL_DIFFICULTIES = {d.strip() for d in os.environ.get('ROUTING_SMALL_DIFFICULTIES', 'beginner,easy').split(',')}
+SMALL_QUESTION_TYPES = {'multiple_choice', 'true_false'}
+SMALL_MAX_VIOLATIONS = int(os.environ.get('ROUTING_SMALL_MAX_VIOLATIONS', 25))
+
+SEVERITIES = ('low', 'medium', 'high')
+CONFIDENCE_LEVELS = {'high', 'medium', 'low'}
+
+
+def _int(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def small_model_fits(operation: str, data: Dict[str, Any]) -> bool:
+    """Whether a request is simple enough to try on the small model"""
+    if operation == 'generate_assessment':
+        return (_int(data.get('numberOfQuestions', 5), SMALL_MAX_QUESTIONS + 1) <= SMALL_MAX_QUESTIONS
+                and data.get('difficulty', 'intermediate') in SMALL_DIFFICULTIES
+                and data.get('type', 'multiple_choice') in SMALL_QUESTION_TYPES)
+    if operation == 'violation_report':
+        return len(data.get('violations') or []) <= SMALL_MAX_VIOLATIONS
+    # Candidate analysis drives hiring decisions and grade_answers is already the fallback
+    # for ambiguous free text; both stay on the large model
+    return False
+
+
+def choose_models(operation: str, data: Dict[str, Any]) -> List[str]:
+    """Models to try in order; every model but the last must pass validate()"""
+    if ROUTING_ENABLED and SMALL_MODEL != LARGE_MODEL and small_model_fits(operation, data):
+        return [SMALL_MODEL, LARGE_MODEL]
+    return [LARGE_MODEL]
+
+
+def tier(model: str, attempts: int) -> str:
+    """Label for the model that produced the final answer"""
+    if attempts > 1:
+        return 'escalated'
+    return 'small' if model == SMALL_MODEL else 'large'
+
+
+def _validate_assessment(data: Dict[str, Any], result: Dict[str, Any]) -> Optional[str]:
+    questions = result.get('questions')
+    if not isinstance(questions, list):
+        return 'questions is not a list'
+    expected = _int(data.get('numberOfQuestions', 5), len(questions))
+    if len(questions) != expected:
+        return f'{len(questions)} questions instead of {expected}'
+    ids = set()
+    for question in questions:
+        if not isinstance(question, dict) or not str(question.get('question') or '').strip():
+            return 'question without text'
+        if question.get('id') in ids:
+            return f"duplicate question id {question.get('id')}"
+        ids.add(question.get('id'))
+        if question.get('type', 'multiple_choice') == 'multiple_choice':
+            options = question.get('options')
+            if not isinstance(options, list) or len(options) < 2 or len(set(map(str, options))) != len(options):
+                return f"question {question.get('id')} has unusable options"
+            if not 0 <= _int(question.get('correctAnswer'), -1) < len(options):
+                return f"question {question.get('id')} answer key is out of range"
+    return None
+
+
+def _validate_violation_report(data: Dict[str, Any], result: Dict[str, Any]) -> Optional[str]:
+    if not str(result.get('summary') or '').strip():
+        return 'empty summary'
+    breakdown = result.get('severityBreakdown')
+    if not isinstance(breakdown, dict):
+        return 'severityBreakdown is not an object'
+    counts = [breakdown.get(severity, 0) for severity in SEVERITIES]
+    if any(not isinstance(count, int) or count < 0 for count in counts):
+        return 'severity counts are not non-negative integers'
+    if sum(counts) != len(data.get('violations') or []):
+        return f"severity counts add up to {sum(counts)}, not {len(data.get('violations') or [])}"
+    recommendations = result.get('recommendations')
+    if not isinstance(recommendations, list) or not all(isinstance(r, str) and r.strip() for r in recommendations):
+        return 'recommendations are not a list of strings'
+    if result.get('confidence') not in CONFIDENCE_LEVELS:
+        return f"unknown confidence {result.get('confidence')!r}"
+    return None
+
+
+VALIDATORS = {
+    'generate_assessment': _validate_assessment,
+    'violation_report': _validate_violation_report,
+}
+
+
+def validate(operation: str, data: Dict[str, Any], result: Any) -> Optional[str]:
+    """Why a parsed reply can't be used, or None"""
+    if not isinstance(result, dict):
+        return 'reply is not a JSON object'
+    validator = VALIDATORS.get(operation)
+    return validator(data, result) if validator else None
+
+
+def escalate(operation: str, model: str, reason: str) -> None:
+    MODEL_ESCALATIONS.labels(operation, model).inc()
+    logger.info(f"Escalating {operation} from {model}: {reason}")
+
+
+# (parsed result, error); error is None when the result can be used
+Routed = Tuple[Optional[Any], Optional[str]]
+# Reply text -> (parsed result, error), as ai.extract_json
+Parse = Callable[[str], Routed]
+
+
+def escalation(operation: str, data: Dict[str, Any], parse: Parse,
+               timed: bool = True) -> Generator[str, Optional[str], Routed]:
+    """Yields models in routing order until one's reply parses and validates; returns (result, error).
+
+    The driver sends each model's reply text back, None if the call was cancelled, or throws the
+    transport's exception into it; a failure of the last model is raised. timed=False keeps the
+    call out of groq_route_seconds (speculative calls).
+    """
+    models = choose_models(operation, data)
+    start = time.perf_counter()
+    for attempt, model in enumerate(models, 1):
+        final = attempt == len(models)
+        try:
+            content = yield model
+        except Exception as e:
+            if final:
+                raise
+            escalate(operation, model, str(e))
+            continue
+        if content is None:
+            return None, 'cancelled'
+        result, error = parse(content)
+        # The large model's replies are used as they are, as before routing existed
+        if error is None and not final:
+            error = validate(operation, data, result)
+        if error is None or final:
+            if timed:
+                LLM_ROUTE_LATENCY.labels(operation, tier(model, attempt)).observe(time.perf_counter() - start)
+            return result, error
+        escalate(operation, model, error)
+
+
+def routed(route: Generator[str, Optional[str], Routed], transport: Callable[[str], Optional[str]]) -> Routed:
+    """Drive escalation() with transport(model) -> reply text"""
+    reply, failure = None, None
+    while True:
+        try:
+            model = route.throw(failure) if failure is not None else route.send(reply)
+        except StopIteration as done:
+            return done.value
+        try:
+            reply, failure = transport(model), None
+        except Exception as e:
+            reply, failure = None, e
+
+
+async def routed_async(route: Generator[str, Optional[str], Routed],
+                       transport: Callable[[str], Awaitable[Optional[str]]]) -> Routed:
+    """routed() for an async transport"""
+    reply, failure = None, None
+    while True:
+        try:
+            model = route.throw(failure) if failure is not None else route.send(reply)
+        except StopIteration as done:
+            return done.value
+        try:
+            reply, failure = await transport(model), None
+        except Exception as e:
+            reply, failure = None, e
@@ -0,0 +1,243 @@
+# backend/outbox.py
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable, List
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_DB_PATH = os.environ.get(
+    'OUTBOX_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'outbox.db')
+)
+OUTBOX_WORKERS = int(os.environ.get('OUTBOX_WORKERS', 2))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))
+
+# Columns added after the first release; created on open when missing
+OUTBOX_COLUMNS = {'recipient': 'TEXT', 'merged_into': 'TEXT'}
+
+# Sender takes (to_email, subject, message, html_message) and returns {'success': bool, 'error': str};
+# messages with attachments also pass attachments=[{path, filename, mimetype}]
+Sender = Callable[..., Dict[str, Any]]
+
+
+class Outbox:
+    """Durable SQLite queue of rendered emails drained by background workers.
+
+    Rows are 'queued', 'sending', 'sent' or 'failed'. The digest stage also keeps notifications it
+    is holding here as 'held' rows (due at next_attempt_at) and marks them 'merged' into the digest
+    email that replaced them; workers only ever claim queued and expired sending rows.
+    """
+
+    def __init__(self, sender: Sender, db_path: str = OUTBOX_DB_PATH, workers: int = OUTBOX_WORKERS,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS, base_delay: float = 2.0,
+                 max_delay: float = 300.0, lease: float = 120.0, poll_interval: float = 1.0):
+        self.sender = sender
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._pid: Optional[int] = None
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            # Every worker thread opens its own connection; migrate one at a time
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                'id TEXT PRIMARY KEY, idempotency_key TEXT UNIQUE, payload TEXT NOT NULL, '
+                'status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+                'next_attempt_at REAL NOT NULL, last_error TEXT, '
+                'created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            existing = {row[1] for row in conn.execute('PRAGMA table_info(outbox)')}
+            for column, kind in OUTBOX_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f'ALTER TABLE outbox ADD COLUMN {column} {kind}')
+            conn.execute('CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS outbox_recipient ON outbox (recipient, created_at)')
+            conn.execute('COMMIT')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE on this thread's connection; serializes writers across worker processes"""
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def insert(self, db: sqlite3.Connection, message: Dict[str, Any], idempotency_key: Optional[str] = None,
+               status: str = 'queued', due: Optional[float] = None, recipient: Optional[str] = None) -> str:
+        """Add one row and return its id, or the existing row's id for a repeated idempotency key"""
+        now = time.time()
+        message_id = uuid.uuid4().hex
+        try:
+            db.execute(
+                'INSERT INTO outbox (id, idempotency_key, payload, status, next_attempt_at, created_at, updated_at, '
+                'recipient) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (message_id, idempotency_key, json.dumps(message), status, now if due is None else due, now, now,
+                 recipient)
+            )
+        except sqlite3.IntegrityError:
+            row = db.execute('SELECT id FROM outbox WHERE idempotency_key = ?', (idempotency_key,)).fetchone()
+            logger.info(f"Duplicate email request for idempotency key {idempotency_key}")
+            return row[0]
+        if status == 'queued':
+            self._wakeup.set()
+        return message_id
+
+    def enqueue(self, to_email: str, subject: str, message: str, html_message: Optional[str] = None,
+                idempotency_key: Optional[str] = None, attachments: Optional[List[Dict[str, str]]] = None,
+                recipient: Optional[str] = None) -> str:
+        """Persist a message for delivery and return its id.
+
+        Attachments are files on disk owned by the message; they are deleted once it is sent or given up on.
+        `recipient` is the digest stage's key for the address, set on notifications it coalesces.
+        """
+        self.start()
+        message_data = {'to': to_email, 'subject': subject, 'text': message, 'html': html_message}
+        if attachments:
+            message_data['attachments'] = attachments
+        return self.insert(self._db(), message_data, idempotency_key, recipient=recipient)
+
+    def status(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Delivery status; a notification merged into a digest reports the digest's delivery"""
+        db = self._db()
+        row = db.execute(
+            'SELECT status, attempts, last_error, created_at, updated_at, next_attempt_at, merged_into '
+            'FROM outbox WHERE id = ?',
+            (message_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status = {
+            'messageId': message_id,
+            'status': row[0],
+            'attempts': row[1],
+            'error': row[2],
+            'createdAt': row[3],
+            'updatedAt': row[4]
+        }
+        if row[0] == 'held':
+            status['flushAt'] = row[5]
+        elif row[0] == 'merged':
+            digest = self.status(row[6])
+            if digest is not None:
+                status.update(status=digest['status'], attempts=digest['attempts'], error=digest['error'],
+                              updatedAt=digest['updatedAt'], digestId=row[6])
+        return status
+
+    def start(self) -> None:
+        """Start delivery workers once per process (threads do not survive fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._local = threading.local()
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'outbox-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._pid = None
+
+    def _claim(self) -> Optional[tuple]:
+        """Atomically lease the next due message, reclaiming expired leases"""
+        now = time.time()
+        return self._db().execute(
+            "UPDATE outbox SET status = 'sending', attempts = attempts + 1, updated_at = ? "
+            'WHERE id = (SELECT id FROM outbox WHERE '
+            "(status = 'queued' AND next_attempt_at <= ?) OR (status = 'sending' AND updated_at <= ?) "
+            'ORDER BY next_attempt_at LIMIT 1) '
+            'RETURNING id, payload, attempts',
+            (now, now, now - self.lease)
+        ).fetchone()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self._claim()
+            except sqlite3.OperationalError as e:
+                logger.error(f"Outbox claim failed: {str(e)}")
+                claimed = None
+            if claimed is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._deliver(*claimed)
+
+    def _deliver(self, message_id: str, payload: str, attempts: int) -> None:
+        message = json.loads(payload)
+        extra = {'attachments': message['attachments']} if message.get('attachments') else {}
+        try:
+            result = self.sender(message['to'], message['subject'], message['text'], message['html'], **extra)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+
+        now = time.time()
+        db = self._db()
+        if result.get('success'):
+            db.execute(
+                "UPDATE outbox SET status = 'sent', last_error = NULL, updated_at = ? WHERE id = ?",
+                (now, message_id)
+            )
+            self._discard_attachments(message)
+            return
+
+        error = result.get('error', 'Unknown error')
+        if attempts >= self.max_attempts:
+            logger.error(f"Giving up on email {message_id} after {attempts} attempts: {error}")
+            db.execute(
+                "UPDATE outbox SET status = 'failed', last_error = ?, updated_at = ? WHERE id = ?",
+                (error, now, message_id)
+            )
+            self._discard_attachments(message)
+            return
+
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+        logger.info(f"Retrying email {message_id} in {delay:.1f}s: {error}")
+        db.execute(
+            "UPDATE outbox SET status = 'queued', last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+            (error, now + delay, now, message_id)
+        )
+
+    def _discard_attachments(self, message: Dict[str, Any]) -> None:
+        for attachment in message.get('attachments') or []:
+            try:
+                os.remove(attachment['path'])
+            except OSError:
+                pass
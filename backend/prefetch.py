@@ -0,0 +1,331 @@
+# backend/prefetch.py
+"""Speculative assessment generation while the create form is still being filled in.
+
+The form posts the parameters that shape the questions (job role, type, difficulty and count)
+once they have stopped changing. A generation then starts on a small background pool, and its
+result is held for PREFETCH_TTL_SECONDS. /generate-assessment sends the prefetchId back:
+- if the parameters still match, it takes the held result, or waits on the generation already
+  in flight;
+- otherwise the speculation is cancelled, and the request generates as usual.
+Speculative calls stream, so cancelling one closes the Groq stream and stops generation mid-reply.
+
+Speculations are recorded in SQLite (PREFETCH_DB_PATH), so a claim, replace or cancel that lands
+on another gunicorn worker than the one generating still finds it: the claiming worker waits for
+the result to appear in the database, and a generation stops when its row is marked cancelled.
+
+Budgets keep speculation from spending quota meant for real requests:
+- per client, the 'prefetch' admission class;
+- per process, at most PREFETCH_MAX_IN_FLIGHT running and PREFETCH_PER_HOUR started;
+- none at all while LLM requests are queued.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from admission import FairQueue, RateLimiter, RouteClass, admission
+from metrics import PREFETCH_OUTCOMES
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', '1') == '1'
+PREFETCH_DB_PATH = os.environ.get(
+    'PREFETCH_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prefetch.db')
+)
+# How long a speculation is kept for a /generate-assessment to claim it
+PREFETCH_TTL_SECONDS = float(os.environ.get('PREFETCH_TTL_SECONDS', 120))
+# Speculative generations running at once per process
+PREFETCH_MAX_IN_FLIGHT = int(os.environ.get('PREFETCH_MAX_IN_FLIGHT', 2))
+# Speculative generations started per process per hour, with bursts of up to PREFETCH_BURST
+PREFETCH_PER_HOUR = float(os.environ.get('PREFETCH_PER_HOUR', 60))
+PREFETCH_BURST = int(os.environ.get('PREFETCH_BURST', 10))
+# Speculations held at once; one per client, so this bounds memory across clients
+PREFETCH_MAX_HELD = int(os.environ.get('PREFETCH_MAX_HELD', 200))
+# Longest a claiming request waits on a speculation still generating before generating itself
+PREFETCH_CLAIM_TIMEOUT = float(os.environ.get('PREFETCH_CLAIM_TIMEOUT', 60))
+# How often a generation checks for a cancel from another worker, and a claim polls for another worker's result
+PREFETCH_POLL_SECONDS = float(os.environ.get('PREFETCH_POLL_SECONDS', 0.25))
+
+# The fields assessment_completion reads, with its defaults: equal values give the same prompt
+PARAMS = {
+    'jobRole': 'Software Developer',
+    'type': 'multiple_choice',
+    'difficulty': 'intermediate',
+    'numberOfQuestions': 5,
+}
+
+# (request data, cancelled event) -> (result, error), as ai.routed_completion
+Generate = Callable[[Dict[str, Any], threading.Event], Tuple[Optional[Dict[str, Any]], Optional[str]]]
+
+
+def params_key(data: Dict[str, Any]) -> str:
+    return json.dumps([str(data.get(field, default)) for field, default in PARAMS.items()])
+
+
+class Cancellation:
+    """A speculation's cancelled flag: set here, or by another worker marking its row cancelled"""
+
+    def __init__(self, prefetcher: 'Prefetcher', prefetch_id: str):
+        self.prefetcher = prefetcher
+        self.prefetch_id = prefetch_id
+        self.event = threading.Event()
+        self.checked = time.monotonic()
+
+    def set(self) -> None:
+        self.event.set()
+
+    def is_set(self) -> bool:
+        if not self.event.is_set() and time.monotonic() - self.checked >= PREFETCH_POLL_SECONDS:
+            self.checked = time.monotonic()
+            row = self.prefetcher.row(self.prefetch_id)
+            if row is None or row['status'] == 'cancelled':
+                self.event.set()
+        return self.event.is_set()
+
+
+class Speculation:
+    """One speculative generation running in this process and the parameters it was started for"""
+
+    __slots__ = ('id', 'key', 'client', 'data', 'started', 'cancelled', 'future')
+
+    def __init__(self, prefetcher: 'Prefetcher', client: str, data: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.key = params_key(data)
+        self.client = client
+        self.data = {field: data[field] for field in PARAMS if field in data}
+        self.started = time.monotonic()
+        self.cancelled = Cancellation(prefetcher, self.id)
+        self.future: Optional[Future] = None
+
+
+class Prefetcher:
+    """Speculations, one per client, and the budget for starting more.
+
+    Rows in the database are 'running', 'done', 'failed' or 'cancelled', and claimed once taken.
+    self.speculations holds the ones this process is generating.
+    """
+
+    def __init__(self, max_in_flight: int = PREFETCH_MAX_IN_FLIGHT, per_hour: float = PREFETCH_PER_HOUR,
+                 burst: int = PREFETCH_BURST, ttl: float = PREFETCH_TTL_SECONDS, db_path: str = PREFETCH_DB_PATH):
+        self.max_in_flight = max_in_flight
+        self.ttl = ttl
+        self.db_path = db_path
+        self.budget = RouteClass('prefetch-budget', per_minute=per_hour / 60, burst=burst)
+        self.limiter = RateLimiter(max_clients=1)
+        # Speculation waits while any of these have requests queued (async_app adds its own)
+        self.busy_queues: List[FairQueue] = [admission.queues['llm']]
+        self.speculations: Dict[str, Speculation] = {}
+        self.running = 0
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self._swept = 0.0
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS speculations ('
+                'id TEXT PRIMARY KEY, client TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL, '
+                'claimed INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, '
+                'started_at REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS speculations_client ON speculations (client, started_at)')
+            self._local.conn = conn
+        return conn
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Created on first use, so a preloading gunicorn master never starts threads
+        if self._pool is None:
+            with self.lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='prefetch')
+        return self._pool
+
+    def reset_pool(self) -> None:
+        """Fresh pool, state and connections in a forked worker"""
+        self.lock = threading.Lock()
+        self.limiter = RateLimiter(max_clients=1)
+        self.speculations = {}
+        self.running = 0
+        self._local = threading.local()
+        self._pool = None
+
+    def row(self, prefetch_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db().execute(
+            'SELECT status, claimed, result, error FROM speculations WHERE id = ?', (prefetch_id,)
+        ).fetchone()
+        return dict(zip(('status', 'claimed', 'result', 'error'), row)) if row is not None else None
+
+    def start(self, client: str, data: Dict[str, Any], generate: Generate,
+              replaces: Optional[str] = None) -> Tuple[Optional[str], str]:
+        """(prefetch id, 'started' or 'reused'), or (None, reason it was skipped)"""
+        key = params_key(data)
+        pool = self._executor()
+        db = self._db()
+        with self.lock:
+            self._expire()
+            if replaces:
+                self._cancel(replaces, 'replaced')
+            current = db.execute(
+                "SELECT id, params, status FROM speculations WHERE client = ? AND claimed = 0 "
+                "AND status IN ('running', 'done') AND started_at > ? ORDER BY started_at DESC LIMIT 1",
+                (client, time.time() - self.ttl)
+            ).fetchone()
+            if current is not None:
+                if current[1] == key:
+                    PREFETCH_OUTCOMES.labels('reused').inc()
+                    return current[0], 'reused'
+                self._cancel(current[0], 'replaced')
+
+            reason = None
+            if any(queue.queued for queue in self.busy_queues):
+                reason = 'busy'
+            elif self.running >= self.max_in_flight or len(self.speculations) >= PREFETCH_MAX_HELD:
+                reason = 'capacity'
+            elif not self.limiter.take('process', self.budget)[0]:
+                reason = 'budget'
+            if reason is not None:
+                PREFETCH_OUTCOMES.labels(f'skipped_{reason}').inc()
+                return None, reason
+
+            speculation = Speculation(self, client, data)
+            now = time.time()
+            db.execute(
+                "INSERT INTO speculations (id, client, params, status, started_at, updated_at) "
+                "VALUES (?, ?, ?, 'running', ?, ?)",
+                (speculation.id, client, key, now, now)
+            )
+            self.speculations[speculation.id] = speculation
+            self.running += 1
+            speculation.future = pool.submit(self._run, speculation, generate)
+        PREFETCH_OUTCOMES.labels('started').inc()
+        return speculation.id, 'started'
+
+    def _run(self, speculation: Speculation, generate: Generate):
+        try:
+            if speculation.cancelled.is_set():
+                result, error = None, 'cancelled'
+            else:
+                result, error = generate(speculation.data, speculation.cancelled)
+        except Exception as e:
+            result, error = None, str(e)
+        finally:
+            with self.lock:
+                self.running -= 1
+        # A row cancelled meanwhile stays cancelled
+        self._db().execute(
+            "UPDATE speculations SET status = ?, result = ?, error = ?, updated_at = ? "
+            "WHERE id = ? AND status = 'running'",
+            ('failed' if error or result is None else 'done', json.dumps(result) if error is None else None,
+             error, time.time(), speculation.id)
+        )
+        return result, error
+
+    def claim(self, prefetch_id: str, data: Dict[str, Any],
+              timeout: float = PREFETCH_CLAIM_TIMEOUT) -> Optional[Dict[str, Any]]:
+        """The speculation's result if its parameters match the request; None to generate as usual"""
+        with self.lock:
+            self._expire()
+            speculation = self.speculations.pop(prefetch_id, None)
+        db = self._db()
+        claimed = db.execute(
+            "UPDATE speculations SET claimed = 1, updated_at = ? WHERE id = ? AND claimed = 0 "
+            "AND status != 'cancelled' AND started_at > ? RETURNING params",
+            (time.time(), prefetch_id, time.time() - self.ttl)
+        ).fetchone()
+        if claimed is None:
+            if speculation is not None:
+                speculation.cancelled.set()
+            PREFETCH_OUTCOMES.labels('unknown').inc()
+            return None
+        if claimed[0] != params_key(data):
+            self._stop(prefetch_id, speculation)
+            PREFETCH_OUTCOMES.labels('mismatch').inc()
+            return None
+
+        if speculation is not None:
+            waited = not speculation.future.done()
+            try:
+                result, error = speculation.future.result(timeout)
+            except FutureTimeout:
+                result, error = None, f'still generating after {timeout:g}s'
+        else:
+            result, error, waited = self._wait(prefetch_id, timeout)
+        if error or result is None:
+            if error and error.startswith('still generating'):
+                self._stop(prefetch_id, speculation)
+            logger.info(f"Prefetch {prefetch_id} unusable ({error}); generating instead")
+            PREFETCH_OUTCOMES.labels('failed').inc()
+            return None
+        PREFETCH_OUTCOMES.labels('hit_waited' if waited else 'hit').inc()
+        return result
+
+    def _wait(self, prefetch_id: str, timeout: float) -> Tuple[Optional[Dict[str, Any]], Optional[str], bool]:
+        """(result, error, waited) of a speculation another worker is generating"""
+        deadline = time.monotonic() + timeout
+        waited = False
+        while True:
+            row = self.row(prefetch_id)
+            if row is None:
+                return None, 'expired', waited
+            if row['status'] == 'done':
+                return json.loads(row['result']), None, waited
+            if row['status'] != 'running':
+                return None, row['error'] or row['status'], waited
+            if time.monotonic() >= deadline:
+                return None, f'still generating after {timeout:g}s', waited
+            waited = True
+            time.sleep(PREFETCH_POLL_SECONDS)
+
+    def _stop(self, prefetch_id: str, speculation: Optional[Speculation]) -> None:
+        """Cancel a claimed speculation that will not be used, wherever it is generating"""
+        if speculation is not None:
+            speculation.cancelled.set()
+        self._db().execute(
+            "UPDATE speculations SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'running'",
+            (time.time(), prefetch_id)
+        )
+
+    def cancel(self, prefetch_id: str) -> bool:
+        with self.lock:
+            return self._cancel(prefetch_id, 'cancelled')
+
+    def _cancel(self, prefetch_id: str, outcome: str) -> bool:
+        """Cancel an unclaimed speculation, here or in another worker; caller holds the lock"""
+        cancelled = self._db().execute(
+            "UPDATE speculations SET status = 'cancelled', updated_at = ? WHERE id = ? AND claimed = 0 "
+            "AND status IN ('running', 'done')",
+            (time.time(), prefetch_id)
+        ).rowcount > 0
+        speculation = self.speculations.pop(prefetch_id, None)
+        if speculation is not None and cancelled:
+            speculation.cancelled.set()
+            # Never started, so _run will not release its slot
+            if speculation.future is not None and speculation.future.cancel():
+                self.running -= 1
+        if cancelled:
+            PREFETCH_OUTCOMES.labels(outcome).inc()
+        return cancelled
+
+    def _expire(self) -> None:
+        """Cancel speculations nobody claimed in time and forget old rows; caller holds the lock"""
+        now = time.monotonic()
+        for prefetch_id in [s.id for s in self.speculations.values() if now - s.started > self.ttl]:
+            self._cancel(prefetch_id, 'expired')
+        if now - self._swept > self.ttl:
+            self._swept = now
+            self._db().execute('DELETE FROM speculations WHERE started_at < ?', (time.time() - 2 * self.ttl,))
+
+
+# Shared prefetcher used by the Flask routes
+prefetcher = Prefetcher()
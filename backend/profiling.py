@@ -0,0 +1,228 @@
+# backend/profiling.py
+"""Per-request phase spans, an opt-in stack sampler and slow-request capture.
+
+Routes mark phases with `with span('groq'):`. Every request keeps its spans in `g`
+(two perf_counter calls per phase); they are only stored when the request exceeds
+SLOW_REQUEST_MS or was picked for sampling. Sampled requests also get a stack profile
+in collapsed-stack format (feed `stacks` to flamegraph.pl or speedscope).
+
+The /debug endpoints are only registered when DEBUG_TOKEN is set and require it in the
+X-Debug-Token header. Buffers are per process, so under gunicorn each worker answers
+for itself (see `pid` in the response).
+"""
+import os
+import sys
+import hmac
+import time
+import random
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from flask import Flask, g, request, jsonify, has_request_context
+
+DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN')
+# Fraction of requests run under the stack sampler; adjustable via POST /debug/profiling
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 2000))
+SLOW_REQUEST_BUFFER = int(os.environ.get('SLOW_REQUEST_BUFFER', 100))
+
+MAX_STACK_DEPTH = 64
+TOP_STACKS = 25
+
+
+@contextmanager
+def span(name: str):
+    """Time one phase of the current request"""
+    if not has_request_context() or 'profile_spans' not in g:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        g.profile_spans.append((name, start, end))
+
+
+def _collapse(frame) -> str:
+    """Root-first 'file:function;...' stack, as flamegraph tools expect"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """One background thread sampling the stacks of every thread being profiled"""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self._active: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._pid: Optional[int] = None
+
+    def begin(self, thread_id: int) -> None:
+        with self._lock:
+            self._active[thread_id] = Counter()
+            # A thread inherited across fork is gone; start a fresh one
+            if not self._running or self._pid != os.getpid():
+                self._running = True
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name='stack-sampler', daemon=True).start()
+
+    def end(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._running = False
+                    return
+                targets = list(self._active.items())
+            frames = sys._current_frames()
+            for thread_id, counts in targets:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    counts[_collapse(frame)] += 1
+            time.sleep(self.interval)
+
+
+class RequestProfiler:
+    """Decides which requests to sample and keeps the slow/sampled ones in ring buffers"""
+
+    def __init__(self, sample_rate: float = PROFILE_SAMPLE_RATE, slow_ms: float = SLOW_REQUEST_MS,
+                 buffer_size: int = SLOW_REQUEST_BUFFER, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.sampler = StackSampler(interval_ms)
+        self.slow_requests: deque = deque(maxlen=buffer_size)
+        self.profiles: deque = deque(maxlen=buffer_size)
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            'sampleRate': self.sample_rate,
+            'slowThresholdMs': self.slow_ms,
+            'intervalMs': self.sampler.interval * 1000,
+            'bufferSize': self.slow_requests.maxlen,
+        }
+
+    def configure(self, sample_rate: Optional[float] = None, slow_ms: Optional[float] = None,
+                  interval_ms: Optional[float] = None) -> Dict[str, Any]:
+        if sample_rate is not None:
+            self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        if slow_ms is not None:
+            self.slow_ms = max(0.0, float(slow_ms))
+        if interval_ms is not None:
+            self.sampler.interval = max(0.001, float(interval_ms) / 1000.0)
+        return self.config()
+
+    def start_request(self) -> None:
+        g.profile_start = time.perf_counter()
+        g.profile_spans = []
+        g.profile_sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if g.profile_sampled:
+            self.sampler.begin(threading.get_ident())
+
+    def finish_request(self, status: int) -> None:
+        start = g.pop('profile_start', None)
+        if start is None:
+            return
+        end = time.perf_counter()
+        sampled = g.pop('profile_sampled', False)
+        stacks = self.sampler.end(threading.get_ident()) if sampled else None
+        total_ms = (end - start) * 1000
+        if not sampled and total_ms < self.slow_ms:
+            return
+
+        spans = g.pop('profile_spans', [])
+        record = {
+            'timestamp': datetime.now().isoformat(),
+            'pid': os.getpid(),
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule else 'unmatched',
+            'path': request.path,
+            'status': status,
+            'totalMs': round(total_ms, 3),
+            'spans': [{
+                'name': name,
+                'startMs': round((s - start) * 1000, 3),
+                'durationMs': round((e - s) * 1000, 3),
+            } for name, s, e in spans],
+        }
+        # Time outside any span: request parsing, prompt building, Flask itself
+        record['unaccountedMs'] = round(total_ms - sum(s['durationMs'] for s in record['spans']), 3)
+        if total_ms >= self.slow_ms:
+            self.slow_requests.append(record)
+        if sampled:
+            self.profiles.append({
+                **record,
+                'samples': sum(stacks.values()),
+                'stacks': [{'stack': stack, 'count': count} for stack, count in stacks.most_common(TOP_STACKS)],
+            })
+
+
+profiler = RequestProfiler()
+
+
+def _authorized() -> bool:
+    return hmac.compare_digest(request.headers.get('X-Debug-Token', ''), DEBUG_TOKEN)
+
+
+def install_profiler(app: Flask, prof: RequestProfiler = profiler) -> None:
+    """Span bookkeeping for every request, plus the /debug endpoints when DEBUG_TOKEN is set"""
+
+    @app.before_request
+    def _start_profile():
+        prof.start_request()
+
+    @app.after_request
+    def _record_profile_status(response):
+        g.profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        # Teardown also runs after unhandled errors, so the sampler never keeps a dead request
+        prof.finish_request(g.pop('profile_status', 500))
+
+    if not DEBUG_TOKEN:
+        return
+
+    @app.route('/debug/profiling', methods=['GET', 'POST'])
+    def profiling_config():
+        if not _authorized():
+            return jsonify({"error": "Forbidden"}), 403
+        if request.method == 'POST':
+            data = request.json or {}
+            return jsonify(prof.configure(data.get('sampleRate'), data.get('slowThresholdMs'),
+                                          data.get('intervalMs')))
+        return jsonify(prof.config())
+
+    @app.route('/debug/slow-requests', methods=['GET'])
+    def slow_requests():
+        if not _authorized():
+            return jsonify({"error": "Forbidden"}), 403
+        return jsonify({'pid': os.getpid(), **prof.config(), 'requests': _recent(prof.slow_requests)})
+
+    @app.route('/debug/profiles', methods=['GET'])
+    def profiles():
+        if not _authorized():
+            return jsonify({"error": "Forbidden"}), 403
+        return jsonify({'pid': os.getpid(), **prof.config(), 'profiles': _recent(prof.profiles)})
+
+
+def _recent(buffer: deque) -> List[Dict[str, Any]]:
+    """Newest first, optionally filtered by ?route= and capped by ?limit="""
+    route = request.args.get('route')
+    limit = request.args.get('limit', type=int) or len(buffer)
+    records = [r for r in reversed(buffer) if not route or r['route'] == route]
+    return records[:limit]
@@ -0,0 +1,116 @@
+# backend/responses.py
+"""Response layer: orjson for JSON, gzip/brotli above a size threshold, strong ETags on GETs.
+
+orjson and brotli are optional; without them the stock encoder and gzip are used.
+"""
+import os
+import gzip
+import json
+import hashlib
+from typing import Any
+
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+
+from profiling import span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this go out uncompressed; the headers would eat most of the saving
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'text/html', 'text/plain', 'text/csv'}
+ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify/get_json through orjson, falling back to Flask's encoder for anything it can't handle"""
+
+    def _options(self) -> int:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        # Flask's default() keeps dates as HTTP dates and handles dataclasses, UUIDs and __html__
+        return orjson.dumps(obj, default=self.default, option=self._options())
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+def dumps(obj: Any) -> str:
+    """Compact JSON for responses built outside Flask (async_app)"""
+    if orjson is None:
+        return json.dumps(obj)
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def finish_response(response: Response) -> Response:
+    """ETag/304 for successful GETs, then content negotiation for large bodies"""
+    if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers:
+        return response
+    compressible = response.mimetype in COMPRESSIBLE_TYPES
+    if compressible:
+        response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = None
+    if compressible and len(body) >= COMPRESS_MIN_BYTES and 200 <= response.status_code < 300:
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+
+    if request.method in ('GET', 'HEAD') and response.status_code == 200:
+        # Strong validator: one tag per byte-exact representation, hence the encoding suffix
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if encoding:
+            etag = f'{etag}-{encoding}'
+        response.set_etag(etag)
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = 'no-cache'
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            response.set_data(b'')
+            del response.headers['Content-Length']
+            return response
+
+    if encoding:
+        with span('compress'):
+            response.set_data(_compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def install_responses(app: Flask) -> None:
+    """Use the fast JSON provider and compress/validate every response"""
+    if orjson is not None:
+        app.json = FastJSONProvider(app)
+    app.after_request(finish_response)
@@ -0,0 +1,258 @@
+# backend/smtp_pool.py
+import ssl
+import time
+import sqlite3
+import smtplib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from email.message import Message
+
+from metrics import SMTP_CONNECT, SMTP_SEND
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection:
+    """Authenticated SMTP session plus bookkeeping"""
+
+    __slots__ = ('smtp', 'created_at', 'last_used')
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class SMTPPool:
+    """Bounded pool of logged-in SMTP sessions that share one SSL context"""
+
+    def __init__(self, host: str, port: int, user: Optional[str], password: Optional[str],
+                 max_size: int = 4, idle_timeout: float = 60.0, check_after: float = 10.0,
+                 timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.timeout = timeout
+        self.debug = False
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        self._idle: List[PooledConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @property
+    def ssl_context(self) -> ssl.SSLContext:
+        """Built on first connect; loading the CA bundle is a noticeable part of a cold start"""
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    @ssl_context.setter
+    def ssl_context(self, context: ssl.SSLContext) -> None:
+        self._ssl_context = context
+
+    def _connect(self) -> PooledConnection:
+        start = time.perf_counter()
+        try:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        except Exception:
+            SMTP_CONNECT.labels(self.host, 'error').observe(time.perf_counter() - start)
+            raise
+        try:
+            if self.debug:
+                smtp.set_debuglevel(1)
+            smtp.starttls(context=self.ssl_context)
+            if self.user and self.password:
+                smtp.login(self.user, self.password)
+        except Exception:
+            SMTP_CONNECT.labels(self.host, 'error').observe(time.perf_counter() - start)
+            _close(smtp)
+            raise
+        SMTP_CONNECT.labels(self.host, 'ok').observe(time.perf_counter() - start)
+        logger.info(f"Opened pooled SMTP session to {self.host}:{self.port}")
+        return PooledConnection(smtp)
+
+    def _healthy(self, conn: PooledConnection) -> bool:
+        """Expire idle sessions and NOOP-check ones that sat unused for a while"""
+        idle_for = time.monotonic() - conn.last_used
+        if idle_for > self.idle_timeout:
+            return False
+        if idle_for > self.check_after:
+            try:
+                return conn.smtp.noop()[0] == 250
+            except (smtplib.SMTPException, OSError):
+                return False
+        return True
+
+    def acquire(self) -> PooledConnection:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise smtplib.SMTPException('Timed out waiting for a pooled SMTP connection')
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._connect()
+                if self._healthy(conn):
+                    return conn
+                _close(conn.smtp)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn: PooledConnection, discard: bool = False) -> None:
+        try:
+            if discard:
+                _close(conn.smtp)
+            else:
+                conn.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Check out a session; it is discarded if the server dropped it"""
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn.smtp
+        except (smtplib.SMTPServerDisconnected, OSError):
+            discard = True
+            raise
+        except smtplib.SMTPException:
+            # Leave the session in a clean state for the next message
+            try:
+                conn.smtp.rset()
+            except (smtplib.SMTPException, OSError):
+                discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def send_message(self, msg: Message) -> None:
+        """Send over a pooled session, reconnecting once if it was dropped"""
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            try:
+                with self.connection() as smtp:
+                    smtp.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                logger.info("Pooled SMTP session dropped, reconnecting")
+                with self.connection() as smtp:
+                    smtp.send_message(msg)
+            outcome = 'ok'
+        finally:
+            SMTP_SEND.labels(self.host, outcome).observe(time.perf_counter() - start)
+
+    def close(self) -> None:
+        """Close every idle session"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            _close(conn.smtp)
+
+
+class SendThrottle:
+    """Token bucket that keeps sends under the provider's per-minute limit.
+
+    With a db_path the bucket is a row in SQLite, taken from inside one BEGIN IMMEDIATE
+    transaction, so every worker process and every sender (bulk sends and outbox delivery)
+    draw from the same budget.
+    """
+
+    def __init__(self, per_minute: int, db_path: Optional[str] = None, name: str = 'smtp'):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, float(per_minute) / 60.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.db_path = db_path
+        self.name = name
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def reset_connection(self) -> None:
+        """Reopen the database in a forked worker instead of sharing the parent's connection"""
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def wait(self) -> None:
+        """Block until a send is allowed"""
+        while True:
+            with self._lock:
+                delay = self._take_shared() if self.db_path else self._take()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _refill(self, tokens: float, elapsed: float) -> Tuple[float, float]:
+        """(tokens left, seconds to wait) after refilling for `elapsed` and trying to take one"""
+        tokens = min(self.capacity, tokens + max(elapsed, 0.0) * self.rate)
+        if tokens >= 1.0:
+            return tokens - 1.0, 0.0
+        return tokens, (1.0 - tokens) / self.rate
+
+    def _take(self) -> float:
+        now = time.monotonic()
+        self.tokens, delay = self._refill(self.tokens, now - self.updated)
+        self.updated = now
+        return delay
+
+    def _take_shared(self) -> float:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS send_throttle (name TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated REAL NOT NULL)'
+            )
+        db = self._conn
+        now = time.time()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT tokens, updated FROM send_throttle WHERE name = ?', (self.name,)).fetchone()
+            tokens, updated = row if row is not None else (self.capacity, now)
+            tokens, delay = self._refill(tokens, now - updated)
+            db.execute('INSERT OR REPLACE INTO send_throttle VALUES (?, ?, ?)', (self.name, tokens, now))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return delay
+
+
+def _close(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+
+_pools: Dict[Tuple[str, int, Optional[str]], SMTPPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(host: str, port: int, user: Optional[str], password: Optional[str],
+                  **options) -> SMTPPool:
+    """Process-wide pool per server and account, shared by every sender"""
+    key = (host, port, user)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SMTPPool(host, port, user, password, **options)
+            _pools[key] = pool
+        return pool
+
+
+def reset_pools() -> None:
+    """Forget pools inherited across fork without closing them; the parent still owns those sockets"""
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
@@ -0,0 +1,246 @@
+# backend/variants.py
+"""Assessment variants: many shuffled forms of one generated assessment, derived locally.
+
+An assessment's generated questions are registered once as a pool. Variant i of a pool is a
+pure function of the pool and i: a seeded subset of the questions in seeded order, each
+multiple-choice question's options shuffled with correctAnswer remapped. Nothing is stored per
+variant, so thousands of forms cost the one Groq generation that produced the pool, and the
+variant id is enough to rebuild its answer key when grading. Pools are keyed by a hash of their
+content, so variants already handed out keep grading against their own pool after the
+assessment is edited and registered again.
+"""
+import os
+import re
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Blueprint, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+# Variant routes; registered by app.create_app()
+bp = Blueprint('variants', __name__)
+
+VARIANTS_DB_PATH = os.environ.get(
+    'VARIANTS_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'variants.db')
+)
+# Most variant ids handed out by one request
+VARIANT_MAX_BATCH = int(os.environ.get('VARIANT_MAX_BATCH', 10000))
+# Pools kept in memory; the rest are reloaded from SQLite on use
+VARIANT_CACHED_POOLS = int(os.environ.get('VARIANT_CACHED_POOLS', 256))
+
+# Options whose meaning depends on where they sit; they keep their position when shuffling
+_PINNED_OPTION = re.compile(r'\b(all|none|both|neither)\s+of\s+the\s+(above|options|answers)\b', re.IGNORECASE)
+
+
+def pool_id(questions: List[Dict[str, Any]], seed: str = '') -> str:
+    """Content hash naming a pool; the same questions (and seed) always give the same variants"""
+    canonical = json.dumps({'questions': questions, 'seed': seed}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:12]
+
+
+def parse_variant_id(variant_id: str) -> Tuple[str, int]:
+    """("<pool id>-<index>") -> (pool id, index)"""
+    pool, _, index = str(variant_id).rpartition('-')
+    if not pool or not index.isdigit():
+        raise KeyError(f'Unknown variant {variant_id}')
+    return pool, int(index)
+
+
+def _shuffles(question: Dict[str, Any]) -> bool:
+    options = question.get('options')
+    return (isinstance(options, list) and len(options) > 2
+            and question.get('type', 'multiple_choice') not in ('true_false', 'coding', 'text'))
+
+
+def _option_order(options: List[Any], rng: random.Random) -> List[int]:
+    """Pool option index shown at each position; pinned options stay where they are"""
+    free = [i for i, option in enumerate(options) if not _PINNED_OPTION.search(str(option))]
+    shuffled = free[:]
+    rng.shuffle(shuffled)
+    order = list(range(len(options)))
+    for position, source in zip(free, shuffled):
+        order[position] = source
+    return order
+
+
+def _remap(correct: Any, order: List[int]) -> Any:
+    """correctAnswer for the shuffled options; keys that are not an option index are kept"""
+    if isinstance(correct, bool):
+        return correct
+    if isinstance(correct, int) and 0 <= correct < len(order):
+        return order.index(correct)
+    if isinstance(correct, str) and correct.isdigit() and int(correct) < len(order):
+        return str(order.index(int(correct)))
+    return correct
+
+
+class Variant:
+    """One form: its questions (with remapped keys) and each shuffled question's option order"""
+
+    __slots__ = ('variant_id', 'questions', 'option_orders')
+
+    def __init__(self, variant_id: str, questions: List[Dict[str, Any]], option_orders: Dict[str, List[int]]):
+        self.variant_id = variant_id
+        self.questions = questions
+        self.option_orders = option_orders
+
+    def pool_answers(self, answers: Dict[str, Any]) -> Dict[str, Any]:
+        """Answers with option indices mapped back to the pool's, for statistics across variants"""
+        mapped = dict(answers)
+        for question_id, order in self.option_orders.items():
+            answer = answers.get(question_id)
+            if isinstance(answer, int) and not isinstance(answer, bool) and 0 <= answer < len(order):
+                mapped[question_id] = order[answer]
+            elif isinstance(answer, str) and answer.isdigit() and int(answer) < len(order):
+                mapped[question_id] = str(order[int(answer)])
+        return mapped
+
+
+def derive(pool: str, questions: List[Dict[str, Any]], index: int, per_variant: Optional[int] = None) -> Variant:
+    """Variant `index` of a pool: seeded subset, order and option shuffles"""
+    rng = random.Random(f'{pool}:{index}')
+    count = min(per_variant or len(questions), len(questions))
+    chosen = rng.sample(range(len(questions)), count)
+    form, orders = [], {}
+    for source in chosen:
+        question = questions[source]
+        if _shuffles(question):
+            order = _option_order(question['options'], rng)
+            question = dict(question, options=[question['options'][i] for i in order],
+                            correctAnswer=_remap(question.get('correctAnswer', ''), order), optionOrder=order)
+            orders[question['id']] = order
+        form.append(question)
+    return Variant(f'{pool}-{index}', form, orders)
+
+
+class VariantStore:
+    """Registered question pools and how many variant ids each has handed out"""
+
+    def __init__(self, db_path: str = VARIANTS_DB_PATH):
+        self.db_path = db_path
+        self.pools: 'OrderedDict[str, Tuple[List[Dict[str, Any]], Optional[int], int]]' = OrderedDict()
+        self.lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS variant_pools ('
+                'pool_id TEXT PRIMARY KEY, assessment_id TEXT NOT NULL, questions TEXT NOT NULL, '
+                'per_variant INTEGER, issued INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL)'
+            )
+        return self._conn
+
+    def reset_connection(self) -> None:
+        """Reopen the database in a forked worker instead of sharing the parent's connection"""
+        self.lock = threading.Lock()
+        self._conn = None
+        self.pools = OrderedDict()
+
+    def issue(self, assessment_id: str, questions: List[Dict[str, Any]], count: int,
+              per_variant: Optional[int] = None, seed: str = '') -> Dict[str, Any]:
+        """Register the pool if new and hand out the next `count` variant ids"""
+        if not questions:
+            raise ValueError('questions are required')
+        if per_variant is not None and not 0 < per_variant <= len(questions):
+            raise ValueError(f'questionsPerVariant must be between 1 and {len(questions)}')
+        ids = [q.get('id') for q in questions]
+        if None in ids or len(set(ids)) != len(ids):
+            raise ValueError('every question needs a unique id')
+        pool = pool_id(questions, f'{seed}:{per_variant}')
+        with self.lock:
+            db = self._db()
+            db.execute(
+                'INSERT OR IGNORE INTO variant_pools (pool_id, assessment_id, questions, per_variant, created_at) '
+                'VALUES (?, ?, ?, ?, ?)', (pool, assessment_id, json.dumps(questions), per_variant, time.time())
+            )
+            owner, = db.execute('SELECT assessment_id FROM variant_pools WHERE pool_id = ?', (pool,)).fetchone()
+            if owner != assessment_id:
+                raise ValueError('This question pool is registered to another assessment')
+            db.execute('UPDATE variant_pools SET issued = issued + ? WHERE pool_id = ?', (count, pool))
+            issued, = db.execute('SELECT issued FROM variant_pools WHERE pool_id = ?', (pool,)).fetchone()
+            db.commit()
+            self.pools.pop(pool, None)
+        first = issued - count
+        return {
+            'assessmentId': assessment_id,
+            'poolId': pool,
+            'poolSize': len(questions),
+            'questionsPerVariant': per_variant or len(questions),
+            'issued': issued,
+            'variantIds': [f'{pool}-{index}' for index in range(first, issued)],
+        }
+
+    def _pool(self, pool: str) -> Tuple[str, List[Dict[str, Any]], Optional[int], int]:
+        """(assessment id, questions, per variant, issued), cached; caller holds the lock"""
+        cached = self.pools.get(pool)
+        if cached is not None:
+            self.pools.move_to_end(pool)
+            return cached
+        row = self._db().execute(
+            'SELECT assessment_id, questions, per_variant, issued FROM variant_pools WHERE pool_id = ?', (pool,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f'Unknown variant pool {pool}')
+        cached = (row[0], json.loads(row[1]), row[2], row[3])
+        self.pools[pool] = cached
+        if len(self.pools) > VARIANT_CACHED_POOLS:
+            self.pools.popitem(last=False)
+        return cached
+
+    def get(self, assessment_id: str, variant_id: str) -> Variant:
+        """The variant behind an id handed out for this assessment; KeyError otherwise"""
+        pool, index = parse_variant_id(variant_id)
+        with self.lock:
+            owner, questions, per_variant, issued = self._pool(pool)
+        if owner != assessment_id or index >= issued:
+            raise KeyError(f'Unknown variant {variant_id}')
+        return derive(pool, questions, index, per_variant)
+
+
+# Shared store used by the Flask routes
+variant_store = VariantStore()
+
+
+@bp.route('/assessments/<assessment_id>/variants', methods=['POST'])
+def issue_variants(assessment_id):
+    """Register the generated questions as a pool and hand out `count` new variant ids"""
+    try:
+        data = request.get_json(silent=True) or {}
+        count = int(data.get('count', 1))
+        if not 0 < count <= VARIANT_MAX_BATCH:
+            return jsonify({"error": f"count must be between 1 and {VARIANT_MAX_BATCH}"}), 400
+        per_variant = data.get('questionsPerVariant')
+        issued = variant_store.issue(assessment_id, data.get('questions') or [], count,
+                                     int(per_variant) if per_variant else None, str(data.get('seed', '')))
+        return jsonify(issued), 201
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route('/assessments/<assessment_id>/variants/<variant_id>', methods=['GET'])
+def get_variant(assessment_id, variant_id):
+    """One variant's form, with its answer key remapped to the shuffled options"""
+    try:
+        variant = variant_store.get(assessment_id, variant_id)
+        return jsonify({'assessmentId': assessment_id, 'variantId': variant.variant_id,
+                        'questions': variant.questions})
+
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
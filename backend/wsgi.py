@@ -0,0 +1,10 @@
+# backend/wsgi.py
+"""Production entry point: gunicorn -c gunicorn.conf.py
+
+With preload_app the gunicorn master imports this once and workers fork from it, sharing
+modules and compiled templates copy-on-write. Background threads and client pools are
+started per worker by app.post_fork() (gunicorn.conf.py's post_worker_init).
+"""
+from app import create_app
+
+app = create_app(start_workers=False)
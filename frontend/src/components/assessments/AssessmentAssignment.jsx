@@ -2,13 +2,15 @@
 import { useState, useEffect } from 'react';
 import { collection, addDoc, query, where, getDocs, updateDoc, doc } from 'firebase/firestore';
 import { db } from '../../services/firebase';
+import { issueAssessmentVariants } from '../../services/groqApi';
 
-export default function AssessmentAssignment({ assessmentId, assessmentData, onClose, onSendEmail }) {
+export default function AssessmentAssignment({ assessmentId, assessmentData, onClose, onSendEmail, onSendBulkEmail }) {
   const [candidates, setCandidates] = useState([]);
   const [selectedCandidates, setSelectedCandidates] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
+  const [sendProgress, setSendProgress] = useState(null);
   const [emailTemplate, setEmailTemplate] = useState({
     subject: `Assessment Invitation: ${assessmentData?.title || ''}`,
     message: `You have been invited to take the assessment "${assessmentData?.title || ''}".\n\nPlease complete it by the due date.`
@@ -54,9 +56,16 @@ export default function AssessmentAssignment({ assessmentId, assessmentData, onC
     setError('');
     
     try {
-      const emailResults = [];
+      let emailResults = [];
+      const recipients = [];
+
+      // One shuffled variant per candidate; without it everyone gets the original form
+      const variants = await issueAssessmentVariants(
+        { id: assessmentId, ...assessmentData },
+        selectedCandidates.length
+      );
       
-      for (const candidateId of selectedCandidates) {
+      for (const [index, candidateId] of selectedCandidates.entries()) {
         const candidate = candidates.find(c => c.id === candidateId);
         
         // Create assignment
@@ -70,17 +79,29 @@ export default function AssessmentAssignment({ assessmentId, assessmentData, onC
           expiresAt: new Date(Date.now() + 7 * 24 * 60 * 60 * 1000), // 7 days from now
           assessmentTitle: assessmentData.title,
           assessmentDescription: assessmentData.description,
-          timeLimit: assessmentData.timeLimit
+          timeLimit: assessmentData.timeLimit,
+          variantId: variants?.variantIds?.[index] || null
         };
         
         const assignmentRef = await addDoc(collection(db, 'assignments'), assignmentData);
         
-        // Send email
-        const emailSent = await onSendEmail(assessmentData, candidate.email, 'assigned');
-        emailResults.push({
-          candidate: candidate.email,
-          success: emailSent
-        });
+        recipients.push({ email: candidate.email, name: candidate.name });
+      }
+      
+      // Send all invitations in one request when the bulk endpoint is available
+      if (onSendBulkEmail) {
+        setSendProgress({ received: 0, total: recipients.length });
+        emailResults = await onSendBulkEmail(assessmentData, recipients, 'assigned',
+          (received, total) => setSendProgress({ received, total }));
+        setSendProgress(null);
+      } else {
+        for (const recipient of recipients) {
+          const emailSent = await onSendEmail(assessmentData, recipient.email, 'assigned');
+          emailResults.push({
+            candidate: recipient.email,
+            success: emailSent
+          });
+        }
       }
       
       // Update assessment assignments count
@@ -89,7 +110,9 @@ export default function AssessmentAssignment({ assessmentId, assessmentData, onC
       });
       
       const successfulEmails = emailResults.filter(r => r.success).length;
-      setSuccess(`Assessment assigned to ${selectedCandidates.length} candidates. ${successfulEmails}/${selectedCandidates.length} emails sent successfully.`);
+      const unconfirmed = emailResults.filter(r => r.unconfirmed).length;
+      setSuccess(`Assessment assigned to ${selectedCandidates.length} candidates. ${successfulEmails}/${selectedCandidates.length} emails sent successfully.` +
+        (unconfirmed ? ` ${unconfirmed} unconfirmed (the connection dropped); check before resending.` : ''));
       
       setTimeout(() => {
         onClose();
@@ -175,7 +198,9 @@ export default function AssessmentAssignment({ assessmentId, assessmentData, onC
             disabled={loading}
             className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700 disabled:opacity-50"
           >
-            {loading ? 'Assigning...' : 'Assign Assessment'}
+            {loading
+              ? (sendProgress ? `Sending ${sendProgress.received}/${sendProgress.total}...` : 'Assigning...')
+              : 'Assign Assessment'}
           </button>
         </div>
       </div>
@@ -1,5 +1,6 @@
 // src/components/assessments/AssessmentForm.jsx
 import { useState, useEffect } from 'react';
+import useAssessmentPrefetch from '../../hooks/useAssessmentPrefetch';
 
 const QUESTION_TYPES = [
   { id: 'multiple_choice', name: 'Multiple Choice', icon: '📝', description: 'Multiple choice questions with options' },
@@ -39,6 +40,8 @@ export default function AssessmentForm({
     }
   });
 
+  const { claim: claimPrefetch } = useAssessmentPrefetch(formData, aiEnabled);
+
   useEffect(() => {
     if (initialData) {
       setFormData({
@@ -119,7 +122,7 @@ export default function AssessmentForm({
       return;
     }
     
-    onGenerateWithAI(formData);
+    onGenerateWithAI({ ...formData, prefetchId: claimPrefetch() });
   };
 
   return (
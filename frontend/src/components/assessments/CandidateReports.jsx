@@ -21,6 +21,7 @@ import {
   Calendar
 } from 'lucide-react';
 import ViolationReport from './ViolationReport';
+import { emailCohortExport, fetchCohortExport, getCohortRank } from '../../services/groqApi';
 
 export default function CandidateReports({ assessment, submissions, onClose }) {
   const [selectedSubmission, setSelectedSubmission] = useState(null);
@@ -33,6 +34,7 @@ export default function CandidateReports({ assessment, submissions, onClose }) {
   const [showTopPerformers, setShowTopPerformers] = useState(false);
   const [showViolationReport, setShowViolationReport] = useState(false);
   const [activeTab, setActiveTab] = useState('overview');
+  const [cohortRank, setCohortRank] = useState(null);
 
   // Helper function to get candidate name from submission
   const getCandidateName = (submission) => {
@@ -123,12 +125,43 @@ export default function CandidateReports({ assessment, submissions, onClose }) {
     }
   }, [filteredSubmissions, selectedSubmission]);
 
-  const exportToCSV = () => {
+  // Server-side standing against every finalized attempt of this assessment
+  useEffect(() => {
+    setCohortRank(null);
+    if (!selectedSubmission || !assessment?.id) return;
+    let cancelled = false;
+    getCohortRank(assessment.id, selectedSubmission.id).then((rank) => {
+      if (!cancelled) setCohortRank(rank);
+    });
+    return () => { cancelled = true; };
+  }, [assessment?.id, selectedSubmission]);
+
+  const downloadFile = (blob, suffix) => {
+    const url = URL.createObjectURL(blob);
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = `${assessment.title.replace(/\s+/g, '_')}_${suffix}_${new Date().toISOString().slice(0, 10)}.csv`;
+    a.click();
+    URL.revokeObjectURL(url);
+  };
+
+  // The server streams the whole cohort (scores, violations, analysis) as CSV
+  // when it has every attempt; filtered views, and cohorts the server has not
+  // recorded in full, are exported from the submissions shown here
+  const exportToCSV = async () => {
     if (!filteredSubmissions || filteredSubmissions.length === 0) {
       alert('No submissions to export');
       return;
     }
-    
+
+    if (filteredSubmissions.length === submissions.length) {
+      const cohort = await fetchCohortExport(assessment.id, 'csv', submissions.length);
+      if (cohort) {
+        downloadFile(cohort, 'cohort');
+        return;
+      }
+    }
+
     const headers = ['Candidate Name', 'Email', 'Score (%)', 'Status', 'Time Spent (minutes)', 'Completed At', 'Violations'];
     const data = filteredSubmissions.map(sub => [
       getCandidateName(sub),
@@ -145,13 +178,18 @@ export default function CandidateReports({ assessment, submissions, onClose }) {
       ...data.map(row => row.map(field => `"${field}"`).join(',')) // Wrap fields in quotes to handle commas
     ].join('\n');
 
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = `${assessment.title.replace(/\s+/g, '_')}_submissions_${new Date().toISOString().slice(0, 10)}.csv`;
-    a.click();
-    URL.revokeObjectURL(url);
+    downloadFile(new Blob([csvContent], { type: 'text/csv;charset=utf-8;' }), 'submissions');
+  };
+
+  const emailExport = async () => {
+    if (!window.confirm('Email the cohort export (compressed CSV) to your account address?')) return;
+
+    const result = await emailCohortExport(assessment.id, assessment.title);
+    if (result.success) {
+      alert(`Export of ${result.rows} candidates queued for your email`);
+    } else {
+      alert(`Could not email the export: ${result.error}`);
+    }
   };
 
   const sendResultEmail = async (submission) => {
@@ -169,6 +207,7 @@ export default function CandidateReports({ assessment, submissions, onClose }) {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
+          attemptId: submission.id,
           assessment: {
             title: assessment.title,
             jobRole: assessment.jobRole,
@@ -246,6 +285,13 @@ export default function CandidateReports({ assessment, submissions, onClose }) {
                 <Download size={16} className="mr-2" />
                 Export CSV
               </button>
+              <button
+                onClick={emailExport}
+                className="flex items-center px-4 py-2 border-2 border-black text-black rounded-xl hover:bg-black hover:text-white transition-all duration-200"
+              >
+                <Mail size={16} className="mr-2" />
+                Email Export
+              </button>
               <button
                 onClick={onClose}
                 className="p-2 text-gray-400 hover:text-black hover:bg-gray-100 rounded-xl transition-colors duration-200"
@@ -573,7 +619,9 @@ export default function CandidateReports({ assessment, submissions, onClose }) {
                         </div>
                         <p className="text-3xl font-bold text-black">{selectedSubmission.timeSpent || 'N/A'}m</p>
                         <p className="text-sm text-gray-600 mt-2">
-                          vs {stats.averageTime}m average
+                          {cohortRank?.fasterThanPercent != null
+                            ? `Faster than ${Math.round(cohortRank.fasterThanPercent)}% of candidates`
+                            : `vs ${stats.averageTime}m average`}
                         </p>
                       </div>
 
@@ -582,12 +630,26 @@ export default function CandidateReports({ assessment, submissions, onClose }) {
                           <h5 className="font-semibold text-black">Ranking</h5>
                           <Award className="text-gray-400" size={24} />
                         </div>
-                        <p className="text-3xl font-bold text-black">
-                          #{submissions.findIndex(s => s.id === selectedSubmission.id) + 1}
-                        </p>
-                        <p className="text-sm text-gray-600 mt-2">
-                          of {submissions.length} candidates
-                        </p>
+                        {cohortRank ? (
+                          <>
+                            <p className="text-3xl font-bold text-black">
+                              {Math.round(cohortRank.percentileRank)}th
+                            </p>
+                            <p className="text-sm text-gray-600 mt-2">
+                              percentile of {cohortRank.cohortSize} candidates
+                              {cohortRank.zScore != null && ` (z ${cohortRank.zScore >= 0 ? '+' : ''}${cohortRank.zScore.toFixed(2)})`}
+                            </p>
+                          </>
+                        ) : (
+                          <>
+                            <p className="text-3xl font-bold text-black">
+                              #{submissions.findIndex(s => s.id === selectedSubmission.id) + 1}
+                            </p>
+                            <p className="text-sm text-gray-600 mt-2">
+                              of {submissions.length} candidates
+                            </p>
+                          </>
+                        )}
                       </div>
                     </div>
                   </div>
@@ -2,6 +2,12 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 import { doc, updateDoc, collection, addDoc } from 'firebase/firestore';
 import { db } from '../../services/firebase';
+import { sendProctoringFrames } from '../../services/groqApi';
+
+// Low-resolution snapshots sent for server-side face presence, a few per request
+const SNAPSHOT_WIDTH = 160;
+const SNAPSHOT_HEIGHT = 120;
+const SNAPSHOTS_PER_REQUEST = 3;
 
 export default function ProctoringSystem({ 
   assignmentId, 
@@ -16,6 +22,9 @@ export default function ProctoringSystem({
   const audioRef = useRef(null);
   const monitoringInterval = useRef(null);
   const violationCheckInterval = useRef(null);
+  const snapshotInterval = useRef(null);
+  const canvasRef = useRef(null);
+  const pendingSnapshots = useRef([]);
 
   // Track browser tab changes
   const [isTabActive, setIsTabActive] = useState(true);
@@ -66,6 +75,29 @@ export default function ProctoringSystem({
     }
   }, [config, onStatusChange]);
 
+  // Capture a webcam snapshot; every few are sent for server-side analysis
+  const captureSnapshot = useCallback(() => {
+    const video = videoRef.current;
+    const canvas = canvasRef.current;
+    if (!video || !canvas || video.readyState < 2) {
+      return;
+    }
+
+    canvas.width = SNAPSHOT_WIDTH;
+    canvas.height = SNAPSHOT_HEIGHT;
+    canvas.getContext('2d').drawImage(video, 0, 0, SNAPSHOT_WIDTH, SNAPSHOT_HEIGHT);
+    pendingSnapshots.current.push({
+      image: canvas.toDataURL('image/jpeg', 0.7),
+      timestamp: Date.now()
+    });
+
+    if (pendingSnapshots.current.length >= SNAPSHOTS_PER_REQUEST) {
+      const frames = pendingSnapshots.current;
+      pendingSnapshots.current = [];
+      sendProctoringFrames(assignmentId, frames);
+    }
+  }, [assignmentId]);
+
   // Start monitoring
   const startMonitoring = useCallback(() => {
     // Check for violations every 5 seconds
@@ -77,7 +109,14 @@ export default function ProctoringSystem({
     monitoringInterval.current = setInterval(() => {
       recordProctoringData();
     }, 30000);
-  }, []);
+
+    // Snapshot every 5 seconds, matching the violation checks
+    if (config.camera) {
+      snapshotInterval.current = setInterval(() => {
+        captureSnapshot();
+      }, 5000);
+    }
+  }, [config.camera, captureSnapshot]);
 
   // Check for violations
   const checkForViolations = useCallback(async () => {
@@ -198,6 +237,9 @@ export default function ProctoringSystem({
       if (violationCheckInterval.current) {
         clearInterval(violationCheckInterval.current);
       }
+      if (snapshotInterval.current) {
+        clearInterval(snapshotInterval.current);
+      }
       
       // Stop all media streams
       [videoRef, screenRef, audioRef].forEach(ref => {
@@ -222,8 +264,8 @@ export default function ProctoringSystem({
       {config.screen && <video ref={screenRef} autoPlay muted playsInline className="hidden" />}
       {config.microphone && !config.screen && <audio ref={audioRef} autoPlay muted className="hidden" />}
       
-      {/* Canvas for face detection (would be used with face detection library) */}
-      {config.camera && <canvas className="hidden" />}
+      {/* Canvas for the snapshots analyzed server-side */}
+      {config.camera && <canvas ref={canvasRef} className="hidden" />}
     </div>
   );
 }
\ No newline at end of file
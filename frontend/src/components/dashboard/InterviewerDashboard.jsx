@@ -7,6 +7,7 @@ import {
   addDoc, orderBy 
 } from 'firebase/firestore';
 import { db } from '../../services/firebase';
+import { authHeaders } from '../../services/groqApi';
 import { useAuth } from '../../hooks/useAuth';
 import AssessmentCard from '../assessments/AssessmentCard';
 import StatsOverview from '../dashboard/StatsOverview';
@@ -192,6 +193,64 @@ export default function InterviewerDashboard() {
     }
   };
 
+  // onProgress(received, total) is called as each recipient's outcome arrives
+  const sendBulkAssessmentEmails = async (assessment, recipients, type = 'assigned', onProgress = () => {}) => {
+    const results = [];
+    let streaming = false;
+    try {
+      const response = await fetch('https://skills-v2-emailservice.onrender.com/send-assessment-emails/bulk', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          ...(await authHeaders())
+        },
+        body: JSON.stringify({
+          assessment,
+          recipients,
+          type,
+          interviewerEmail: user.email
+        })
+      });
+
+      if (!response.ok) {
+        throw new Error('Failed to send emails');
+      }
+
+      // Outcomes arrive as one JSON object per line while sending progresses
+      streaming = true;
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(Boolean).forEach(line => {
+          const outcome = JSON.parse(line);
+          if (!outcome.done) {
+            results.push({ candidate: outcome.email, success: !!outcome.success });
+          }
+        });
+        onProgress(results.length, recipients.length);
+      }
+    } catch (error) {
+      console.error('Error sending bulk emails:', error);
+    }
+
+    // Outcomes received before an error stand. Once sending has started, recipients
+    // without one may or may not have been sent, so they are reported as unconfirmed
+    const reported = new Set(results.map(r => r.candidate.toLowerCase()));
+    return [
+      ...results,
+      ...recipients
+        .filter(r => !reported.has(r.email.trim().toLowerCase()))
+        .map(r => ({ candidate: r.email, success: false, unconfirmed: streaming }))
+    ];
+  };
+
   if (loading) {
     return (
       <div className="flex justify-center items-center h-40">
@@ -338,6 +397,7 @@ export default function InterviewerDashboard() {
             setSelectedAssessment(null);
           }}
           onSendEmail={sendAssessmentEmail}
+          onSendBulkEmail={sendBulkAssessmentEmails}
         />
       )}
 
@@ -0,0 +1,41 @@
+// src/hooks/useAssessmentPrefetch.js
+import { useEffect, useRef, useState } from 'react';
+import { prefetchAssessment, cancelAssessmentPrefetch } from '../services/groqApi';
+
+// Wait this long after the last change before treating the parameters as settled
+const PREFETCH_DEBOUNCE_MS = 1500;
+
+// Starts a server-side speculative generation for the current job role, type,
+// difficulty and question count once they stop changing, replacing the previous
+// one. Returns the prefetchId to send with the real generate request.
+export default function useAssessmentPrefetch({ jobRole, type, difficulty, numberOfQuestions }, enabled = true) {
+  const [prefetchId, setPrefetchId] = useState(null);
+  const currentId = useRef(null);
+
+  useEffect(() => {
+    if (!enabled || !jobRole?.trim() || !(numberOfQuestions > 0)) return;
+    const timer = setTimeout(async () => {
+      const result = await prefetchAssessment(
+        { jobRole, type, difficulty, numberOfQuestions },
+        currentId.current
+      );
+      currentId.current = result?.prefetchId || null;
+      setPrefetchId(currentId.current);
+    }, PREFETCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [jobRole, type, difficulty, numberOfQuestions, enabled]);
+
+  // Leaving the form without generating frees the held result
+  useEffect(() => () => {
+    if (currentId.current) cancelAssessmentPrefetch(currentId.current);
+  }, []);
+
+  const claim = () => {
+    const id = currentId.current;
+    currentId.current = null;
+    setPrefetchId(null);
+    return id;
+  };
+
+  return { prefetchId, claim };
+}
@@ -4,6 +4,7 @@ import { doc, setDoc, collection, addDoc, getDoc, updateDoc} from 'firebase/fire
 import { db } from '../services/firebase';
 import { useAuth } from '../hooks/useAuth';
 import { generateAssessmentWithAI, testBackendConnection } from '../services/groqApi';
+import useAssessmentPrefetch from '../hooks/useAssessmentPrefetch';
 import { 
   FileText, Settings, Zap, Save, ArrowLeft, 
   AlertCircle, CheckCircle, Loader, WifiOff,
@@ -178,6 +179,7 @@ const AssessmentForm = ({ onGenerateWithAI, onSave, onFinalizeAndAssign, loading
     passingScore: 70,
     ...initialData
   });
+  const { claim: claimPrefetch } = useAssessmentPrefetch(formData, aiEnabled);
 
   const isFormValid = formData.title && formData.jobRole && formData.description;
 
@@ -287,7 +289,7 @@ const AssessmentForm = ({ onGenerateWithAI, onSave, onFinalizeAndAssign, loading
       <div className="flex flex-col sm:flex-row gap-4">
         {/* AI Generation Button */}
         <button 
-          onClick={() => onGenerateWithAI && onGenerateWithAI(formData)}
+          onClick={() => onGenerateWithAI && onGenerateWithAI({ ...formData, prefetchId: claimPrefetch() })}
           disabled={loading || !aiEnabled || !isFormValid}
           className="flex items-center justify-center px-8 py-4 bg-black text-white rounded-xl hover:bg-gray-800 transition-all duration-200 disabled:opacity-50 disabled:cursor-not-allowed transform hover:scale-105 flex-1"
         >
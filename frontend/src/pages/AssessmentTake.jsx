@@ -11,6 +11,13 @@ import ProctoringSetup from '../components/assessments/ProctoringSetup';
 import AssessmentQuestions from '../components/assessments/AssessmentQuestions';
 import ProctoringSystem from '../components/assessments/ProctoringSystem';
 import LoadingSpinner from '../components/common/LoadingSpinner';
+import {
+  startGradingAttempt,
+  autosaveAnswer,
+  finalizeGradingAttempt,
+  getAssessmentVariant,
+  toPoolAnswers
+} from '../services/groqApi';
 import { 
   AlertCircle, 
   Clock, 
@@ -41,6 +48,13 @@ export default function AssessmentTake() {
   const [violations, setViolations] = useState([]);
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [showConfirmModal, setShowConfirmModal] = useState(false);
+  // Server-side grading: the attempt's start request, the chain of answer saves
+  // (sent one at a time, so they arrive in order) and per-question save timers
+  const attemptReady = useRef(Promise.resolve(null));
+  const serverSaves = useRef(Promise.resolve());
+  const gradeTimers = useRef({});
+  // Latest answers, for submits started from the timer's stale closure
+  const answersRef = useRef({});
 
   useEffect(() => {
     if (!id || id === 'undefined') {
@@ -140,7 +154,21 @@ export default function AssessmentTake() {
         }
       }
       
+      // An assigned variant replaces the question list; the server grades it by variantId
+      let takenAssessment = assessmentData;
+      if (assignmentData.variantId) {
+        const variant = await getAssessmentVariant(id, assignmentData.variantId);
+        if (variant) {
+          takenAssessment = { ...assessmentData, questions: variant.questions, variantId: variant.variantId };
+          setAssessment(takenAssessment);
+        }
+      }
+
       setAssignment(assignmentData);
+      attemptReady.current = startGradingAttempt(assignmentData.id, takenAssessment, {
+        name: assignmentData.candidateName,
+        email: assignmentData.candidateEmail
+      });
 
       // 3. Calculate time left
       if (assignmentData.expiresAt) {
@@ -205,9 +233,28 @@ export default function AssessmentTake() {
       ...prev,
       [questionId]: answer
     }));
+    answersRef.current = { ...answersRef.current, [questionId]: answer };
 
     // Auto-save answers periodically
     debouncedSaveAnswers(questionId, answer);
+
+    // Grade the change into the running server-side score
+    if (assignment?.id) {
+      queueServerGrade(assignment.id, questionId);
+    }
+  };
+
+  // Sends a question's latest answer once typing pauses, after the attempt has
+  // started. A save that still fails is harmless: finalize re-grades from the
+  // final answers.
+  const queueServerGrade = (attemptId, questionId) => {
+    clearTimeout(gradeTimers.current[questionId]);
+    gradeTimers.current[questionId] = setTimeout(() => {
+      delete gradeTimers.current[questionId];
+      serverSaves.current = serverSaves.current
+        .then(() => attemptReady.current)
+        .then(started => started && autosaveAnswer(attemptId, questionId, answersRef.current[questionId]));
+    }, 800);
   };
 
   // Debounced function to save answers
@@ -320,31 +367,54 @@ export default function AssessmentTake() {
   const submitAssessment = async () => {
     if (!assessment || !assignment) return;
 
-    // Calculate score
-    let score = 0;
-    const totalQuestions = assessment.questions?.length || 0;
-    
-    if (totalQuestions > 0) {
-      assessment.questions.forEach(question => {
-        if (question.correctAnswer === answers[question.id]) {
-          score += 1;
-        }
-      });
+    const timeSpent = (assessment.timeLimit || 30) - Math.floor(timeLeft / 60);
+    const finalAnswers = answersRef.current;
+
+    // Pending saves are covered by the final answers, which the server grades in
+    Object.values(gradeTimers.current).forEach(clearTimeout);
+    gradeTimers.current = {};
+    const started = await attemptReady.current;
+
+    // Finalize the incrementally graded result, falling back to local scoring
+    const graded = started && await finalizeGradingAttempt(assignment.id, {
+      answers: finalAnswers,
+      timeSpent,
+      timeLimit: assessment.timeLimit || 30,
+      violations: violations.length
+    });
+    let percentage;
+
+    if (graded && !graded.error) {
+      percentage = graded.percentage;
+    } else {
+      let score = 0;
+      const totalQuestions = assessment.questions?.length || 0;
+
+      if (totalQuestions > 0) {
+        assessment.questions.forEach(question => {
+          if (question.correctAnswer === finalAnswers[question.id]) {
+            score += 1;
+          }
+        });
+      }
+
+      percentage = totalQuestions > 0 ? (score / totalQuestions) * 100 : 0;
     }
 
-    const percentage = totalQuestions > 0 ? (score / totalQuestions) * 100 : 0;
     const passed = percentage >= (assessment.passingScore || 70);
+    // Reports read answers against the original questions
+    const reportedAnswers = assessment.variantId ? toPoolAnswers(assessment.questions, finalAnswers) : finalAnswers;
 
     // Update assignment
     await updateDoc(doc(db, 'assignments', assignment.id), {
       status: 'completed',
       completedAt: serverTimestamp(),
-      answers,
+      answers: reportedAnswers,
       score: percentage,
       passed,
       violations: violations.length,
-      timeSpent: (assessment.timeLimit || 30) - Math.floor(timeLeft / 60),
-      finalAnswers: answers
+      timeSpent,
+      finalAnswers: reportedAnswers
     });
 
     // Update assessment submissions count
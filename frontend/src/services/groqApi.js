@@ -1,4 +1,6 @@
 // src/services/groqApi.js
+import { auth } from './firebase';
+
 const GROQ_API_KEY = import.meta.env.VITE_GROQ_API_KEY;
 const GROQ_API_URL = 'https://api.groq.com/openai/v1/chat/completions';
 
@@ -65,6 +67,35 @@ export async function generateAssessmentWithAI(formData) {
   }
 }
 
+// Speculative generation: once the parameters that shape the questions stop
+// changing, the server starts generating so "Generate with AI" can pick up the
+// result (pass its prefetchId along). Best effort: failures just mean no prefetch.
+export async function prefetchAssessment(params, replaces = null) {
+  try {
+    // const response = await fetch('http://localhost:5001/generate-assessment/prefetch', {
+    const response = await fetch('https://skills-v2.onrender.com/generate-assessment/prefetch', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ ...params, replaces })
+    });
+    if (!response.ok) {
+      return null;
+    }
+    return await response.json();
+  } catch (error) {
+    console.error('Error prefetching assessment:', error);
+    return null;
+  }
+}
+
+export function cancelAssessmentPrefetch(prefetchId) {
+  // fetch(`http://localhost:5001/generate-assessment/prefetch/${prefetchId}`, { method: 'DELETE', keepalive: true })
+  fetch(`https://skills-v2.onrender.com/generate-assessment/prefetch/${prefetchId}`, { method: 'DELETE', keepalive: true })
+    .catch(() => {});
+}
+
 // Test function to check backend connection
 export async function testBackendConnection() {
   try {
@@ -80,4 +111,213 @@ export async function testBackendConnection() {
     console.error('Backend connection test failed:', error);
     return false;
   }
-}
\ No newline at end of file
+}
+
+// Incremental grading: the answer key is cached server-side per attempt and
+// each answer change is graded as it happens, so submit only finalizes.
+// Finalize sends the final answers too; any the server missed are graded then.
+async function postAttempt(attemptId, action, body = {}) {
+  // const response = await fetch(`http://localhost:5001/attempts/${attemptId}/${action}`, {
+  const response = await fetch(`https://skills-v2.onrender.com/attempts/${attemptId}/${action}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(body)
+  });
+
+  if (!response.ok) {
+    throw new Error(`Server error: ${response.status} ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
+export async function startGradingAttempt(attemptId, assessment, candidate = {}) {
+  try {
+    return await postAttempt(attemptId, 'start', {
+      questions: assessment.questions || [],
+      passingScore: assessment.passingScore || 70,
+      assessmentId: assessment.id,
+      variantId: assessment.variantId,
+      candidate
+    });
+  } catch (error) {
+    console.error('Error starting incremental grading:', error);
+    return null;
+  }
+}
+
+export async function autosaveAnswer(attemptId, questionId, answer) {
+  try {
+    return await postAttempt(attemptId, 'answer', { questionId, answer });
+  } catch (error) {
+    console.error('Error auto-grading answer:', error);
+    return null;
+  }
+}
+
+export async function finalizeGradingAttempt(attemptId, details = {}) {
+  try {
+    return await postAttempt(attemptId, 'finalize', details);
+  } catch (error) {
+    console.error('Error finalizing incremental grading:', error);
+    return null;
+  }
+}
+
+// Proctoring snapshots: face presence is decided server-side from these,
+// in batches, and the resulting timeline feeds the violation report.
+export async function sendProctoringFrames(assignmentId, frames) {
+  try {
+    // const response = await fetch(`http://localhost:5001/proctoring/${assignmentId}/frames`, {
+    const response = await fetch(`https://skills-v2.onrender.com/proctoring/${assignmentId}/frames`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ frames })
+    });
+
+    if (!response.ok) {
+      throw new Error(`Server error: ${response.status} ${response.statusText}`);
+    }
+
+    return response.json();
+  } catch (error) {
+    console.error('Error sending proctoring snapshots:', error);
+    return null;
+  }
+}
+
+// Variants: shuffled forms of one generated assessment, derived on the server
+// from the question pool so each candidate can get their own without another
+// generation. Returns { variantIds, ... } or null.
+export async function issueAssessmentVariants(assessment, count) {
+  try {
+    // const response = await fetch(`http://localhost:5001/assessments/${assessment.id}/variants`, {
+    const response = await fetch(`https://skills-v2.onrender.com/assessments/${assessment.id}/variants`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        questions: assessment.questions || [],
+        count,
+        questionsPerVariant: assessment.questionsPerVariant || null
+      })
+    });
+    if (!response.ok) {
+      return null;
+    }
+    return await response.json();
+  } catch (error) {
+    console.error('Error issuing assessment variants:', error);
+    return null;
+  }
+}
+
+export async function getAssessmentVariant(assessmentId, variantId) {
+  try {
+    // const response = await fetch(`http://localhost:5001/assessments/${assessmentId}/variants/${variantId}`);
+    const response = await fetch(`https://skills-v2.onrender.com/assessments/${assessmentId}/variants/${variantId}`);
+    if (!response.ok) {
+      return null;
+    }
+    return await response.json();
+  } catch (error) {
+    console.error('Error loading assessment variant:', error);
+    return null;
+  }
+}
+
+// Answers given on a variant, with option indices mapped back to the original
+// question's, so reports compare them with the assessment's own answer key
+export function toPoolAnswers(questions, answers) {
+  const mapped = { ...answers };
+  (questions || []).forEach(question => {
+    const answer = answers[question.id];
+    if (question.optionOrder && answer !== undefined && answer !== '' && !isNaN(answer)) {
+      const original = question.optionOrder[Number(answer)];
+      if (original !== undefined) {
+        mapped[question.id] = typeof answer === 'number' ? original : String(original);
+      }
+    }
+  });
+  return mapped;
+}
+
+// Where a finalized attempt stands in its assessment's cohort: percentile rank,
+// z-score and how its time compares. Null when the server has no cohort yet.
+export async function getCohortRank(assessmentId, attemptId) {
+  try {
+    // const response = await fetch(`http://localhost:5001/cohort-stats/${assessmentId}/rank?attemptId=${attemptId}`);
+    const response = await fetch(`https://skills-v2.onrender.com/cohort-stats/${assessmentId}/rank?attemptId=${attemptId}`);
+    if (!response.ok) {
+      return null;
+    }
+    return await response.json();
+  } catch (error) {
+    console.error('Error fetching cohort rank:', error);
+    return null;
+  }
+}
+
+// ID token of the signed-in interviewer, for interviewer-only routes
+export async function authHeaders() {
+  const token = await auth.currentUser?.getIdToken();
+  return token ? { Authorization: `Bearer ${token}` } : {};
+}
+
+// Cohort exports are generated and streamed server-side from the graded attempts
+export function cohortExportUrl(assessmentId, format = 'csv') {
+  // return `http://localhost:5001/assessments/${assessmentId}/export?format=${format}`;
+  return `https://skills-v2.onrender.com/assessments/${assessmentId}/export?format=${format}`;
+}
+
+// The server's export of the whole cohort as a Blob, or null when it has fewer
+// than minAttempts attempts for this assessment (none at all answers 404) or
+// cannot be reached; callers then build the file from their own submissions.
+export async function fetchCohortExport(assessmentId, format = 'csv', minAttempts = 1) {
+  try {
+    const response = await fetch(cohortExportUrl(assessmentId, format), {
+      headers: await authHeaders()
+    });
+    if (!response.ok) {
+      return null;
+    }
+    if ((Number(response.headers.get('X-Cohort-Attempts')) || 0) < minAttempts) {
+      response.body?.cancel();
+      return null;
+    }
+    return await response.blob();
+  } catch (error) {
+    console.error('Error downloading cohort export:', error);
+    return null;
+  }
+}
+
+// Emails the export to the signed-in interviewer's own address
+export async function emailCohortExport(assessmentId, title, format = 'csv') {
+  try {
+    // const response = await fetch(`http://localhost:5001/assessments/${assessmentId}/export/email`, {
+    const response = await fetch(`https://skills-v2.onrender.com/assessments/${assessmentId}/export/email`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        ...(await authHeaders())
+      },
+      body: JSON.stringify({ title, format })
+    });
+
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.error || `Server error: ${response.status} ${response.statusText}`);
+    }
+
+    return data;
+  } catch (error) {
+    console.error('Error emailing cohort export:', error);
+    return { success: false, error: error.message };
+  }
+}